@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 """Helper script used by the GitHub Action to run the review pipeline and emit JSON.
 
-Reads a diff file and optional files (commits, test log, coverage before/after) and
-invokes the review pipeline programmatically to avoid shell quoting issues.
+Reads a diff file (or, with --repo/--base/--head, the diff and commit subjects
+straight from git) and optional files (commits, test log, coverage before/after)
+and invokes the review pipeline programmatically to avoid shell quoting issues.
 """
 import argparse
-import json
-from autopr import reviewer, generator
+from autopr import comment, findings, gitdiff, reviewer
 
 
 def read_file(path: str) -> str:
@@ -16,17 +16,29 @@ def read_file(path: str) -> str:
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--diff-file', required=True)
+    parser.add_argument('--diff-file', required=False)
+    parser.add_argument('--repo', required=False, help='git repository to read the diff and commits from')
+    parser.add_argument('--base', required=False)
+    parser.add_argument('--head', required=False, default='HEAD')
     parser.add_argument('--commits-file', required=False)
     parser.add_argument('--test-log', required=False)
     parser.add_argument('--coverage-before', required=False)
     parser.add_argument('--coverage-after', required=False)
     parser.add_argument('--output', required=True)
+    parser.add_argument('--comment-output', required=False, help='also write the rendered Markdown PR comment here')
 
     args = parser.parse_args()
+    if not args.diff_file and not (args.repo and args.base):
+        parser.error('pass --diff-file or --repo with --base')
 
-    diff = read_file(args.diff_file)
     commits = []
+    git_info = None
+    if args.repo:
+        git_info = gitdiff.collect(args.repo, args.base, args.head)
+        diff = git_info.pop('diff')
+        commits = git_info.pop('commits')
+    else:
+        diff = read_file(args.diff_file)
     if args.commits_file:
         text = read_file(args.commits_file)
         commits = [l.strip() for l in text.splitlines() if l.strip()]
@@ -35,13 +47,18 @@ def main():
     cov_before = read_file(args.coverage_before) if args.coverage_before else None
     cov_after = read_file(args.coverage_after) if args.coverage_after else None
 
-    # produce AI review and also generate a suggested PR title/description
-    review = reviewer.review_pr(diff, commits=commits, issue_text=None, test_log=test_log, coverage_before=cov_before, coverage_after=cov_after)
-    pr = generator.generate_pr_from(diff, commits, None)
-    res = {"pr": pr, "review": review}
+    # produce AI review and a suggested PR title/description in one pipeline run
+    res = reviewer.review_and_generate(diff, commits=commits, issue_text=None, test_log=test_log, coverage_before=cov_before, coverage_after=cov_after, repo=args.repo)
+    if git_info is not None:
+        res['review']['_git'] = dict(git_info, base=args.base, head=args.head)
 
+    # streamed: huge reviews carry hundreds of thousands of findings
     with open(args.output, 'w', encoding='utf-8') as f:
-        json.dump(res, f, indent=2)
+        findings.write_json(res, f, indent=2)
+
+    if args.comment_output:
+        with open(args.comment_output, 'w', encoding='utf-8') as f:
+            f.write(comment.render_comment(res))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,4 @@
+"""AutoPR benchmark suite: seeded input generators, timed benchmarks and baselines.
+
+Run with ``python -m benchmarks run``; see ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,89 @@
+"""Command line for the benchmark suite.
+
+    python -m benchmarks run [--size small|default|large] [--only NAME ...] [--output FILE] [--compare BASELINE]
+    python -m benchmarks compare BASELINE CURRENT [--threshold 0.1]
+    python -m benchmarks gen-log FILE --size-mb 4096
+    python -m benchmarks memory [--count 100000]
+
+``compare`` (and ``run --compare``) exit with status 1 when any benchmark
+regressed beyond the threshold.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+from . import generators, suite
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _report(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, noise_floor: float) -> int:
+    rows = suite.compare(baseline, current, threshold=threshold, noise_floor=noise_floor)
+    print(suite.format_comparison(rows))
+    regressions = [r["name"] for r in rows if r["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run benchmarks and print or save the JSON report")
+    p_run.add_argument("--size", choices=list(suite.SIZES), default="default")
+    p_run.add_argument("--only", nargs="+", choices=list(suite.BENCHMARKS), help="benchmarks to run (default: all)")
+    p_run.add_argument("--repeat", type=int, default=5)
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--log-file", help="parse this pytest log instead of generating one (see gen-log)")
+    p_run.add_argument("--output", help="write the JSON report here (e.g. benchmarks/baselines/default.json)")
+    p_run.add_argument("--compare", metavar="BASELINE", help="compare against a baseline report after running")
+    p_run.add_argument("--threshold", type=float, default=0.10)
+    p_run.add_argument("--noise-floor", type=float, default=0.001, help="ignore differences smaller than this many seconds")
+
+    p_cmp = sub.add_parser("compare", help="compare two JSON reports")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.10)
+    p_cmp.add_argument("--noise-floor", type=float, default=0.001)
+
+    p_log = sub.add_parser("gen-log", help="stream a large synthetic pytest log to a file")
+    p_log.add_argument("path")
+    p_log.add_argument("--size-mb", type=int, default=2048)
+    p_log.add_argument("--seed", type=int, default=0)
+
+    p_mem = sub.add_parser("memory", help="bytes per finding held as a dict and as a Finding")
+    p_mem.add_argument("--count", type=int, default=100000)
+
+    args = ap.parse_args(argv)
+    if args.command == "memory":
+        print(json.dumps(suite.finding_memory(args.count), indent=2))
+        return 0
+    if args.command == "gen-log":
+        with open(args.path, "w", encoding="utf-8") as fh:
+            generators.write_pytest_log(fh, seed=args.seed, size_bytes=args.size_mb << 20)
+        return 0
+    if args.command == "compare":
+        return _report(_load(args.baseline), _load(args.current), args.threshold, args.noise_floor)
+
+    report = suite.run(args.only, size=args.size, repeat=args.repeat, seed=args.seed, log_file=args.log_file)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    elif not args.compare:
+        print(text)
+    if args.compare:
+        return _report(_load(args.compare), report, args.threshold, args.noise_floor)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
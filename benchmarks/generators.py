@@ -0,0 +1,158 @@
+"""Seeded generators for synthetic benchmark inputs.
+
+Every generator takes a ``seed`` and returns the same output for the same
+arguments, so benchmark results can be compared across commits.
+"""
+from __future__ import annotations
+
+import random
+from typing import IO, Iterator, List
+
+# average size of one test in ``iter_pytest_log`` output, including noise lines
+BYTES_PER_TEST = 240
+
+WORDS = ("user", "order", "cache", "token", "session", "payload", "config", "retry", "index", "buffer")
+
+
+def _ident(rng: random.Random) -> str:
+    return "_".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+
+
+def _code_line(rng: random.Random, depth: int, long_line_ratio: float) -> str:
+    indent = "    " * depth
+    roll = rng.random()
+    if roll < long_line_ratio:
+        args = ", ".join(f"{_ident(rng)}={rng.randint(0, 999)}" for _ in range(rng.randint(12, 30)))
+        return f"{indent}result = compute_{_ident(rng)}({args})"
+    if roll < 0.05 + long_line_ratio:
+        return f"{indent}print({_ident(rng)})  # TODO: remove"
+    if roll < 0.10 + long_line_ratio:
+        return f"{indent}if {_ident(rng)} == None: {_ident(rng)} = 0"
+    if roll < 0.15 + long_line_ratio:
+        return f"{indent}import {rng.choice(('os', 'sys', 'json', 're'))}"
+    return f"{indent}{_ident(rng)} = {_ident(rng)}.get('{_ident(rng)}', {rng.randint(0, 100)})"
+
+
+def python_body(rng: random.Random, lines: int, max_depth: int = 6, long_line_ratio: float = 0.02) -> List[str]:
+    """Syntactically plausible Python: nested defs/classes/blocks down to ``max_depth``."""
+    out: List[str] = []
+    depth = 0
+    while len(out) < lines:
+        roll = rng.random()
+        if roll < 0.08 and depth < max_depth:
+            out.append("    " * depth + f"def {_ident(rng)}_{len(out)}(self, {_ident(rng)}):")
+            depth += 1
+        elif roll < 0.10 and depth < max_depth:
+            out.append("    " * depth + f"class {_ident(rng).title().replace('_', '')}{len(out)}:")
+            depth += 1
+        elif roll < 0.16 and depth < max_depth:
+            out.append("    " * depth + f"for {_ident(rng)} in range({rng.randint(1, 50)}):")
+            depth += 1
+        elif roll < 0.22 and depth > 0:
+            out.append("    " * depth + "pass")
+            depth -= 1
+        else:
+            out.append(_code_line(rng, depth, long_line_ratio))
+    if out[-1].endswith(":"):
+        out.append("    " * depth + "pass")
+    return out
+
+
+def unified_diff(seed: int = 0, files: int = 50, lines_per_file: int = 200, max_depth: int = 6, long_line_ratio: float = 0.02, removed_ratio: float = 0.2) -> str:
+    """A multi-file unified diff with hunks of added and removed lines."""
+    rng = random.Random(seed)
+    parts: List[str] = []
+    for f in range(files):
+        path = f"src/pkg_{f % 7}/{_ident(rng)}_{f}.py"
+        parts.append(f"diff --git a/{path} b/{path}")
+        parts.append(f"--- a/{path}")
+        parts.append(f"+++ b/{path}")
+        body = python_body(rng, lines_per_file, max_depth, long_line_ratio)
+        parts.append(f"@@ -1,{int(lines_per_file * removed_ratio)} +1,{lines_per_file} @@")
+        for line in body:
+            if rng.random() < removed_ratio:
+                parts.append("-" + line)
+            parts.append("+" + line)
+    return "\n".join(parts) + "\n"
+
+
+def iter_pytest_log(seed: int = 0, tests: int = 10000, fail_ratio: float = 0.01, noise_lines: int = 3) -> Iterator[str]:
+    """Lines of a verbose pytest run: progress, captured output noise, FAILURES and the summary."""
+    rng = random.Random(seed)
+    yield "============================= test session starts =============================="
+    yield "platform linux -- Python 3.11.7, pytest-7.4.0, pluggy-1.3.0"
+    failed: List[str] = []
+    passed = skipped = 0
+    for i in range(tests):
+        name = f"tests/test_{_ident(rng)}.py::test_{_ident(rng)}_{i}"
+        roll = rng.random()
+        if roll < fail_ratio:
+            failed.append(name)
+            yield f"{name} FAILED"
+        elif roll < fail_ratio + 0.02:
+            skipped += 1
+            yield f"{name} SKIPPED"
+        else:
+            passed += 1
+            yield f"{name} PASSED"
+        for _ in range(rng.randint(0, noise_lines)):
+            yield f"DEBUG {_ident(rng)}: {' '.join(_ident(rng) for _ in range(rng.randint(3, 12)))}"
+    if failed:
+        yield "=================================== FAILURES ==================================="
+        for name in failed:
+            short = name.split("::")[-1]
+            yield f"____________________________ {short} ____________________________"
+            yield f"    def {short}():"
+            yield f">       assert {_ident(rng)} == {rng.randint(0, 9)}"
+            yield f"E       AssertionError: assert {rng.randint(10, 99)} == {rng.randint(0, 9)}"
+            yield ""
+        yield "=========================== short test summary info ============================"
+        for name in failed:
+            yield f"FAILED {name} - AssertionError: assert False"
+    yield f"======== {len(failed)} failed, {passed} passed, {skipped} skipped in {rng.uniform(10, 900):.2f}s ========"
+
+
+def pytest_log(seed: int = 0, size_bytes: int = 8 * 1024 * 1024, fail_ratio: float = 0.01) -> str:
+    """An in-memory pytest log of roughly ``size_bytes``."""
+    return "\n".join(iter_pytest_log(seed, tests=max(1, size_bytes // BYTES_PER_TEST), fail_ratio=fail_ratio)) + "\n"
+
+
+def write_pytest_log(fh: IO[str], seed: int = 0, size_bytes: int = 2 * 1024 ** 3, fail_ratio: float = 0.01) -> None:
+    """Stream a (multi-GB) log to ``fh`` without building it in memory."""
+    for line in iter_pytest_log(seed, tests=max(1, size_bytes // BYTES_PER_TEST), fail_ratio=fail_ratio):
+        fh.write(line)
+        fh.write("\n")
+
+
+def coverage_report(seed: int = 0, files: int = 5000) -> str:
+    """A coverage.py text report with ``files`` rows and a TOTAL line."""
+    rng = random.Random(seed)
+    rows = ["Name                                   Stmts   Miss  Cover", "-" * 60]
+    total_stmts = total_miss = 0
+    for f in range(files):
+        stmts = rng.randint(5, 800)
+        miss = rng.randint(0, stmts)
+        total_stmts += stmts
+        total_miss += miss
+        rows.append(f"src/pkg_{f % 13}/{_ident(rng)}_{f}.py".ljust(40) + f"{stmts:>6} {miss:>6} {100 * (stmts - miss) // stmts:>5}%")
+    rows.append("-" * 60)
+    rows.append("TOTAL".ljust(40) + f"{total_stmts:>6} {total_miss:>6} {100 * (total_stmts - total_miss) // total_stmts:>5}%")
+    return "\n".join(rows) + "\n"
+
+
+def ownership_rules(seed: int = 0, components: int = 100000) -> str:
+    """A CODEOWNERS-style map with one directory rule per component plus a few globs."""
+    rng = random.Random(seed)
+    lines = ["*  platform"]
+    for c in range(components):
+        lines.append(f"/services/{_ident(rng)}_{c}/  team-{c}")
+    lines += ["*.proto  schemas", "docs/  docs", "/services/**/vendor/"]
+    return "\n".join(lines) + "\n"
+
+
+def owned_paths(seed: int = 0, components: int = 100000, paths: int = 10000) -> List[str]:
+    """Paths under the directories ``ownership_rules(seed, components)`` declares."""
+    rng = random.Random(seed)
+    dirs = [f"services/{_ident(rng)}_{c}" for c in range(components)]
+    pick = random.Random(seed + 1)
+    return [f"{pick.choice(dirs)}/{_ident(pick)}/{_ident(pick)}_{i}.{pick.choice(('py', 'proto', 'md'))}" for i in range(paths)]
@@ -0,0 +1,280 @@
+"""Benchmark definitions, runner and baseline comparison.
+
+Each benchmark is a setup function that takes the size parameters and returns
+a zero-argument callable to time. Setup (input generation) is never timed.
+Results are plain JSON so a run can be committed as a baseline and compared
+against later runs with ``compare``.
+"""
+from __future__ import annotations
+
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from . import generators
+
+SIZES: Dict[str, Dict[str, int]] = {
+    "small": {"files": 10, "lines_per_file": 100, "log_bytes": 1 << 20, "coverage_files": 500, "owners": 1000, "baseline_entries": 100000},
+    "default": {"files": 100, "lines_per_file": 300, "log_bytes": 32 << 20, "coverage_files": 5000, "owners": 100000, "baseline_entries": 1000000},
+    "large": {"files": 1000, "lines_per_file": 300, "log_bytes": 1 << 30, "coverage_files": 50000, "owners": 100000, "baseline_entries": 1000000},
+}
+
+
+def _diff(params: Dict[str, Any]) -> str:
+    return generators.unified_diff(params["seed"], files=params["files"], lines_per_file=params["lines_per_file"])
+
+
+def _log(params: Dict[str, Any]) -> str:
+    if params.get("log_file"):
+        with open(params["log_file"], "r", encoding="utf-8") as fh:
+            return fh.read()
+    return generators.pytest_log(params["seed"], size_bytes=params["log_bytes"])
+
+
+def _use_stub_provider() -> None:
+    from autopr.llm import llm
+
+    os.environ["AUTOPR_PROVIDER"] = "stub"
+    os.environ["AUTOPR_PROVIDERS"] = ""
+    llm.reset()
+
+
+def bench_parse_diff(params: Dict[str, Any]) -> Callable[[], Any]:
+    from autopr.parser import parse_diff
+
+    diff = _diff(params)
+    return lambda: parse_diff(diff)
+
+
+def bench_analyze_python(params: Dict[str, Any]) -> Callable[[], Any]:
+    from autopr.analysis import analyze_python_code
+
+    diff = _diff(params)
+    return lambda: analyze_python_code(diff)
+
+
+def bench_basic_lint(params: Dict[str, Any]) -> Callable[[], Any]:
+    from autopr.lint import run_basic_lint
+
+    diff = _diff(params)
+    return lambda: run_basic_lint(diff)
+
+
+def bench_secret_scan(params: Dict[str, Any]) -> Callable[[], Any]:
+    from autopr.secret_scan import scan_diff
+
+    diff = _diff(params)
+    return lambda: scan_diff(diff)
+
+
+def bench_parse_pytest_log(params: Dict[str, Any]) -> Callable[[], Any]:
+    from autopr.ci_parser import parse_pytest_output
+
+    log = _log(params)
+    return lambda: parse_pytest_output(log)
+
+
+def bench_compare_coverage(params: Dict[str, Any]) -> Callable[[], Any]:
+    from autopr.coverage_utils import compare_coverage
+
+    before = generators.coverage_report(params["seed"], files=params["coverage_files"])
+    after = generators.coverage_report(params["seed"] + 1, files=params["coverage_files"])
+    return lambda: compare_coverage(before, after)
+
+
+def bench_owner_lookup(params: Dict[str, Any]) -> Callable[[], Any]:
+    """10k file-to-component lookups against a compiled ownership map."""
+    from autopr.ownership import OwnershipMap
+
+    owners = OwnershipMap.parse(generators.ownership_rules(params["seed"], components=params["owners"]))
+    paths = generators.owned_paths(params["seed"], components=params["owners"], paths=10000)
+    return lambda: [owners.owner(p) for p in paths]
+
+
+def bench_baseline_lookup(params: Dict[str, Any]) -> Callable[[], Any]:
+    """10k fingerprint lookups (half of them hits) in a memory-mapped findings baseline."""
+    import random
+    import tempfile
+
+    from autopr.baseline import FingerprintSet, write_set
+
+    rng = random.Random(params["seed"])
+    fps = [rng.getrandbits(64) for _ in range(params["baseline_entries"])]
+    tmp = tempfile.TemporaryDirectory()
+    path = os.path.join(tmp.name, "baseline.bin")
+    write_set(path, fps)
+    fset = FingerprintSet(path)
+    probes = rng.sample(fps, 5000) + [rng.getrandbits(64) for _ in range(5000)]
+
+    def run() -> int:
+        # the closure keeps the temporary directory alive
+        assert tmp
+        return sum(1 for fp in probes if fp in fset)
+
+    return run
+
+
+def bench_write_findings(params: Dict[str, Any]) -> Callable[[], Any]:
+    """Stream a review with one lint finding per diff line to JSON, as the action runner does."""
+    from autopr.findings import Finding, write_json
+
+    count = params["files"] * params["lines_per_file"]
+    review = {"summary": "", "findings": [Finding("long_line", "Line exceeds 120 characters", "low", line=i, file=f"pkg/mod_{i % 97}.py") for i in range(count)], "confidence": 0.5}
+
+    def run() -> None:
+        with open(os.devnull, "w", encoding="utf-8") as fh:
+            write_json({"review": review}, fh)
+
+    return run
+
+
+def bench_review_pr(params: Dict[str, Any]) -> Callable[[], Any]:
+    """End to end: the full review pipeline with ``StubProvider``."""
+    from autopr.reviewer import review_pr
+
+    _use_stub_provider()
+    diff = _diff(params)
+    log = generators.pytest_log(params["seed"], size_bytes=min(params["log_bytes"], 4 << 20))
+    before = generators.coverage_report(params["seed"], files=params["coverage_files"])
+    after = generators.coverage_report(params["seed"] + 1, files=params["coverage_files"])
+    commits = [f"feat: change {i}" for i in range(20)]
+    return lambda: review_pr(diff, commits=commits, test_log=log, coverage_before=before, coverage_after=after)
+
+
+def bench_review_pr_small(params: Dict[str, Any]) -> Callable[[], Any]:
+    """End to end on a one-file diff, where per-request overhead dominates."""
+    from autopr.reviewer import review_pr
+
+    _use_stub_provider()
+    diff = generators.unified_diff(params["seed"], files=1, lines_per_file=30)
+    return lambda: review_pr(diff, commits=["fix: small change"])
+
+
+BENCHMARKS: Dict[str, Callable[[Dict[str, Any]], Callable[[], Any]]] = {
+    "parse_diff": bench_parse_diff,
+    "analyze_python": bench_analyze_python,
+    "basic_lint": bench_basic_lint,
+    "secret_scan": bench_secret_scan,
+    "parse_pytest_log": bench_parse_pytest_log,
+    "compare_coverage": bench_compare_coverage,
+    "owner_lookup": bench_owner_lookup,
+    "baseline_lookup": bench_baseline_lookup,
+    "write_findings": bench_write_findings,
+    "review_pr": bench_review_pr,
+    "review_pr_small": bench_review_pr_small,
+}
+
+
+def finding_memory(count: int = 100000) -> Dict[str, Any]:
+    """Bytes per finding (tracemalloc) for ``count`` lint findings held as dicts and as ``Finding`` records."""
+    import tracemalloc
+
+    from autopr.findings import Finding
+
+    def measure(make: Callable[[int], Any]) -> float:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            # file names are shared, as they are across the findings of one file
+            held = [make(i) for i in range(count)]
+            size = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        del held
+        return size / count
+
+    files = [f"pkg/mod_{i}.py" for i in range(97)]
+    as_dict = measure(lambda i: {"type": "long_line", "message": "Line exceeds 120 characters", "severity": "low", "line": i, "file": files[i % 97]})
+    as_finding = measure(lambda i: Finding("long_line", "Line exceeds 120 characters", "low", line=i, file=files[i % 97]))
+    return {
+        "count": count,
+        "dict_bytes": round(as_dict, 1),
+        "finding_bytes": round(as_finding, 1),
+        "saving": round(1 - as_finding / as_dict, 3),
+    }
+
+
+def time_callable(fn: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, Any]:
+    """Time ``fn`` ``repeat`` times after ``warmup`` untimed calls."""
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "repeat": len(samples),
+        "min_s": round(min(samples), 6),
+        "median_s": round(statistics.median(samples), 6),
+        "mean_s": round(statistics.fmean(samples), 6),
+    }
+
+
+def run(names: List[str] | None = None, size: str = "default", repeat: int = 5, seed: int = 0, log_file: str | None = None) -> Dict[str, Any]:
+    """Run the selected benchmarks (all by default) and return the report dict."""
+    if size not in SIZES:
+        raise ValueError(f"size must be one of {', '.join(SIZES)}")
+    unknown = [n for n in names or [] if n not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"unknown benchmark(s): {', '.join(unknown)}")
+    params: Dict[str, Any] = dict(SIZES[size], seed=seed, log_file=log_file)
+    results: Dict[str, Any] = {}
+    for name in names or list(BENCHMARKS):
+        fn = BENCHMARKS[name](params)
+        results[name] = time_callable(fn, repeat=repeat)
+    return {
+        "meta": {
+            "size": size,
+            "seed": seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "argv": sys.argv[1:],
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10, noise_floor: float = 0.001) -> List[Dict[str, Any]]:
+    """Compare the fastest run (``min_s``) per benchmark.
+
+    The minimum is the least noisy statistic on shared machines. A benchmark
+    is a ``regression`` when the current time exceeds the baseline by more
+    than ``threshold`` (a fraction) and by more than ``noise_floor`` seconds;
+    ``improved`` is the mirror image. Benchmarks only in one report are
+    ``missing`` or ``new``.
+    """
+    base, cur = baseline.get("results", {}), current.get("results", {})
+    rows: List[Dict[str, Any]] = []
+    for name in list(base) + [n for n in cur if n not in base]:
+        if name not in cur:
+            rows.append({"name": name, "status": "missing", "baseline_s": base[name]["min_s"], "current_s": None, "ratio": None})
+            continue
+        if name not in base:
+            rows.append({"name": name, "status": "new", "baseline_s": None, "current_s": cur[name]["min_s"], "ratio": None})
+            continue
+        b, c = base[name]["min_s"], cur[name]["min_s"]
+        ratio = c / b if b > 0 else float("inf")
+        status = "ok"
+        if abs(c - b) > noise_floor:
+            if ratio > 1 + threshold:
+                status = "regression"
+            elif ratio < 1 / (1 + threshold):
+                status = "improved"
+        rows.append({"name": name, "status": status, "baseline_s": b, "current_s": c, "ratio": round(ratio, 3)})
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    def secs(v: float | None) -> str:
+        return "-" if v is None else f"{v * 1000:.2f}ms"
+
+    lines = [f"{'benchmark':<20} {'baseline':>12} {'current':>12} {'ratio':>7}  status"]
+    for r in rows:
+        ratio = "-" if r["ratio"] is None else f"{r['ratio']:.2f}x"
+        lines.append(f"{r['name']:<20} {secs(r['baseline_s']):>12} {secs(r['current_s']):>12} {ratio:>7}  {r['status']}")
+    return "\n".join(lines)
@@ -15,7 +15,9 @@ they can be merged with LLM results in the review API.
 from __future__ import annotations
 
 import ast
-from typing import List, Dict, Any
+from typing import List
+
+from .findings import Finding
 
 
 def _extract_added_lines(diff: str) -> str:
@@ -30,19 +32,19 @@ def _extract_added_lines(diff: str) -> str:
     return diff
 
 
-def analyze_python_code(code: str) -> List[Dict[str, Any]]:
+def analyze_python_code(code: str) -> List[Finding]:
     """Analyze a python code snippet and return findings.
 
     code may be a whole file or a diff; the analyzer will use only the added lines
     if it detects a diff-like format.
     """
     text = _extract_added_lines(code)
-    findings: List[Dict[str, Any]] = []
+    findings: List[Finding] = []
 
     # Quick textual checks for TODOs and debug prints
     for i, ln in enumerate(text.splitlines(), start=1):
         if 'TODO' in ln:
-            findings.append({"type": "todo", "message": "TODO found in added code", "line": i, "severity": "low"})
+            findings.append(Finding("todo", "TODO found in added code", "low", line=i))
 
     # Parse AST for deeper checks
     try:
@@ -70,12 +72,12 @@ def analyze_python_code(code: str) -> List[Dict[str, Any]]:
     # unused imports
     for name in imported:
         if name not in used:
-            findings.append({"type": "unused_import", "message": f"Imported `{name}` is not used", "severity": "low"})
+            findings.append(Finding("unused_import", f"Imported `{name}` is not used", "low"))
 
     # find print calls
     for node in ast.walk(tree):
         if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'print':
-            findings.append({"type": "debug_print", "message": "Found print() call — remove debug prints before merging", "line": getattr(node, 'lineno', None), "severity": "low"})
+            findings.append(Finding("debug_print", "Found print() call — remove debug prints before merging", "low", line=getattr(node, 'lineno', None)))
 
     # comparisons to None using ==/!=
     for node in ast.walk(tree):
@@ -85,12 +87,12 @@ def analyze_python_code(code: str) -> List[Dict[str, Any]]:
                     # operator list can contain ast.Eq/NotEq
                     for op in node.ops:
                         if isinstance(op, (ast.Eq, ast.NotEq)):
-                            findings.append({
-                                "type": "none_equality_comparison",
-                                "message": "Use `is`/`is not` when comparing to None",
-                                "line": getattr(node, 'lineno', None),
-                                "severity": "low",
-                            })
+                            findings.append(Finding(
+                                "none_equality_comparison",
+                                "Use `is`/`is not` when comparing to None",
+                                "low",
+                                line=getattr(node, 'lineno', None),
+                            ))
 
     # detect risky API use inside functions without try/except
     risky_names = {"open", "requests", "subprocess", "socket"}
@@ -115,12 +117,12 @@ def analyze_python_code(code: str) -> List[Dict[str, Any]]:
 
             if risky_calls and not has_try:
                 for name, lineno in risky_calls:
-                    self.findings.append({
-                        "type": "missing_error_handling",
-                        "message": f"Function uses {name} without try/except — consider handling potential errors",
-                        "line": lineno,
-                        "severity": "medium",
-                    })
+                    self.findings.append(Finding(
+                        "missing_error_handling",
+                        f"Function uses {name} without try/except — consider handling potential errors",
+                        "medium",
+                        line=lineno,
+                    ))
 
     fv = FuncVisitor()
     fv.visit(tree)
@@ -129,7 +131,7 @@ def analyze_python_code(code: str) -> List[Dict[str, Any]]:
     return findings
 
 
-def analyze_diff(diff_text: str, language: str = "python") -> List[Dict[str, Any]]:
+def analyze_diff(diff_text: str, language: str = "python") -> List[Finding]:
     """Dispatch to language-specific analyzers.
 
     For now, only Python is implemented. The function accepts the diff content and
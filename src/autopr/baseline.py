@@ -0,0 +1,383 @@
+"""Findings baseline: report only the issues a change introduces.
+
+Legacy files carry pre-existing ``unused_import``, ``missing_error_handling``
+or ``long_line`` findings that every PR touching them would report again.
+``snapshot(repo, ref)`` (``pr-ai baseline-findings``) records the
+deterministic findings of a branch as fingerprints, and the review's
+``baseline`` stage drops findings whose fingerprint is in that set.
+
+A fingerprint is a 64-bit hash of:
+
+- the rule (finding ``type``, or ``rule`` for secrets);
+- the file;
+- the flagged source line with whitespace collapsed (the message, for
+  findings without a line);
+- the enclosing top-level symbol: the ``def``/``class`` name of the nearest
+  preceding unindented line, the line git shows in hunk headers. In a diff the
+  hunk header stands in for the lines before the hunk, so a diff and the full
+  file agree on it.
+
+Line numbers are deliberately left out, so findings keep their fingerprint
+when code above them moves. The snapshot analyzes every file at ``ref`` as a
+new-file diff through the same analyzers the review runs.
+
+The set is written as an open-addressing hash table of 64-bit slots (linear
+probing, at most half full) and memory-mapped for lookups: a membership test
+reads one or two slots, so it is O(1) and needs no loading time even with
+millions of entries (16 bytes each on disk; pages are read on demand).
+
+The review uses ``AUTOPR_BASELINE_FILE``, else
+``<repo>/.autopr/findings-baseline.bin`` when the review has a repository and
+that file exists.
+"""
+from __future__ import annotations
+
+import array
+import collections
+import fnmatch
+import hashlib
+import mmap
+import os
+import re
+import struct
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from . import gitdiff, lint, secret_scan, workers
+
+DEFAULT_PATH = os.path.join(".autopr", "findings-baseline.bin")
+MAGIC = b"APRBASE1"
+# magic, slot count (a power of two), number of fingerprints
+_HEADER = struct.Struct("<8sQQ")
+_SLOT = struct.Struct("<Q")
+
+_HUNK = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@ ?(.*)$")
+_SYMBOL = re.compile(r"^(?:async\s+def|def|class)\s+([A-Za-z_]\w*)")
+# git's default hunk-header function line: starts with a letter, '_' or '$'
+_TOP_LEVEL = re.compile(r"^[A-Za-z_$]")
+
+
+def fingerprint(rule: str, path: str, snippet: str, symbol: str) -> int:
+    """Stable 64-bit fingerprint of a finding (never 0, which marks an empty slot)."""
+    key = "\0".join((rule, path, " ".join(snippet.split()), symbol))
+    value = int.from_bytes(hashlib.blake2b(key.encode("utf-8", "surrogateescape"), digest_size=8).digest(), "little")
+    return value or 1
+
+
+def _symbol(text: str, current: str) -> str:
+    if not _TOP_LEVEL.match(text):
+        return current
+    m = _SYMBOL.match(text)
+    return m.group(1) if m else ""
+
+
+class _View:
+    """Per-line ``(file, text, symbol)`` of a diff, indexed the way each analyzer reports lines."""
+
+    def __init__(self, diff: str):
+        lines = diff.splitlines()
+        # one entry per line of the diff (lint reports these line numbers)
+        self.entries: List[Tuple[str, str, str]] = []
+        # file -> added lines in order (static analysis numbers them per file)
+        self.added: Dict[str, List[Tuple[str, str]]] = {}
+        # (file, new-file line) -> entry (secret findings)
+        self.by_new_line: Dict[Tuple[str, int], Tuple[str, str, str]] = {}
+        if "\n+" not in diff:
+            # a plain snippet: every line is code
+            symbol = ""
+            for i, text in enumerate(lines, start=1):
+                symbol = _symbol(text, symbol)
+                self._add("", text, symbol, i)
+            return
+        path = old = ""
+        in_hunk = False
+        new_line = 0
+        new_symbol = old_symbol = ""
+        for i, line in enumerate(lines):
+            if line.startswith("diff --git "):
+                m = re.match(r"^diff --git a/.+ b/(.+)$", line)
+                path = old = m.group(1).strip() if m else ""
+                in_hunk = False
+            elif line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+                old = re.sub(r"^a/", "", line[4:].split("\t", 1)[0].strip())
+                in_hunk = False
+            elif line.startswith("+++ ") and not in_hunk:
+                new = line[4:].split("\t", 1)[0].strip()
+                path = old if new == "/dev/null" else re.sub(r"^b/", "", new)
+            elif _HUNK.match(line):
+                m = _HUNK.match(line)
+                in_hunk = True
+                new_line = int(m.group(1))
+                new_symbol = old_symbol = _symbol(m.group(2), "")
+            elif in_hunk and line.startswith("\\"):
+                # '\ No newline at end of file'
+                self.entries.append((path, line, ""))
+                continue
+            elif in_hunk and line.startswith("-"):
+                old_symbol = _symbol(line[1:], old_symbol)
+                self.entries.append((path, line[1:], old_symbol))
+                continue
+            elif in_hunk or (line.startswith("+") and not line.startswith("+++")):
+                text = line[1:]
+                new_symbol = _symbol(text, new_symbol)
+                if line.startswith(" ") or line == "":
+                    old_symbol = _symbol(text, old_symbol)
+                if line.startswith("+") and not line.startswith("+++"):
+                    self._add(path, text, new_symbol, new_line)
+                else:
+                    self.entries.append((path, text, new_symbol))
+                new_line += 1
+                continue
+            self.entries.append((path, line, ""))
+
+    def _add(self, path: str, text: str, symbol: str, new_line: int) -> None:
+        entry = (path, text, symbol)
+        self.entries.append(entry)
+        self.added.setdefault(path, []).append((text, symbol))
+        self.by_new_line[(path, new_line)] = entry
+
+    def only_file(self) -> str:
+        return next(iter(self.added)) if len(self.added) == 1 else ""
+
+    def locate(self, finding: Dict[str, Any], stage: str) -> Tuple[str, Optional[str], str]:
+        """``(file, source line or None, symbol)`` a finding points at."""
+        line = finding.get("line")
+        path = finding.get("file") or self.only_file()
+        if isinstance(line, int) and line > 0:
+            if stage == "static":
+                added = self.added.get(path, [])
+                if line <= len(added):
+                    return path, added[line - 1][0], added[line - 1][1]
+            elif stage == "secrets":
+                entry = self.by_new_line.get((path, line))
+                if entry is not None:
+                    return entry
+            elif line <= len(self.entries):
+                return self.entries[line - 1]
+        return path, None, ""
+
+
+def finding_fingerprints(diff: str, stages: Dict[str, Iterable[Dict[str, Any]]]) -> Dict[str, List[int]]:
+    """Fingerprints of each stage's findings (``static``, ``lint`` or ``secrets``) in ``diff``, in order."""
+    view = _View(diff)
+    out: Dict[str, List[int]] = {}
+    for stage, findings in stages.items():
+        fps = []
+        for f in findings or []:
+            if f.get("type") == workers.LIMIT_TYPE:
+                # analysis that did not finish is never treated as known
+                fps.append(0)
+                continue
+            path, text, symbol = view.locate(f, stage)
+            rule = str(f.get("rule") or f.get("type") or stage)
+            fps.append(fingerprint(rule, path, text if text is not None else str(f.get("message", "")), symbol))
+        out[stage] = fps
+    return out
+
+
+class FingerprintSet:
+    """Read-only, memory-mapped fingerprint table written by ``write_set``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.capacity, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or self.capacity & (self.capacity - 1) or len(self._mm) != _HEADER.size + _SLOT.size * self.capacity:
+            self._mm.close()
+            raise ValueError(f"{path} is not a findings baseline")
+        self._mask = self.capacity - 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, fp: int) -> bool:
+        # 0 marks an empty slot, and is the fingerprint of findings that must never be suppressed
+        i = fp & self._mask
+        while True:
+            slot = _SLOT.unpack_from(self._mm, _HEADER.size + _SLOT.size * i)[0]
+            if slot == 0:
+                return False
+            if slot == fp:
+                return True
+            i = (i + 1) & self._mask
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+def write_set(path: str, fingerprints: Iterable[int]) -> int:
+    """Write ``fingerprints`` as a hash table file (atomically); returns the number stored."""
+    unique = set(fingerprints)
+    unique.discard(0)
+    capacity = 1 << max(4, (2 * len(unique) - 1).bit_length())
+    mask = capacity - 1
+    slots = array.array("Q", bytes(_SLOT.size * capacity))
+    for fp in unique:
+        i = fp & mask
+        while slots[i]:
+            i = (i + 1) & mask
+        slots[i] = fp
+    if sys.byteorder != "little":
+        slots.byteswap()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(_HEADER.pack(MAGIC, capacity, len(unique)))
+        slots.tofile(fh)
+    os.replace(tmp, path)
+    return len(unique)
+
+
+_sets: Dict[str, Tuple[float, FingerprintSet]] = {}
+_sets_lock = threading.Lock()
+
+
+def resolve_path(path: str | None = None, repo: str | None = None) -> str | None:
+    """Baseline file for a review: ``path``, ``AUTOPR_BASELINE_FILE``, or the repository default if present."""
+    path = path or os.getenv("AUTOPR_BASELINE_FILE")
+    if path:
+        return path
+    if repo:
+        candidate = os.path.join(repo, DEFAULT_PATH)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def get_set(path: str | None = None, repo: str | None = None) -> FingerprintSet | None:
+    """Mapped baseline (see ``resolve_path``), reopened when the file changes; None without one."""
+    path = resolve_path(path, repo)
+    if path is None:
+        return None
+    mtime = os.path.getmtime(path)
+    with _sets_lock:
+        cached = _sets.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    opened = FingerprintSet(path)
+    with _sets_lock:
+        _sets[path] = (mtime, opened)
+    return opened
+
+
+def filter_new(diff: str, fps: FingerprintSet, stages: Dict[str, List[Dict[str, Any]]]) -> Tuple[Dict[str, List[Dict[str, Any]]], int]:
+    """Drop findings already in the baseline; returns the remaining findings per stage and how many were dropped."""
+    prints = finding_fingerprints(diff, stages)
+    kept: Dict[str, List[Dict[str, Any]]] = {}
+    dropped = 0
+    for stage, findings in stages.items():
+        kept[stage] = [f for f, fp in zip(findings or [], prints[stage]) if fp not in fps]
+        dropped += len(findings or []) - len(kept[stage])
+    return kept, dropped
+
+
+def review_baseline(diff: str, static: Any, lint_findings: Any, secrets: Any, path: str | None = None, repo: str | None = None) -> Dict[str, Any] | None:
+    """The ``baseline`` review stage: new findings per stage plus a summary, or None without a baseline."""
+    fps = get_set(path, repo)
+    if fps is None:
+        return None
+    kept, dropped = filter_new(diff, fps, {"static": list(static or []), "lint": list(lint_findings or []), "secrets": list(secrets or [])})
+    return {"path": fps.path, "entries": len(fps), "suppressed": dropped, "findings": kept}
+
+
+def new_file_diff(path: str, text: str) -> str:
+    """``text`` as the diff that adds ``path``."""
+    lines = text.splitlines()
+    body = "".join(f"+{ln}\n" for ln in lines)
+    return f"diff --git a/{path} b/{path}\n--- /dev/null\n+++ b/{path}\n@@ -0,0 +1,{len(lines)} @@\n{body}"
+
+
+def file_fingerprints(path: str, text: str) -> List[int]:
+    """Fingerprints of the deterministic findings in a whole file, as a review of adding it would see them."""
+    diff = new_file_diff(path, text)
+    static = workers.analyze_unit(diff, "python", path)
+    for f in static:
+        f["file"] = path
+    stages = {
+        "static": static,
+        "lint": lint.run_basic_lint(diff),
+        "secrets": secret_scan.scan_diff(diff),
+    }
+    return [fp for fps in finding_fingerprints(diff, stages).values() for fp in fps]
+
+
+def _blobs(repo: str, ref: str, paths: Sequence[Tuple[str, str]]) -> Iterator[Tuple[str, bytes]]:
+    # one 'git cat-file --batch' process streams every blob; ids are fed from a thread so neither pipe fills up
+    proc = subprocess.Popen(["git", "-C", repo, "cat-file", "--batch"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def feed() -> None:
+        try:
+            for _, sha in paths:
+                proc.stdin.write(sha.encode("ascii") + b"\n")
+        finally:
+            proc.stdin.close()
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        for path, _ in paths:
+            header = proc.stdout.readline().split()
+            size = int(header[2])
+            data = proc.stdout.read(size)
+            proc.stdout.read(1)
+            yield path, data
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        writer.join()
+
+
+def snapshot(repo: str, ref: str = "HEAD", output: str | None = None, exclude: Sequence[str] | None = None, max_file_lines: int | None = None, jobs: int | None = None) -> Dict[str, Any]:
+    """Fingerprint the deterministic findings of every file at ``ref`` into ``output``.
+
+    Binary, generated (``linguist-generated``/``linguist-vendored``) and
+    excluded files (``exclude`` globs, default ``AUTOPR_GIT_EXCLUDE``) are left
+    out, as are files over ``max_file_lines`` (``AUTOPR_GIT_MAX_FILE_LINES``),
+    which reviews skip too.
+    """
+    output = output or os.getenv("AUTOPR_BASELINE_FILE") or os.path.join(repo, DEFAULT_PATH)
+    exclude = gitdiff._exclude_patterns() if exclude is None else list(exclude)
+    if max_file_lines is None:
+        max_file_lines = int(os.getenv("AUTOPR_GIT_MAX_FILE_LINES", "5000"))
+    tree = gitdiff._git(repo, "ls-tree", "-r", "-z", ref).decode("utf-8", "surrogateescape").split("\0")
+    files: List[Tuple[str, str]] = []
+    skipped = 0
+    for record in tree:
+        if not record:
+            continue
+        meta, path = record.split("\t", 1)
+        mode, kind, sha = meta.split()
+        # symlinks and submodules have no source to analyze
+        if kind != "blob" or mode == "120000":
+            continue
+        if any(fnmatch.fnmatch(path, p) for p in exclude):
+            skipped += 1
+        else:
+            files.append((path, sha))
+    generated = gitdiff._generated(repo, [p for p, _ in files])
+    files = [(p, sha) for p, sha in files if p not in generated]
+    skipped += len(generated)
+
+    pool = workers.get_pool()
+    jobs = jobs or (pool.size if pool is not None else 1)
+    fingerprints: List[int] = []
+    analyzed = 0
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="autopr-baseline") as ex:
+        pending: collections.deque = collections.deque()
+        for path, data in _blobs(repo, ref, files):
+            if b"\0" in data[:8000] or data.count(b"\n") > max_file_lines:
+                skipped += 1
+                continue
+            pending.append(ex.submit(file_fingerprints, path, data.decode("utf-8", "replace")))
+            analyzed += 1
+            # bounded read-ahead keeps memory flat on large trees
+            while len(pending) > jobs * 4:
+                fingerprints.extend(pending.popleft().result())
+        while pending:
+            fingerprints.extend(pending.popleft().result())
+    entries = write_set(output, fingerprints)
+    return {"path": output, "ref": ref, "files": analyzed, "skipped": skipped, "findings": len(fingerprints), "entries": entries}
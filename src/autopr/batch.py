@@ -0,0 +1,180 @@
+"""Batch reviews over JSONL inputs (backfills over historical PRs).
+
+Each input line is a JSON object with a ``diff`` and optionally ``id``,
+``commits``, ``issue``, ``test_log``, ``coverage_before`` and ``coverage_after``.
+Each output line is ``{"id": ..., "review": {...}}`` or ``{"id": ..., "error": "..."}``.
+
+Inputs are streamed, so memory stays flat regardless of file size. The
+deterministic stages run on a process pool (they are CPU bound) while LLM calls
+run with a bounded number of concurrent requests. Results are appended to the
+output as they complete and flushed, so the output file doubles as the
+checkpoint: re-running with the same output skips ids that already have a
+review there. Items that ended in an error (shed, provider outage) are tried
+again and their new record is appended; the last record for an id wins.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Set, TextIO
+
+from . import fastpath, reviewer, scheduler
+from .findings import json_default
+from .llm import llm, provider_for
+
+
+def item_id(item: Dict[str, Any], lineno: int | None = None) -> str:
+    """Id of a batch item: explicit ``id``, else a hash of the diff."""
+    if item.get("id") is not None:
+        return str(item["id"])
+    if isinstance(item.get("diff"), str):
+        return hashlib.sha256(item["diff"].encode("utf-8")).hexdigest()[:16]
+    return f"line:{lineno}"
+
+
+def read_items(fh: TextIO) -> Iterator[Dict[str, Any]]:
+    """Yield batch items from a JSONL stream; undecodable lines become error items."""
+    for lineno, line in enumerate(fh, start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield {"id": f"line:{lineno}", "_error": f"invalid JSON: {e}"}
+            continue
+        if not isinstance(item, dict):
+            item = {"_error": "expected a JSON object"}
+        item.setdefault("id", item_id(item, lineno))
+        yield item
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids already reviewed in an output file (error records do not count).
+
+    A line cut short by a crash is dropped (the file is truncated to the last
+    complete line) so the affected item is simply reviewed again.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as fh:
+        good = 0
+        for line in fh:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                rec = json.loads(line)
+                if "review" in rec:
+                    done.add(str(rec["id"]))
+            except (ValueError, KeyError, TypeError):
+                break
+            good += len(line)
+        fh.truncate(good)
+    return done
+
+
+def _review_kwargs(item: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(item.get("diff"), str):
+        raise ValueError("item has no diff")
+    return {
+        "diff": item["diff"],
+        "commits": list(item.get("commits") or []),
+        "issue_text": item.get("issue"),
+        "test_log": item.get("test_log"),
+        "coverage_before": item.get("coverage_before"),
+        "coverage_after": item.get("coverage_after"),
+    }
+
+
+def _deterministic(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    # module-level so it can be pickled for the process pool
+    return reviewer.deterministic_review(**kwargs)
+
+
+async def iter_reviews(items: Iterable[Dict[str, Any]], jobs: int = 1, llm_concurrency: int = 4, admission: Any = None) -> AsyncIterator[Dict[str, Any]]:
+    """Review ``items`` and yield result records in completion order.
+
+    ``jobs`` > 1 runs the deterministic stages on that many worker processes;
+    otherwise they share the LLM thread pool. At most ``llm_concurrency`` LLM
+    calls are in flight, and input is only pulled as results drain. With an
+    ``admission`` controller (the API's) every item waits for a slot; an item
+    that is shed becomes an error record.
+    """
+    loop = asyncio.get_running_loop()
+    llm_pool = ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="autopr-batch-llm")
+    # never fork the calling process: its threads' locks would be copied mid-use
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    det_pool: Executor = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context(method)) if jobs > 1 else llm_pool
+    sem = asyncio.Semaphore(llm_concurrency)
+    max_inflight = max(jobs, llm_concurrency) * 2
+
+    async def one(item: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            if "_error" in item:
+                raise ValueError(item["_error"])
+            kwargs = _review_kwargs(item)
+            if admission is None:
+                return {"id": item["id"], "review": await review(kwargs)}
+            async with admission.slot(scheduler.estimate_cost(kwargs["diff"])):
+                return {"id": item["id"], "review": await review(kwargs)}
+        except scheduler.Overloaded as e:
+            return {"id": item["id"], "error": f"server overloaded ({e.reason}), retry later"}
+        except Exception as e:
+            return {"id": item["id"], "error": str(e)}
+
+    async def review(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # the route (model choice) depends on the deterministic results, which take milliseconds
+        det = await loop.run_in_executor(det_pool, _deterministic, kwargs)
+        if det.get("_fast_path"):
+            raw = fastpath.review(det["_fast_path"])
+        else:
+            provider = provider_for(det["_route"]["route"], llm) if det.get("_route") else llm
+            async with sem:
+                raw = await loop.run_in_executor(llm_pool, provider.review_code, kwargs["diff"])
+        return reviewer.merge_review(raw, det)
+
+    pending: Set[asyncio.Future] = set()
+    try:
+        for item in items:
+            if len(pending) >= max_inflight:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    yield fut.result()
+            pending.add(asyncio.ensure_future(one(item)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+        llm_pool.shutdown(wait=False)
+        if det_pool is not llm_pool:
+            det_pool.shutdown(wait=False)
+
+
+def run_batch(input_path: str, output_path: str, jobs: int = 1, llm_concurrency: int = 4, resume: bool = True) -> Dict[str, int]:
+    """Review every item of ``input_path`` into ``output_path``; returns counters."""
+    done = completed_ids(output_path) if resume else set()
+    stats = {"reviewed": 0, "errors": 0, "skipped": 0}
+
+    def pending(fh: TextIO) -> Iterator[Dict[str, Any]]:
+        for item in read_items(fh):
+            if item["id"] in done:
+                stats["skipped"] += 1
+                continue
+            yield item
+
+    async def drive() -> None:
+        with open(input_path, "r", encoding="utf-8") as src, open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+            async for rec in iter_reviews(pending(src), jobs=jobs, llm_concurrency=llm_concurrency):
+                out.write(json.dumps(rec, default=json_default) + "\n")
+                out.flush()
+                stats["errors" if "error" in rec else "reviewed"] += 1
+
+    asyncio.run(drive())
+    return stats
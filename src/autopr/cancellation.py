@@ -0,0 +1,121 @@
+"""Cooperative cancellation for reviews that have been superseded.
+
+A ``CancelToken`` is installed for the current context with ``scope``. The
+review pipeline, the hedging and resilience layers and the instrumented
+provider proxy check it before starting a provider call, between retries and
+while waiting on running calls. A cancelled review raises ``Cancelled`` at the
+next check point, and queued provider calls are never sent. A provider request
+already on the wire cannot be interrupted, so its result is discarded.
+
+``Cancelled`` derives from ``BaseException`` (like ``asyncio.CancelledError``)
+so the ``except Exception`` fallbacks along the way do not turn a cancellation
+into a degraded review.
+
+Worker threads do not inherit context variables; code that hands work to an
+executor submits it through ``contextvars.copy_context().run`` so the token
+follows it.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional, Set, Tuple
+
+# how often blocking waits re-check the token (seconds)
+POLL_INTERVAL = 0.05
+
+
+class Cancelled(BaseException):
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelToken:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def check(self) -> None:
+        """Raise ``Cancelled`` if the token has been cancelled."""
+        if self._event.is_set():
+            raise Cancelled(self.reason or "cancelled")
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until cancelled or ``timeout`` elapses; True if cancelled."""
+        return self._event.wait(timeout)
+
+
+_current: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("autopr_cancel_token", default=None)
+
+
+def current() -> Optional[CancelToken]:
+    return _current.get()
+
+
+@contextmanager
+def scope(token: CancelToken) -> Iterator[CancelToken]:
+    """Make ``token`` the current token for this context."""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+def check() -> None:
+    """Raise ``Cancelled`` if the current context's token has been cancelled."""
+    token = _current.get()
+    if token is not None:
+        token.check()
+
+
+def sleep(seconds: float) -> None:
+    """``time.sleep`` that wakes up (and raises) as soon as the current token is cancelled."""
+    token = _current.get()
+    if token is None:
+        time.sleep(seconds)
+        return
+    if token.wait(seconds):
+        token.check()
+
+
+def wait_first(futures: Iterable[Future], timeout: float | None = None) -> Tuple[Set[Future], Set[Future]]:
+    """``wait(..., return_when=FIRST_COMPLETED)`` that raises ``Cancelled`` when the current token fires."""
+    token = _current.get()
+    if token is None:
+        return wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+    futures = list(futures)
+    end = None if timeout is None else time.monotonic() + timeout
+    while True:
+        token.check()
+        step = POLL_INTERVAL if end is None else max(0.0, min(POLL_INTERVAL, end - time.monotonic()))
+        done, pending = wait(futures, timeout=step, return_when=FIRST_COMPLETED)
+        if done or (end is not None and time.monotonic() >= end):
+            token.check()
+            return done, pending
+
+
+def result(future: Future, timeout: float | None = None) -> Any:
+    """``future.result(timeout)`` that cancels the future and raises ``Cancelled`` when the current token fires."""
+    try:
+        done, _ = wait_first([future], timeout)
+    except Cancelled:
+        future.cancel()
+        raise
+    if not done:
+        raise FutureTimeout()
+    return future.result()
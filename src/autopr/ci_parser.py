@@ -2,11 +2,37 @@
 
 This parser focuses on pytest output (the textual summary) and extracts
 counts of passed, failed, and errored tests, plus captured failure snippets.
+
+When a shared fixture breaks, thousands of tests fail the same way. Failures
+are therefore grouped by a normalized signature: the exception type, the
+innermost frames without line numbers, and the error message with hex
+addresses, paths and numbers masked. Grouping is one dict lookup per failure.
+The summary keeps the largest clusters (count plus example tests) and only the
+first few individual failures, so its size does not grow with the number of
+failing tests.
 """
 from __future__ import annotations
 
+import hashlib
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+
+# bounds on what a summary carries, however many tests fail
+MAX_FAILURES = 20
+MAX_CLUSTERS = 20
+MAX_EXAMPLES = 3
+SIGNATURE_FRAMES = 3
+
+_SEPARATOR = re.compile(r"_{2,}")
+_HEADER = re.compile(r"_{2,}\s*(?P<name>test[\w\-\[\]:.]+)\s*_{2,}")
+# 'path.py:12: in helper' / 'path.py:30: KeyError' (long and short tracebacks)
+_FRAME = re.compile(r"^(?P<path>[^\s:][^:]*):\d+: (?:in (?P<func>\S+)|(?P<exc>[A-Za-z_][\w.]*))$")
+# '  File "path.py", line 12, in helper' (native tracebacks)
+_NATIVE_FRAME = re.compile(r'^\s*File "(?P<path>[^"]+)", line \d+, in (?P<func>\S+)')
+_EXCEPTION = re.compile(r"^(?P<type>[A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Failed|Failure|Warning))(?::\s*(?P<rest>.*))?$")
+_HEX = re.compile(r"0x[0-9a-fA-F]+")
+_PATH = re.compile(r"(?:[A-Za-z]:)?[\w.~-]*(?:[/\\][\w.-]+)+")
+_NUMBER = re.compile(r"\d+")
 
 
 def parse_pytest_output(log: str) -> Dict[str, Any]:
@@ -18,7 +44,10 @@ def parse_pytest_output(log: str) -> Dict[str, Any]:
       - failed: int
       - errors: int
       - skipped: int
-      - failures: list of dict {name, message}
+      - failures: list of dict {name, message}, the first ``MAX_FAILURES``
+      - failures_omitted: int, failures left out of ``failures``
+      - failure_clusters: list of clusters (see ``cluster_failures``)
+      - clusters_omitted: int, clusters past ``MAX_CLUSTERS``
     """
     res = {"total": 0, "passed": 0, "failed": 0, "errors": 0, "skipped": 0, "failures": []}
 
@@ -42,6 +71,7 @@ def parse_pytest_output(log: str) -> Dict[str, Any]:
     res["total"] = res["passed"] + res["failed"] + res["errors"] + res["skipped"]
 
     # Extract failure blocks - look for the 'FAILURES' section
+    records: List[Dict[str, Any]] = []
     if "FAILURES" in log:
         lines = log.splitlines()
         try:
@@ -51,22 +81,25 @@ def parse_pytest_output(log: str) -> Dict[str, Any]:
 
         # scan from start for header lines that mark a test failure (lines of underscores + test name)
         i = start
-        current = None
         while i < len(lines):
             ln = lines[i].rstrip()
             # match lines like: '____ test_name ____'
-            m = re.match(r"_{2,}\s*(?P<name>test[\w\-\[\]:.]+)\s*_{2,}", ln)
+            m = _HEADER.match(ln)
             if m:
                 # start a new failure capture
                 name = m.group('name')
                 # gather message lines until next separator or blank
                 j = i + 1
                 message_lines = []
-                while j < len(lines) and lines[j].strip() and not lines[j].startswith('=') and not re.match(r"_{2,}", lines[j]):
+                while j < len(lines) and lines[j].strip() and not lines[j].startswith('=') and not _SEPARATOR.match(lines[j]):
                     message_lines.append(lines[j].strip())
                     j += 1
-                res["failures"].append({"name": name, "message": " ".join(message_lines)})
-                i = j
+                # the rest of the block (up to the next section) holds the traceback
+                k = j
+                while k < len(lines) and not lines[k].startswith('=') and not _SEPARATOR.match(lines[k]):
+                    k += 1
+                records.append(_failure_record(name, " ".join(message_lines), lines[i + 1:k]))
+                i = k
                 continue
             i += 1
 
@@ -75,6 +108,75 @@ def parse_pytest_output(log: str) -> Dict[str, Any]:
         for line in log.splitlines():
             m = re.match(r"FAILED\s+([^\s:]+).*?-\s*(.*)$", line)
             if m:
-                res["failures"].append({"name": m.group(1), "message": m.group(2)})
+                records.append(_failure_record(m.group(1), m.group(2), [m.group(2)]))
 
+    res["failures"] = [{"name": r["name"], "message": r["message"]} for r in records[:MAX_FAILURES]]
+    res["failures_omitted"] = max(0, len(records) - MAX_FAILURES)
+    res["failure_clusters"], res["clusters_omitted"] = cluster_failures(records)
     return res
+
+
+def normalize_message(message: str) -> str:
+    """``message`` with hex addresses, paths and numbers masked and whitespace collapsed."""
+    message = _HEX.sub("<addr>", message)
+    message = _PATH.sub("<path>", message)
+    message = _NUMBER.sub("#", message)
+    return " ".join(message.split())[:200]
+
+
+def _failure_record(name: str, message: str, block: List[str]) -> Dict[str, Any]:
+    """Name, message, exception type, frames and error line of one failure block."""
+    frames: List[str] = []
+    exception: Optional[str] = None
+    error: Optional[str] = None
+    for raw in block:
+        ln = raw.rstrip()
+        fm = _FRAME.match(ln) or _NATIVE_FRAME.match(ln)
+        if fm:
+            func = fm.group("func")
+            frames.append(f"{fm.group('path')}:{func}" if func else fm.group("path"))
+            exc = fm.groupdict().get("exc")
+            if exc:
+                exception = exc
+            continue
+        if error is None:
+            if ln.startswith("E ") and ln[1:].strip():
+                error = ln[1:].strip()
+            elif _EXCEPTION.match(ln):
+                # native tracebacks end with an unprefixed 'Type: message' line
+                error = ln
+    text = error if error is not None else message
+    em = _EXCEPTION.match(text)
+    if em:
+        exception = exception or em.group("type")
+        text = em.group("rest") or ""
+    # pytest puts a blank line after the header, so the error line is often the only message there is
+    return {"name": name, "message": message or error or "", "exception": exception, "frames": frames, "error": text}
+
+
+def failure_signature(record: Dict[str, Any]) -> Tuple[str, Tuple[str, ...], str]:
+    """Exception type, innermost frames and normalized message of a failure."""
+    return (record.get("exception") or "", tuple(record.get("frames", [])[-SIGNATURE_FRAMES:]), normalize_message(record.get("error") or ""))
+
+
+def cluster_failures(records: List[Dict[str, Any]], max_clusters: int = MAX_CLUSTERS, max_examples: int = MAX_EXAMPLES) -> Tuple[List[Dict[str, Any]], int]:
+    """Group failure records by signature, largest first; returns the clusters and how many were left out.
+
+    Each cluster has ``signature`` (a short hash), ``exception``, ``frames``,
+    ``message`` (normalized), ``count``, ``examples`` (test names) and
+    ``sample`` (the first failure's message as logged).
+    """
+    clusters: Dict[Tuple[str, Tuple[str, ...], str], Dict[str, Any]] = {}
+    for record in records:
+        key = failure_signature(record)
+        cluster = clusters.get(key)
+        if cluster is None:
+            exception, frames, message = key
+            digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:12]
+            cluster = clusters[key] = {"signature": digest, "exception": exception or None, "frames": list(frames), "message": message, "count": 0, "examples": [], "sample": record.get("message", "")}
+        cluster["count"] += 1
+        if len(cluster["examples"]) < max_examples:
+            cluster["examples"].append(record["name"])
+    # sorted() is stable, so equal counts keep first-seen order
+    ordered = sorted(clusters.values(), key=lambda c: -c["count"])
+    return ordered[:max_clusters], max(0, len(ordered) - max_clusters)
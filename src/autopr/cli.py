@@ -1,11 +1,18 @@
 import json
+import os
 import click
 from typing import Optional
 
-from autopr.llm import llm
-from autopr import reviewer
-from autopr.generator import generate_pr_from
-from autopr import analysis
+from autopr.findings import json_default
+
+# Subcommands import their modules lazily so that e.g. `pr-ai ci-parse` never pays for
+# the review stack or an LLM SDK; the provider itself is only built on first use.
+
+
+def _run(command: str, **kwargs):
+    """Run a command in the warm daemon if one is listening, else in-process."""
+    from autopr import daemon
+    return daemon.forward_or_run(command, kwargs)
 
 
 @click.group()
@@ -20,21 +27,43 @@ def cli():
 def generate(diff: str, commits: tuple[str, ...], issue: Optional[str]):
     """Generate PR title/description (mock)"""
     commits_list = list(commits) if commits else []
-    out = generate_pr_from(diff, commits_list, issue)
-    click.echo(json.dumps(out, indent=2))
+    out = _run("gen", diff=diff, commits=commits_list, issue=issue)
+    click.echo(json.dumps(out, indent=2, default=json_default))
 
 
 @cli.command(name="review")
-@click.option("--diff", required=True, help="Diff or code snippet")
+@click.option("--diff", required=False, help="Diff or code snippet")
+@click.option("--repo", required=False, help="Read the diff and commit subjects from this git repository (with --base/--head)")
+@click.option("--base", required=False, help="Base commit for --repo")
+@click.option("--head", required=False, default="HEAD", show_default=True, help="Head commit for --repo")
+@click.option("--exclude", required=False, multiple=True, help="Glob of paths to leave out with --repo (also AUTOPR_GIT_EXCLUDE)")
 @click.option("--commits", required=False, multiple=True, help="Commit messages to consider")
 @click.option("--issue", required=False, help="Issue text or short description to check alignment")
 @click.option("--test-log", required=False, help="Path to a pytest log file to include in validation")
 @click.option("--coverage-before", required=False, help="Path to a coverage report for baseline")
 @click.option("--coverage-after", required=False, help="Path to a coverage report for PR run")
-def review(diff: str, commits: tuple[str, ...], issue: str | None, test_log: str | None, coverage_before: str | None, coverage_after: str | None):
+@click.option("--profile", is_flag=True, default=None, help="Attach per-stage timing/memory (_perf); also AUTOPR_PROFILE=1")
+@click.option("--ownership", required=False, help="CODEOWNERS-style path-to-component map; review each component separately (also AUTOPR_OWNERSHIP_FILE)")
+@click.option("--baseline", required=False, help="Findings baseline from baseline-findings; report only new findings (also AUTOPR_BASELINE_FILE)")
+def review(diff: str | None, repo: str | None, base: str | None, head: str, exclude: tuple[str, ...], commits: tuple[str, ...], issue: str | None, test_log: str | None, coverage_before: str | None, coverage_after: str | None, profile: bool | None, ownership: str | None, baseline: str | None):
     # Gather options passed by Click
     commits_list = list(commits) if commits else []
 
+    git_info = None
+    if repo:
+        if diff is not None or not base:
+            raise click.UsageError("--repo needs --base (and optionally --head) and cannot be combined with --diff")
+        from autopr import gitdiff
+        try:
+            git_info = gitdiff.collect(repo, base, head, exclude=list(exclude) or None)
+        except gitdiff.GitError as e:
+            raise click.ClickException(str(e))
+        diff = git_info.pop("diff")
+        git_commits = git_info.pop("commits")
+        commits_list = commits_list or git_commits
+    elif diff is None:
+        raise click.UsageError("pass --diff or --repo/--base")
+
     test_log_content = None
     if test_log:
         try:
@@ -57,8 +86,75 @@ def review(diff: str, commits: tuple[str, ...], issue: str | None, test_log: str
                 coverage_after_content = f.read()
         except Exception as e:
             click.echo(f"Warning: failed to read coverage_after: {e}")
-    out = reviewer.review_pr(diff, commits=commits_list, issue_text=issue, test_log=test_log_content, coverage_before=coverage_before_content, coverage_after=coverage_after_content)
-    click.echo(json.dumps(out, indent=2))
+    out = _run("review", diff=diff, commits=commits_list, issue_text=issue, test_log=test_log_content, coverage_before=coverage_before_content, coverage_after=coverage_after_content, profile=profile, ownership=os.path.abspath(ownership) if ownership else None, repo=os.path.abspath(repo) if repo else None, baseline=os.path.abspath(baseline) if baseline else None)
+    if git_info is not None:
+        out["_git"] = dict(git_info, base=base, head=head)
+    click.echo(json.dumps(out, indent=2, default=json_default))
+
+
+@cli.command(name="review-batch")
+@click.option("--input", "input_path", required=True, help="JSONL file with one review request per line")
+@click.option("--output", "output_path", required=True, help="JSONL file results are appended to (also the resume checkpoint)")
+@click.option("--jobs", default=1, show_default=True, help="Worker processes for the deterministic stages")
+@click.option("--llm-concurrency", default=4, show_default=True, help="Maximum concurrent LLM calls")
+@click.option("--resume/--no-resume", default=True, show_default=True, help="Skip ids already present in --output")
+def review_batch(input_path: str, output_path: str, jobs: int, llm_concurrency: int, resume: bool):
+    """Review many diffs from a JSONL file, writing results incrementally."""
+    from autopr import batch
+    stats = batch.run_batch(input_path, output_path, jobs=jobs, llm_concurrency=llm_concurrency, resume=resume)
+    click.echo(json.dumps(stats))
+
+
+@cli.command(name="review-incremental")
+@click.option("--key", required=True, help="Stable PR identifier, e.g. owner/repo#123")
+@click.option("--head", "head_sha", required=True, help="Head commit SHA being reviewed")
+@click.option("--diff-file", required=True, help="Full PR diff (base to head)")
+@click.option("--interdiff-file", required=False, help="Diff from the previously reviewed head to --head; omit for a full review")
+@click.option("--commits", required=False, multiple=True, help="Commit messages of the PR, oldest first")
+@click.option("--issue", required=False, help="Issue text or short description")
+@click.option("--state-dir", envvar="AUTOPR_STATE_DIR", default=".autopr-state", show_default=True, help="Where per-PR review state is kept")
+def review_incremental(key: str, head_sha: str, diff_file: str, interdiff_file: str | None, commits: tuple[str, ...], issue: str | None, state_dir: str):
+    """Review a PR push, amending the stored description and review from the interdiff."""
+    from autopr import incremental
+    with open(diff_file, "r", encoding="utf-8") as f:
+        diff = f.read()
+    interdiff = None
+    if interdiff_file:
+        with open(interdiff_file, "r", encoding="utf-8") as f:
+            interdiff = f.read()
+    out = incremental.review_incremental(key, head_sha, diff, commits=list(commits), interdiff=interdiff, issue=issue, store=incremental.StateStore(state_dir))
+    click.echo(json.dumps(out, indent=2, default=json_default))
+
+
+@cli.command(name="index")
+@click.option("--repo", default=".", show_default=True, help="Repository to index")
+@click.option("--jobs", default=None, type=int, help="Parser processes for the (re)build (default: all cores, or AUTOPR_INDEX_JOBS)")
+@click.option("--query", required=False, help="Print definitions, call sites and importers of this name after updating")
+def index(repo: str, jobs: int | None, query: str | None):
+    """Build or update the repository symbol index used for impact analysis."""
+    from autopr import symbol_index
+    idx = symbol_index.SymbolIndex(repo)
+    out = {"db": idx.db_path, "update": idx.update(jobs=jobs)}
+    if query:
+        out["definitions"] = idx.definitions(query)
+        out["call_sites"] = idx.call_sites(query)
+        out["importers"] = idx.importers(query)
+    click.echo(json.dumps(out, indent=2, default=json_default))
+
+
+@cli.command(name="baseline-findings")
+@click.option("--repo", default=".", show_default=True, help="Repository to snapshot")
+@click.option("--ref", default="HEAD", show_default=True, help="Branch or commit whose findings become the baseline")
+@click.option("--output", required=False, help="Fingerprint file to write (default: AUTOPR_BASELINE_FILE or <repo>/.autopr/findings-baseline.bin)")
+@click.option("--exclude", required=False, multiple=True, help="Glob of paths to leave out (also AUTOPR_GIT_EXCLUDE)")
+def baseline_findings(repo: str, ref: str, output: str | None, exclude: tuple[str, ...]):
+    """Record the deterministic findings of a branch so reviews report only new ones."""
+    from autopr import baseline, gitdiff
+    try:
+        out = baseline.snapshot(repo, ref, output=output, exclude=list(exclude) or None)
+    except gitdiff.GitError as e:
+        raise click.ClickException(str(e))
+    click.echo(json.dumps(out, indent=2, default=json_default))
 
 
 @cli.command(name="analyze")
@@ -66,30 +162,28 @@ def review(diff: str, commits: tuple[str, ...], issue: str | None, test_log: str
 @click.option("--lang", required=False, default="python", help="Language for analysis (default: python)")
 def analyze(diff: str, lang: str):
     """Run the static analyzer on a diff or snippet and print findings."""
-    out = analysis.analyze_diff(diff, language=lang)
-    click.echo(json.dumps(out, indent=2))
+    out = _run("analyze", diff_text=diff, language=lang)
+    click.echo(json.dumps(out, indent=2, default=json_default))
 
 
 @cli.command(name="ci-parse")
 @click.option("--log", required=True, help="Path to pytest log or CI log file")
 def ci_parse(log: str):
     """Parse a pytest/CI log and print a summary."""
-    from autopr import ci_parser
     try:
         with open(log, 'r', encoding='utf-8') as f:
             data = f.read()
     except Exception as e:
         click.echo(f"Failed to read log: {e}")
         return
-    out = ci_parser.parse_pytest_output(data)
-    click.echo(json.dumps(out, indent=2))
+    out = _run("ci-parse", log=data)
+    click.echo(json.dumps(out, indent=2, default=json_default))
 
 
 @cli.command(name="coverage-compare")
 @click.option("--before", required=True, help="Path to before coverage summary")
 @click.option("--after", required=True, help="Path to after coverage summary")
 def coverage_compare(before: str, after: str):
-    from autopr import coverage_utils
     try:
         with open(before, 'r', encoding='utf-8') as f:
             b = f.read()
@@ -98,8 +192,8 @@ def coverage_compare(before: str, after: str):
     except Exception as e:
         click.echo(f"Failed to read files: {e}")
         return
-    out = coverage_utils.compare_coverage(b, a)
-    click.echo(json.dumps(out, indent=2))
+    out = _run("coverage-compare", before_text=b, after_text=a)
+    click.echo(json.dumps(out, indent=2, default=json_default))
 
 
 @cli.command(name="validate-issue")
@@ -107,9 +201,91 @@ def coverage_compare(before: str, after: str):
 @click.option("--diff", required=True, help="Diff or code snippet")
 @click.option("--commits", required=False, multiple=True, help="Commit messages to use")
 def validate_issue(issue: str, diff: str, commits: tuple[str, ...]):
-    from autopr import issue_validator
-    res = issue_validator.simple_issue_alignment(issue, diff, list(commits))
-    click.echo(json.dumps(res, indent=2))
+    res = _run("validate-issue", issue_text=issue, diff=diff, commits=list(commits))
+    click.echo(json.dumps(res, indent=2, default=json_default))
+
+
+@cli.command(name="mock-server")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8099, show_default=True)
+@click.option("--latency", default="lognormal:300,0.6", show_default=True, help="fixed:MS | uniform:LO,HI | lognormal:MEDIAN_MS,SIGMA | exp:MEAN_MS")
+@click.option("--error-rate", default=0.0, show_default=True, help="Fraction of requests answered with 500")
+@click.option("--rate-limit-rate", default=0.0, show_default=True, help="Fraction of requests answered with 429 + Retry-After")
+@click.option("--malformed-rate", default=0.0, show_default=True, help="Fraction of responses truncated mid-JSON")
+@click.option("--seed", default=None, type=int, help="Seed for reproducible fault injection")
+def mock_server(host: str, port: int, latency: str, error_rate: float, rate_limit_rate: float, malformed_rate: float, seed: Optional[int]):
+    """Serve OpenAI/Anthropic-compatible endpoints with injected latency and faults."""
+    from autopr import mockserver
+    config = mockserver.MockConfig(latency=latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate, malformed_rate=malformed_rate, seed=seed)
+    server = mockserver.MockServer((host, port), config)
+    click.echo(json.dumps({"url": server.url, "openai_base_url": server.url + "/v1", "anthropic_base_url": server.url}))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@cli.command(name="loadtest")
+@click.option("--requests", "num_requests", default=200, show_default=True, help="Total requests to send")
+@click.option("--concurrency", default=16, show_default=True, help="Requests in flight")
+@click.option("--endpoint", default="/review", show_default=True, help="/review, /generate, /review/stream or /generate/stream")
+@click.option("--url", default=None, help="Target a running server instead of the in-process app")
+@click.option("--mock/--no-mock", default=False, show_default=True, help="Start a local mock provider and use the real provider code against it")
+@click.option("--provider", type=click.Choice(["openai", "anthropic"]), default="openai", show_default=True, help="Wire format used with --mock")
+@click.option("--latency", default="lognormal:300,0.6", show_default=True, help="Mock latency distribution (see mock-server)")
+@click.option("--error-rate", default=0.0, show_default=True)
+@click.option("--rate-limit-rate", default=0.0, show_default=True)
+@click.option("--malformed-rate", default=0.0, show_default=True)
+@click.option("--seed", default=0, show_default=True)
+def loadtest(num_requests: int, concurrency: int, endpoint: str, url: Optional[str], mock: bool, provider: str, latency: str, error_rate: float, rate_limit_rate: float, malformed_rate: float, seed: int):
+    """Drive the API with synthetic diffs and report throughput and latency percentiles."""
+    from autopr import loadtest as lt, mockserver
+    config = mockserver.MockConfig(latency=latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate, malformed_rate=malformed_rate, seed=seed) if mock else None
+    report = lt.run_loadtest(requests=num_requests, concurrency=concurrency, endpoint=endpoint, url=url, mock=mock, mock_config=config, provider=provider, seed=seed)
+    click.echo(json.dumps(report, indent=2, default=json_default))
+
+
+@cli.group(name="daemon")
+def daemon_group():
+    """Manage the warm pr-ai daemon (Unix socket, see AUTOPR_DAEMON_SOCKET)."""
+
+
+@daemon_group.command(name="start")
+@click.option("--foreground", is_flag=True, help="Serve in this process instead of detaching")
+def daemon_start(foreground: bool):
+    """Start a warm daemon that pr-ai commands forward to."""
+    from autopr import daemon
+    if foreground:
+        daemon.serve()
+        return
+    pid = daemon.start_background()
+    click.echo(json.dumps({"pid": pid, "socket": daemon.socket_path()}))
+
+
+@daemon_group.command(name="stop")
+def daemon_stop():
+    """Stop the running daemon."""
+    from autopr import daemon
+    try:
+        daemon.call("shutdown")
+    except daemon.DaemonUnavailable:
+        click.echo("daemon is not running")
+        return
+    click.echo("daemon stopped")
+
+
+@daemon_group.command(name="status")
+def daemon_status():
+    """Report whether a daemon is listening."""
+    from autopr import daemon
+    try:
+        info = daemon.call("ping", timeout=2)
+    except daemon.DaemonUnavailable:
+        click.echo(json.dumps({"running": False, "socket": daemon.socket_path()}))
+        return
+    click.echo(json.dumps({"running": True, "pid": info["pid"], "socket": daemon.socket_path()}))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+"""Render a review result as the Markdown PR comment.
+
+``render_comment`` takes the ``{"pr": ..., "review": ...}`` object produced by
+``reviewer.review_and_generate`` (or a bare review) and returns the comment
+posted by the GitHub Action and the webhook receiver.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+MAX_FINDINGS = 25
+# failure signatures listed under the test results
+MAX_CLUSTERS = 5
+# hidden marker so tooling can recognise AutoPR comments
+MARKER = "<!-- autopr-review -->"
+
+
+def _fmt(value: Any) -> str:
+    return "N/A" if value is None else str(value)
+
+
+def render_comment(result: Dict[str, Any]) -> str:
+    pr = result.get("pr")
+    review = result.get("review")
+    if pr is None and review is None and "summary" in result:
+        review = result
+    parts: List[str] = [MARKER + "\n", "## 🤖 AutoPR — Automated PR Review\n\n"]
+
+    if pr:
+        parts.append(f"### 📝 Suggested PR Title\n**{pr.get('title') or 'Auto-generated title'}**\n\n")
+        parts.append("### 🔍 Suggested PR Description\n<details><summary>Show description</summary>\n\n")
+        if pr.get("what_changed"):
+            parts.append(f"**What changed:** {pr['what_changed']}\n\n")
+        if pr.get("why"):
+            parts.append(f"**Why:** {pr['why']}\n\n")
+        if pr.get("files_impacted"):
+            parts.append(f"**Files impacted:** {', '.join(pr['files_impacted'])}\n\n")
+        if pr.get("tests"):
+            parts.append(f"**Tests:** {pr['tests']}\n\n")
+        if pr.get("risk_level"):
+            parts.append(f"**Risk level:** {pr['risk_level']}\n\n")
+        if pr.get("rollback_plan"):
+            parts.append(f"**Rollback:** {pr['rollback_plan']}\n\n")
+        parts.append("</details>\n\n")
+
+    if review:
+        parts.append(f"### ✅ Review summary\n{review.get('summary') or ''}\n\n")
+        findings = review.get("findings") or []
+        if findings:
+            parts.append(f"**Findings (top {min(len(findings), MAX_FINDINGS)}):**\n")
+            for f in findings[:MAX_FINDINGS]:
+                parts.append(f"- [{(f.get('severity') or 'info').upper()}] **{f.get('type')}** — {f.get('message')}\n")
+            parts.append("\n")
+
+        tests = review.get("_tests")
+        if tests:
+            parts.append(f"### 🧪 Test results\n- Passed: {tests.get('passed')}  •  Failed: {tests.get('failed')}  •  Errors: {tests.get('errors')}  •  Skipped: {tests.get('skipped')}\n")
+            clusters = tests.get("failure_clusters") or []
+            for c in clusters[:MAX_CLUSTERS]:
+                where = f" in `{c['frames'][-1]}`" if c.get("frames") else ""
+                examples = ", ".join(f"`{n}`" for n in c.get("examples") or [])
+                parts.append(f"- {c.get('count')}× **{c.get('exception') or 'failure'}**{where}: {c.get('message')} (e.g. {examples})\n")
+            more = len(clusters[MAX_CLUSTERS:]) + int(tests.get("clusters_omitted") or 0)
+            if more:
+                parts.append(f"- …and {more} more failure signatures\n")
+            parts.append("\n")
+
+        cov = review.get("_coverage")
+        if cov:
+            parts.append(f"### 📊 Coverage\n- Before: {_fmt(cov.get('before'))}%  •  After: {_fmt(cov.get('after'))}%  •  Δ: {_fmt(cov.get('delta'))}%\n\n")
+
+        ia = review.get("_issue_alignment")
+        if ia:
+            matched = ", ".join(ia.get("matched") or []) or "none"
+            parts.append(f"### 🎯 Issue alignment\n- Score: {float(ia.get('score', 0)):.2f}  •  Matched: {matched}\n\n")
+
+    files = ((pr or {}).get("_context") or {}).get("files_changed") or []
+    if files:
+        parts.append("### 🗂️ Files changed\n- " + "\n- ".join(files) + "\n\n")
+
+    parts.append("---\n*This comment was generated automatically by AutoPR.*")
+    return "".join(parts)
@@ -0,0 +1,210 @@
+"""Warm ``pr-ai`` daemon listening on a Unix domain socket.
+
+Every ``pr-ai`` invocation otherwise re-imports the review stack and rebuilds
+the provider client. ``pr-ai daemon start`` keeps one process warm (provider
+constructed, analyzers imported and exercised once) and the regular commands
+forward to it when the socket answers, falling back to in-process execution
+when it doesn't. The client side only needs ``socket`` and ``json``, so a
+forwarded command costs little more than interpreter start-up.
+
+Protocol: one JSON request per connection, ``{"command": ..., "kwargs": {...}}``,
+answered by one JSON line ``{"ok": true, "result": ...}`` or
+``{"ok": false, "error": "..."}``.
+
+A forwarded command waits at most ``AUTOPR_DAEMON_TIMEOUT`` seconds (default
+300) for the answer; a daemon that is stuck counts as not running, and the
+command runs in-process instead.
+
+Note the daemon uses the environment (provider, keys) it was started with.
+"""
+from __future__ import annotations
+
+import importlib
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from .findings import json_default
+
+
+# above the provider deadline and the review stage timeouts
+DEFAULT_TIMEOUT = 300.0
+
+
+class DaemonUnavailable(Exception):
+    """Raised by ``call`` when no daemon answers on the socket (in time)."""
+
+
+def socket_path() -> str:
+    default = os.path.join(tempfile.gettempdir(), f"autopr-{os.getuid() if hasattr(os, 'getuid') else 'user'}.sock")
+    return os.getenv("AUTOPR_DAEMON_SOCKET", default)
+
+
+def _recv_line(sock: socket.socket) -> bytes:
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b"\n"):
+            break
+    return b"".join(chunks)
+
+
+def call(command: str, kwargs: Dict[str, Any] | None = None, path: str | None = None, timeout: float | None = None) -> Any:
+    """Run ``command`` in the daemon and return its result.
+
+    Raises ``DaemonUnavailable`` if nothing is listening or no answer arrives
+    within ``timeout`` seconds (default ``AUTOPR_DAEMON_TIMEOUT``), and
+    ``RuntimeError`` if the command failed inside the daemon.
+    """
+    path = path or socket_path()
+    if timeout is None:
+        timeout = float(os.getenv("AUTOPR_DAEMON_TIMEOUT", str(DEFAULT_TIMEOUT)))
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        raise DaemonUnavailable(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(path)
+            sock.sendall(json.dumps({"command": command, "kwargs": kwargs or {}}).encode("utf-8") + b"\n")
+            data = _recv_line(sock)
+        except (ConnectionError, FileNotFoundError) as e:
+            # refused, reset or vanished mid-shutdown: treat as not running
+            raise DaemonUnavailable(str(e))
+        except socket.timeout:
+            # stuck or overloaded: the caller runs the command itself rather than wait forever
+            raise DaemonUnavailable(f"no answer from {path} within {timeout:g}s") from None
+    finally:
+        sock.close()
+    if not data:
+        raise DaemonUnavailable("daemon closed the connection")
+    resp = json.loads(data)
+    if not resp.get("ok"):
+        raise RuntimeError(resp.get("error", "daemon command failed"))
+    return resp.get("result")
+
+
+COMMANDS = {
+    "review": "autopr.reviewer:review_pr",
+    "gen": "autopr.generator:generate_pr_from",
+    "analyze": "autopr.analysis:analyze_diff",
+    "ci-parse": "autopr.ci_parser:parse_pytest_output",
+    "coverage-compare": "autopr.coverage_utils:compare_coverage",
+    "validate-issue": "autopr.issue_validator:simple_issue_alignment",
+}
+
+
+def resolve(command: str) -> Callable[..., Any]:
+    """Import the function behind ``command`` (only the module it needs)."""
+    module, _, attr = COMMANDS[command].partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def forward_or_run(command: str, kwargs: Dict[str, Any]) -> Any:
+    """Forward to a running daemon, or run the command in-process.
+
+    Set ``AUTOPR_NO_DAEMON=1`` to always run in-process.
+    """
+    if os.getenv("AUTOPR_NO_DAEMON") != "1":
+        try:
+            return call(command, kwargs)
+        except DaemonUnavailable:
+            pass
+    return resolve(command)(**kwargs)
+
+
+def warm_up() -> None:
+    """Build the provider, start the analysis workers and exercise lint once so first requests are fast."""
+    from . import lint, workers
+    from .llm import llm
+
+    for command in COMMANDS:
+        resolve(command)
+    llm.get()
+    sample = "+import os\n+def f(path):\n+    return open(path).read() == None\n"
+    workers.analyze_diff(sample)
+    lint.run_basic_lint(sample)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        try:
+            req = json.loads(line)
+            name = req.get("command")
+            if name == "shutdown":
+                resp = {"ok": True, "result": None}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            elif name == "ping":
+                resp = {"ok": True, "result": {"pid": os.getpid()}}
+            elif name in COMMANDS:
+                resp = {"ok": True, "result": resolve(name)(**req.get("kwargs", {}))}
+            else:
+                raise ValueError(f"unknown command: {name}")
+        except Exception as e:
+            resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write(json.dumps(resp, default=json_default).encode("utf-8") + b"\n")
+
+
+def make_server(path: str | None = None) -> socketserver.BaseServer:
+    """Bind the daemon socket (replacing a stale one) without serving yet."""
+    path = path or socket_path()
+    if os.path.exists(path):
+        try:
+            call("ping", path=path, timeout=1)
+        except DaemonUnavailable:
+            os.unlink(path)
+        else:
+            raise RuntimeError(f"a daemon is already listening on {path}")
+    server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    server.daemon_threads = True
+    os.chmod(path, 0o600)
+    return server
+
+
+def serve(path: str | None = None) -> None:
+    """Warm up and serve until a ``shutdown`` command arrives."""
+    path = path or socket_path()
+    warm_up()
+    server = make_server(path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def start_background(path: str | None = None, wait: float = 10.0) -> int:
+    """Spawn a detached daemon process and wait until it answers; returns its pid."""
+    path = path or socket_path()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "autopr.daemon", path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        try:
+            return int(call("ping", path=path, timeout=1)["pid"])
+        except DaemonUnavailable:
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+    raise RuntimeError("daemon did not start")
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else None)
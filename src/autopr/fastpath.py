@@ -0,0 +1,188 @@
+"""Deterministic fast path for trivial and non-code diffs.
+
+Some diffs carry no code for a model to review. These are documentation-only,
+lockfile-only, version bumps and whitespace-only changes. ``classify`` detects
+them from the diff and its ``parse_diff`` stats. For these diffs the reviewer and
+the generator use templates instead of calling the provider. The static
+analysis and lint findings are still merged into the review, and the output is
+marked with ``_fast_path``. Such reviews finish in milliseconds and cost no
+tokens.
+
+Set ``AUTOPR_FORCE_LLM=1`` to always call the provider.
+"""
+from __future__ import annotations
+
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+DOC_EXTENSIONS = (".md", ".rst", ".txt", ".adoc")
+DOC_NAMES = ("LICENSE", "LICENCE", "CHANGELOG", "AUTHORS", "CONTRIBUTORS", "NOTICE")
+DOC_DIRS = ("docs/", "doc/")
+LOCKFILES = (
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock", "uv.lock",
+    "Cargo.lock", "go.sum", "Gemfile.lock", "composer.lock", "requirements.lock",
+)
+_VERSION_LINE = re.compile(
+    r"""^\s*["']?(?:__version__|version|"version")["']?\s*[:=]\s*["']?v?\d+(?:\.\d+)*[\w.+-]*["']?,?\s*$"""
+)
+
+# indentation is significant in these, so re-indenting is not a whitespace-only change
+INDENT_SENSITIVE = (".py", ".pyi", ".yaml", ".yml", "Makefile")
+
+_LABELS = {
+    "docs": "documentation-only change",
+    "lockfile": "lockfile-only change",
+    "version_bump": "version bump",
+    "whitespace": "whitespace-only change",
+}
+
+
+def forced_llm() -> bool:
+    return os.getenv("AUTOPR_FORCE_LLM", "").lower() in ("1", "true", "yes")
+
+
+def _changed_lines(diff: str) -> List[Tuple[str, str, str]]:
+    """``(file, sign, text)`` for every added/removed line."""
+    out: List[Tuple[str, str, str]] = []
+    current = ""
+    for line in diff.splitlines():
+        if line.startswith("+++ ") or line.startswith("--- "):
+            name = line[4:].strip()
+            if name != "/dev/null":
+                current = name[2:] if name[:2] in ("a/", "b/") else name
+            continue
+        if line[:1] in ("+", "-"):
+            out.append((current, line[0], line[1:]))
+    return out
+
+
+def _change_blocks(diff: str) -> List[Tuple[str, List[str], List[str]]]:
+    """``(file, removed, added)`` for every run of consecutive changed lines, in diff order."""
+    out: List[Tuple[str, List[str], List[str]]] = []
+    current = ""
+    block: Tuple[str, List[str], List[str]] | None = None
+    for line in diff.splitlines():
+        if line.startswith("+++ ") or line.startswith("--- "):
+            name = line[4:].strip()
+            if name != "/dev/null":
+                current = name[2:] if name[:2] in ("a/", "b/") else name
+            block = None
+            continue
+        if line[:1] in ("+", "-"):
+            if block is None:
+                block = (current, [], [])
+                out.append(block)
+            (block[2] if line[0] == "+" else block[1]).append(line[1:])
+        elif not line.startswith("\\"):
+            # context, hunk header or file header: a later change is a separate block
+            block = None
+    return out
+
+
+def _is_word(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+def _squash(text: str) -> str:
+    """``text`` without insignificant whitespace: runs outside string literals are dropped,
+    or kept as one space where they separate two words; literals are kept verbatim."""
+    out: List[str] = []
+    gap = False
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            gap = True
+            i += 1
+            continue
+        if gap and out and _is_word(out[-1][-1]) and _is_word(c):
+            out.append(" ")
+        gap = False
+        if c in "\"'`":
+            j = i + 1
+            while j < n and text[j] != c:
+                j += 2 if text[j] == "\\" else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def _ws_key(path: str, lines: List[str]) -> Any:
+    if path.endswith(INDENT_SENSITIVE):
+        # line by line, keeping the indentation of every non-blank line
+        return [ln[: len(ln) - len(ln.lstrip())].expandtabs(8) + _squash(ln) for ln in lines if ln.strip()]
+    return _squash("\n".join(lines))
+
+
+def _whitespace_only(diff: str) -> bool:
+    # in order per block of changed lines, so moving or swapping lines is a real change
+    return all(_ws_key(path, removed) == _ws_key(path, added) for path, removed, added in _change_blocks(diff))
+
+
+def _is_doc(path: str) -> bool:
+    base = path.rsplit("/", 1)[-1]
+    if base.startswith("requirements") or base in ("CMakeLists.txt", "Makefile"):
+        return False
+    if path.lower().endswith(DOC_EXTENSIONS):
+        return True
+    # a docs directory or a LICENSE-style name only counts for files without an extension (not docs/conf.py)
+    return "." not in base and (base.upper() in DOC_NAMES or path.startswith(DOC_DIRS) or "/docs/" in path)
+
+
+def _is_lockfile(path: str) -> bool:
+    return path.rsplit("/", 1)[-1] in LOCKFILES
+
+
+def classify(diff: str, parsed: Dict[str, Any] | None = None) -> Dict[str, Any] | None:
+    """Return ``{"class", "files", ...}`` for a fast-path diff, else None (also when forced to the LLM)."""
+    if forced_llm():
+        return None
+    lines = _changed_lines(diff)
+    if not lines:
+        return None
+    files = list(dict.fromkeys(f for f, _, _ in lines if f))
+    if not files and parsed is not None:
+        files = [f for f in parsed.get("files_changed", []) if f != "/dev/null"]
+
+    if _whitespace_only(diff):
+        return {"class": "whitespace", "files": files}
+    if files and all(_is_doc(f) for f in files):
+        return {"class": "docs", "files": files}
+    if files and all(_is_lockfile(f) for f in files):
+        return {"class": "lockfile", "files": files}
+    if files and all(_VERSION_LINE.match(t) or not t.strip() for _, _, t in lines):
+        versions = re.findall(r"\d+(?:\.\d+)+[\w.+-]*", " ".join(t for _, s, t in lines if s == "+"))
+        return {"class": "version_bump", "files": files, "version": versions[-1] if versions else None}
+    return None
+
+
+def review(fast_path: Dict[str, Any]) -> Dict[str, Any]:
+    """Template review in the provider's shape; merged with deterministic findings by the caller."""
+    label = _LABELS[fast_path["class"]]
+    files = ", ".join(fast_path["files"][:5]) or "the diff"
+    return {"summary": f"Deterministic review: {label} ({files}); no code changes to review.", "findings": [], "confidence": 0.9}
+
+
+def describe(fast_path: Dict[str, Any], commits: List[str], issue: str | None) -> Dict[str, Any]:
+    """Template PR description with the generator's keys."""
+    kind = fast_path["class"]
+    files = fast_path["files"]
+    defaults = {
+        "docs": "Update documentation",
+        "lockfile": "Update dependency lockfiles",
+        "version_bump": f"Bump version to {fast_path.get('version')}" if fast_path.get("version") else "Bump version",
+        "whitespace": "Fix whitespace and formatting",
+    }
+    return {
+        "title": commits[0] if commits else defaults[kind],
+        "what_changed": f"{defaults[kind]} in {len(files)} file(s): {', '.join(files[:5])}{'...' if len(files) > 5 else ''}",
+        "why": "\n".join(commits[1:]) or (f"Addresses {issue}" if issue else defaults[kind] + "."),
+        "files_impacted": files,
+        "tests": "No code changes; no tests required." if kind != "lockfile" else "Run the test suite against the updated dependencies.",
+        "risk_level": "low" if kind != "lockfile" else "medium",
+        "rollback_plan": "Revert this commit.",
+    }
@@ -4,8 +4,9 @@ import json
 from typing import Any, Dict, List
 
 from .parser import parse_diff
-from . import prompts
-from .llm import llm
+from . import fastpath, prompts, routing
+from .llm import llm, provider_for
+from .resilience import ProviderUnavailable
 
 
 def _ensure_dict(obj: Any) -> Dict[str, Any]:
@@ -19,18 +20,11 @@ def _ensure_dict(obj: Any) -> Dict[str, Any]:
     return {"raw": str(obj)}
 
 
-def generate_pr_from(diff: str, commits: List[str], issue: str | None = None) -> Dict[str, Any]:
-    """Generate a structured PR description.
+DESCRIPTION_KEYS = ["title", "what_changed", "why", "files_impacted", "tests", "risk_level", "rollback_plan"]
 
-    Steps:
-      - parse diff into short structured context
-      - render a tighter prompt using context
-      - call the configured llm provider
-      - ensure the result is a dict and contains expected keys
-    """
-    context = parse_diff(diff)
 
-    prompt = (
+def _context_prompt(diff: str, commits: List[str], issue: str | None, context: Dict[str, Any]) -> str:
+    return (
         prompts.PR_DESCRIPTION_PROMPT
         + "\nContext Summary:\n{summary}\nFiles changed:\n{files}\nAdded functions:\n{funcs}\nAdded classes:\n{classes}\n"
     ).format(
@@ -43,18 +37,25 @@ def generate_pr_from(diff: str, commits: List[str], issue: str | None = None) ->
         classes=", ".join(context.get("added_classes", [])),
     )
 
-    # call provider
-    raw = llm.generate_pr_description(diff, commits, issue)
+
+def finalize_description(raw: Any, diff: str, commits: List[str], issue: str | None, context: Dict[str, Any], provider: Any = None) -> Dict[str, Any]:
+    """Normalize a provider description and fill gaps via the context prompt.
+
+    Shared by ``generate_pr_from`` and the streaming endpoint so both return the
+    same shape for the same provider output.
+    """
     result = _ensure_dict(raw)
 
     # normalize expected keys (best-effort)
-    keys = ["title", "what_changed", "why", "files_impacted", "tests", "risk_level", "rollback_plan"]
+    keys = DESCRIPTION_KEYS
     normalized = {k: result.get(k, "") if k != "files_impacted" else result.get(k, []) for k in keys}
 
     # If result is empty or only raw, try to call LLM by sending the prompt string directly
     if not any(normalized.values()) or (len(normalized.get("title", "")) == 0 and isinstance(result.get("raw"), str)):
         # fallback: ask LLM with prompt
-        resp = llm._chat(prompt) if hasattr(llm, "_chat") else None
+        prompt = _context_prompt(diff, commits, issue, context)
+        provider = provider if provider is not None else llm
+        resp = provider._chat(prompt) if hasattr(provider, "_chat") else None
         if resp:
             parsed = _ensure_dict(resp)
             for k in keys:
@@ -64,3 +65,57 @@ def generate_pr_from(diff: str, commits: List[str], issue: str | None = None) ->
     # Attach parser context metadata
     normalized["_context"] = context
     return normalized
+
+
+def context_description(commits: List[str], issue: str | None, context: Dict[str, Any]) -> Dict[str, Any]:
+    """Deterministic description built from the parsed diff, used when no provider is available."""
+    files = list(context.get("files_changed", []))
+    title = commits[0] if commits else f"Update {', '.join(files[:3]) or 'code'}"
+    return {
+        "title": title,
+        "what_changed": context.get("summary", ""),
+        "why": "\n".join(commits[1:]) or (f"Addresses {issue}" if issue else ""),
+        "files_impacted": files,
+        "tests": "",
+        "risk_level": "",
+        "rollback_plan": "Revert this change.",
+    }
+
+
+def generate_pr_from(diff: str, commits: List[str], issue: str | None = None, context: Dict[str, Any] | None = None, route: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """Generate a structured PR description.
+
+    Steps:
+      - parse diff into short structured context
+      - call the configured llm provider
+      - ensure the result is a dict and contains expected keys, falling back to a
+        tighter prompt rendered from the context when the provider output is unusable
+
+    Trivial diffs (docs, lockfiles, version bumps, whitespace) get a template
+    description without a provider call, marked with ``_fast_path``.
+
+    ``context`` and ``route`` may be passed when the caller already parsed and
+    routed the diff; the result records the route under ``_route``.
+    """
+    if context is None:
+        context = parse_diff(diff)
+    fast = fastpath.classify(diff, context)
+    if fast is not None:
+        desc = fastpath.describe(fast, commits, issue)
+        desc["_context"] = context
+        desc["_fast_path"] = fast
+        return desc
+    if route is None:
+        route = routing.choose_route(context)
+    provider = provider_for(route["route"], llm)
+
+    # call provider
+    try:
+        raw = provider.generate_pr_description(diff, commits, issue)
+        desc = finalize_description(raw, diff, commits, issue, context, provider=provider)
+    except ProviderUnavailable as e:
+        desc = context_description(commits, issue, context)
+        desc["_context"] = context
+        desc["_errors"] = {"provider": str(e)}
+    desc["_route"] = route
+    return desc
@@ -0,0 +1,158 @@
+"""Build a review diff straight from a git repository.
+
+``collect(repo, base, head)`` replaces the workflow's ``git diff > pr.diff`` /
+``git log > commits.txt`` round trip. One ``git diff --raw --numstat -z`` call
+lists the changes with their line counts, which is enough to drop, before any
+patch text is produced:
+
+- binary files (numstat ``-``) and pure renames or mode changes (no lines);
+- paths marked ``linguist-generated`` or ``linguist-vendored`` in
+  ``.gitattributes``, and paths matching ``exclude`` globs
+  (``AUTOPR_GIT_EXCLUDE``, comma separated);
+- files with more than ``max_file_lines`` changed lines
+  (``AUTOPR_GIT_MAX_FILE_LINES``, default 5000), usually generated output.
+
+The remaining files are diffed in batches by parallel ``git diff`` processes
+(``AUTOPR_GIT_JOBS``, default 4) and joined in the original order. Commit
+subjects come from ``git log``. Nothing is written to disk.
+"""
+from __future__ import annotations
+
+import fnmatch
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Sequence
+
+GENERATED_ATTRIBUTES = ("linguist-generated", "linguist-vendored")
+BATCH_SIZE = 16
+
+
+class GitError(RuntimeError):
+    pass
+
+
+def _git(repo: str, *args: str, input: bytes | None = None) -> bytes:
+    cmd = ["git", "-C", repo, "-c", "core.quotepath=off", *args]
+    try:
+        proc = subprocess.run(cmd, input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    except FileNotFoundError:
+        raise GitError("git executable not found") from None
+    if proc.returncode != 0:
+        raise GitError(f"{' '.join(args[:2])} failed: {proc.stderr.decode('utf-8', 'replace').strip()}")
+    return proc.stdout
+
+
+def list_changes(repo: str, base: str, head: str) -> List[Dict[str, Any]]:
+    """Changed files between ``base`` and ``head`` with status and line counts.
+
+    Each entry has ``path``, ``old_path`` (differs for renames), ``status``
+    (``A``, ``M``, ``D``, ``R``, ...), ``added``/``removed`` (None for binary
+    files) and ``binary``.
+    """
+    tokens = _git(repo, "diff", "--raw", "--numstat", "-z", "-M", base, head).decode("utf-8", "surrogateescape").split("\0")
+    changes: List[Dict[str, Any]] = []
+    i = 0
+    # --raw records come first: ':<modes> <shas> <status>' then one path (two for renames/copies)
+    while i < len(tokens) and tokens[i].startswith(":"):
+        status = tokens[i].split()[-1]
+        if status[0] in "RC":
+            old, new = tokens[i + 1], tokens[i + 2]
+            i += 3
+        else:
+            old = new = tokens[i + 1]
+            i += 2
+        changes.append({"path": new, "old_path": old, "status": status[0], "added": None, "removed": None, "binary": False})
+    # then --numstat in the same order: 'added<TAB>removed<TAB>path', or an empty path followed by old and new
+    for change in changes:
+        if i >= len(tokens) or not tokens[i]:
+            break
+        added, removed, path = tokens[i].split("\t", 2)
+        i += 1 if path else 3
+        if added == "-":
+            change["binary"] = True
+        else:
+            change["added"], change["removed"] = int(added), int(removed)
+    return changes
+
+
+def _generated(repo: str, paths: Sequence[str]) -> set:
+    if not paths:
+        return set()
+    out = _git(repo, "check-attr", "-z", "--stdin", *GENERATED_ATTRIBUTES, input="\0".join(paths).encode("utf-8", "surrogateescape") + b"\0")
+    tokens = out.decode("utf-8", "surrogateescape").split("\0")
+    # records are 'path\0attribute\0value\0'
+    return {tokens[k] for k in range(0, len(tokens) - 2, 3) if tokens[k + 2] not in ("unspecified", "unset", "false")}
+
+
+def _exclude_patterns() -> List[str]:
+    return [p.strip() for p in os.getenv("AUTOPR_GIT_EXCLUDE", "").split(",") if p.strip()]
+
+
+def select_files(repo: str, changes: List[Dict[str, Any]], exclude: Sequence[str] = (), max_file_lines: int | None = None) -> tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+    """Split ``changes`` into files worth diffing and ``{"path", "reason"}`` skips."""
+    if max_file_lines is None:
+        max_file_lines = int(os.getenv("AUTOPR_GIT_MAX_FILE_LINES", "5000"))
+    generated = _generated(repo, [c["path"] for c in changes])
+    keep: List[Dict[str, Any]] = []
+    skipped: List[Dict[str, str]] = []
+    for change in changes:
+        path = change["path"]
+        if change["binary"]:
+            reason = "binary"
+        elif path in generated:
+            reason = "generated"
+        elif any(fnmatch.fnmatch(path, pattern) for pattern in exclude):
+            reason = "excluded"
+        elif change["added"] == 0 and change["removed"] == 0:
+            reason = "renamed" if change["status"] == "R" else "no line changes"
+        elif change["added"] + change["removed"] > max_file_lines:
+            reason = f"too large ({change['added'] + change['removed']} lines)"
+        else:
+            keep.append(change)
+            continue
+        skipped.append({"path": path, "reason": reason})
+    return keep, skipped
+
+
+def _diff_batch(repo: str, base: str, head: str, batch: List[Dict[str, Any]]) -> str:
+    pathspecs: List[str] = []
+    for change in batch:
+        pathspecs.append(f":(literal){change['path']}")
+        if change["old_path"] != change["path"]:
+            pathspecs.append(f":(literal){change['old_path']}")
+    return _git(repo, "diff", "-M", "--no-color", "--no-ext-diff", base, head, "--", *pathspecs).decode("utf-8", "replace")
+
+
+def file_diffs(repo: str, base: str, head: str, changes: List[Dict[str, Any]], jobs: int | None = None) -> str:
+    """Unified diff of ``changes`` from parallel ``git diff`` processes, in input order."""
+    if not changes:
+        return ""
+    jobs = jobs or int(os.getenv("AUTOPR_GIT_JOBS", "4"))
+    batches = [changes[k:k + BATCH_SIZE] for k in range(0, len(changes), BATCH_SIZE)]
+    if jobs <= 1 or len(batches) == 1:
+        return "".join(_diff_batch(repo, base, head, b) for b in batches)
+    with ThreadPoolExecutor(max_workers=min(jobs, len(batches)), thread_name_prefix="autopr-git") as pool:
+        return "".join(pool.map(lambda b: _diff_batch(repo, base, head, b), batches))
+
+
+def commit_subjects(repo: str, base: str, head: str) -> List[str]:
+    """Subjects of the commits in ``base..head``, oldest first."""
+    out = _git(repo, "log", "-z", "--reverse", "--format=%s", f"{base}..{head}").decode("utf-8", "replace")
+    return [s for s in out.split("\0") if s.strip()]
+
+
+def collect(repo: str, base: str, head: str, exclude: Sequence[str] | None = None, max_file_lines: int | None = None, jobs: int | None = None) -> Dict[str, Any]:
+    """Diff, commit subjects and file selection for ``base..head`` in ``repo``.
+
+    Returns ``{"diff", "commits", "files", "skipped"}`` where ``files`` lists
+    the reviewed paths and ``skipped`` the dropped ones with a reason.
+    """
+    exclude = list(exclude) if exclude is not None else _exclude_patterns()
+    changes = list_changes(repo, base, head)
+    keep, skipped = select_files(repo, changes, exclude=exclude, max_file_lines=max_file_lines)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # commit subjects are read while the per-file diffs run
+        commits = pool.submit(commit_subjects, repo, base, head)
+        diff = file_diffs(repo, base, head, keep, jobs=jobs)
+        return {"diff": diff, "commits": commits.result(), "files": [c["path"] for c in keep], "skipped": skipped}
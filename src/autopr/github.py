@@ -0,0 +1,69 @@
+"""Minimal GitHub REST client for the webhook receiver.
+
+Only the calls a review needs: fetch a PR's diff (or the diff between two
+heads), list its commit subjects and post an issue comment. ``GITHUB_API_URL``
+points it at GitHub Enterprise (or a local stand-in in tests); ``GITHUB_TOKEN``
+authenticates.
+"""
+from __future__ import annotations
+
+import json
+import os
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List
+
+DEFAULT_API_URL = "https://api.github.com"
+
+
+class GitHubError(RuntimeError):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"GitHub API {status}: {message}")
+        self.status = status
+
+
+class GitHubClient:
+    def __init__(self, token: str | None = None, api_url: str | None = None, timeout: float = 30.0):
+        self.token = token
+        self.api_url = (api_url or DEFAULT_API_URL).rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: Any = None, accept: str = "application/vnd.github+json") -> bytes:
+        headers = {"Accept": accept, "User-Agent": "autopr", "X-GitHub-Api-Version": "2022-11-28"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.api_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.read()
+        except urllib.error.HTTPError as e:
+            raise GitHubError(e.code, e.read().decode("utf-8", "replace")[:500]) from None
+
+    def pull_diff(self, repo: str, number: int) -> str:
+        """Unified diff of a pull request (``repo`` is ``owner/name``)."""
+        return self._request("GET", f"/repos/{repo}/pulls/{number}", accept="application/vnd.github.v3.diff").decode("utf-8", "replace")
+
+    def compare_diff(self, repo: str, base: str, head: str) -> str:
+        """Unified diff between two commits (``base...head``), e.g. an old and a new PR head."""
+        return self._request("GET", f"/repos/{repo}/compare/{base}...{head}", accept="application/vnd.github.v3.diff").decode("utf-8", "replace")
+
+    def pull_commits(self, repo: str, number: int) -> List[str]:
+        """First line of each commit message, oldest first (at most 250, the API's limit)."""
+        subjects: List[str] = []
+        for page in range(1, 4):
+            batch = json.loads(self._request("GET", f"/repos/{repo}/pulls/{number}/commits?per_page=100&page={page}"))
+            subjects.extend((c.get("commit", {}).get("message") or "").split("\n", 1)[0] for c in batch)
+            if len(batch) < 100:
+                break
+        return subjects
+
+    def create_comment(self, repo: str, number: int, body: str) -> Dict[str, Any]:
+        return json.loads(self._request("POST", f"/repos/{repo}/issues/{number}/comments", {"body": body}))
+
+
+def from_env() -> GitHubClient:
+    return GitHubClient(token=os.getenv("GITHUB_TOKEN"), api_url=os.getenv("GITHUB_API_URL"))
@@ -0,0 +1,196 @@
+"""Hedged requests across several providers to cut tail latency.
+
+``HedgedProvider`` sends each call to the primary backend. If no valid answer
+has arrived after the hedge delay it also sends the call to the next backend
+and returns whichever valid answer comes first; each further backend waits
+another delay after the previous launch. A failing backend is replaced by the
+next one straight away. The delay is either fixed (``AUTOPR_HEDGE_DELAY``) or
+the observed p95 latency of the primary, sampled on every call, including
+calls where the primary lost (a primary cancelled before it started counts
+with the time it had waited, as a lower bound). Extra requests are capped by
+a budget: at most ``budget`` extra requests per call over a sliding window of
+recent calls. Failovers count against the budget but are never blocked by it.
+
+A valid answer is a parsed dict (no ``raw`` fallback) for the description and
+review methods, and a non-empty string for ``_chat`` and titles. Each launch
+runs under its own ``cancellation`` token, cancelled as soon as the call
+returns: a losing request that has not started is never sent, and one being
+retried stops at its next retry or backoff. A request already on the wire
+cannot be interrupted, so its result is just ignored.
+
+Streaming methods are not hedged. They use the primary backend, because a
+stream cannot switch backends once chunks have been sent.
+"""
+from __future__ import annotations
+
+import collections
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List
+
+from . import cancellation, metrics
+from .providers import BaseProvider
+from .resilience import ProviderUnavailable
+
+hedges = metrics.Counter("autopr_hedge_requests_total", "Backup requests launched by the hedging provider", ("reason",))
+hedge_wins = metrics.Counter("autopr_hedge_wins_total", "Hedged calls by the backend whose answer was used", ("winner", "position"))
+
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="autopr-hedge")
+
+
+def _valid(method: str, result: Any) -> bool:
+    if method in ("generate_pr_description", "review_code", "amend_pr_description", "amend_review"):
+        return isinstance(result, dict) and "raw" not in result
+    return isinstance(result, str) and bool(result.strip())
+
+
+def _scoped(token: cancellation.CancelToken, func: Any, *args: Any, **kwargs: Any) -> Any:
+    with cancellation.scope(token):
+        return func(*args, **kwargs)
+
+
+def _label(provider: BaseProvider) -> str:
+    label = getattr(provider, "label", None) or type(provider).__name__
+    model = getattr(getattr(provider, "inner", provider), "model", None)
+    return f"{label}:{model}" if model else label
+
+
+class HedgedProvider(BaseProvider):
+    def __init__(self, backends: List[BaseProvider], delay: float | None = None, budget: float = 0.1, window: int = 200, min_delay: float = 0.5, initial_delay: float = 5.0):
+        if not backends:
+            raise ValueError("HedgedProvider needs at least one backend")
+        self.backends = list(backends)
+        self.label = "+".join(_label(b) for b in self.backends)
+        self.delay = delay
+        self.budget = budget
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self._latencies: Deque[float] = collections.deque(maxlen=window)
+        # extra requests sent by each recent call
+        self._hedged: Deque[List[int]] = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def hedge_delay(self) -> float:
+        """Fixed delay, or the p95 of recent primary latencies once enough samples exist."""
+        if self.delay is not None:
+            return self.delay
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < 20:
+            return self.initial_delay
+        return max(self.min_delay, samples[int(0.95 * (len(samples) - 1))])
+
+    def _may_hedge(self, entry: List[int]) -> bool:
+        with self._lock:
+            # counted up front so concurrent calls share one budget
+            if sum(e[0] for e in self._hedged) >= max(1.0, self.budget * len(self._hedged)):
+                return False
+            entry[0] += 1
+            return True
+
+    def _record_primary(self, started: float, fut: Future) -> None:
+        # failures are not answer latencies; a cancelled primary counts with the time it waited
+        if fut.cancelled() or isinstance(fut.exception(), (type(None), cancellation.Cancelled)):
+            with self._lock:
+                self._latencies.append(time.monotonic() - started)
+
+    def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        entry = [0]
+        with self._lock:
+            self._hedged.append(entry)
+        started = time.monotonic()
+        last_launch = started
+        running: Dict[Future, int] = {}
+        tokens: Dict[Future, cancellation.CancelToken] = {}
+        next_backend = 0
+        errors: List[str] = []
+        fallback: Any = None
+
+        def launch() -> None:
+            nonlocal next_backend, last_launch
+            backend = self.backends[next_backend]
+            token = cancellation.CancelToken()
+            fut = _executor.submit(contextvars.copy_context().run, _scoped, token, getattr(backend, method), *args, **kwargs)
+            tokens[fut] = token
+            if next_backend == 0:
+                # sampled when the primary finishes, even after a hedge has won
+                fut.add_done_callback(lambda f: self._record_primary(started, f))
+            running[fut] = next_backend
+            next_backend += 1
+            last_launch = time.monotonic()
+
+        launch()
+        try:
+            while running:
+                can_hedge = next_backend < len(self.backends)
+                timeout = max(0.0, last_launch + self.hedge_delay() - time.monotonic()) if can_hedge else None
+                done, _ = cancellation.wait_first(running, timeout=timeout)
+                if not done:
+                    if self._may_hedge(entry):
+                        hedges.inc(reason="slow")
+                        launch()
+                    else:
+                        # over budget: wait for what is already running
+                        done, _ = cancellation.wait_first(running)
+                for fut in done:
+                    position = running.pop(fut)
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        errors.append(f"{_label(self.backends[position])}: {e}")
+                        result = None
+                    else:
+                        if _valid(method, result):
+                            if len(running) or position > 0:
+                                hedge_wins.inc(winner=_label(self.backends[position]), position=str(position))
+                            return result
+                        fallback = result if fallback is None else fallback
+                    # failed or unusable answer: fail over to the next backend immediately
+                    if not running and next_backend < len(self.backends):
+                        hedges.inc(reason="failover")
+                        with self._lock:
+                            entry[0] += 1
+                        launch()
+        finally:
+            # stops the losers' retries, not just the ones still queued
+            for fut in running:
+                fut.cancel()
+                tokens[fut].cancel("another backend answered")
+        if fallback is not None:
+            return fallback
+        raise ProviderUnavailable("all providers failed: " + "; ".join(errors))
+
+    def generate_pr_title(self, diff: str, commits: list[str], issue: str | None) -> str:
+        return self.call("generate_pr_title", diff, commits, issue)
+
+    def generate_pr_description(self, diff: str, commits: list[str], issue: str | None) -> Dict[str, Any]:
+        return self.call("generate_pr_description", diff, commits, issue)
+
+    def review_code(self, diff: str) -> Dict[str, Any]:
+        return self.call("review_code", diff)
+
+    def amend_pr_description(self, previous: Dict[str, Any], diff: str, commits: list[str], issue: str | None) -> Dict[str, Any]:
+        return self.call("amend_pr_description", previous, diff, commits, issue)
+
+    def amend_review(self, previous: Dict[str, Any], diff: str) -> Dict[str, Any]:
+        return self.call("amend_review", previous, diff)
+
+    def _chat(self, prompt: str) -> str:
+        return self.call("_chat", prompt)
+
+    def stream_pr_description(self, diff: str, commits: list[str], issue: str | None) -> Iterator[str]:
+        return self.backends[0].stream_pr_description(diff, commits, issue)
+
+    def stream_review_code(self, diff: str) -> Iterator[str]:
+        return self.backends[0].stream_review_code(diff)
+
+
+def from_env(backends: List[BaseProvider]) -> BaseProvider:
+    """Hedge across ``backends`` using ``AUTOPR_HEDGE_DELAY`` / ``AUTOPR_HEDGE_BUDGET``."""
+    if len(backends) == 1:
+        return backends[0]
+    delay = os.getenv("AUTOPR_HEDGE_DELAY")
+    return HedgedProvider(backends, delay=float(delay) if delay else None, budget=float(os.getenv("AUTOPR_HEDGE_BUDGET", "0.1")))
@@ -0,0 +1,268 @@
+"""Incremental PR description and review updates between pushes.
+
+A full review sends the whole PR diff to the provider on every push. In
+incremental mode the last reviewed state of each PR is stored: head SHA,
+description, LLM summary and findings, and the deterministic findings per file.
+On the next push only the interdiff (old head to new head) goes to the
+provider, which amends the previous description and review
+(``prompts.AMEND_DESCRIPTION_PROMPT`` / ``AMEND_REVIEW_PROMPT``). Provider input
+therefore scales with the new commits, not the size of the PR.
+
+Findings are tracked per file. Files the interdiff does not touch keep their
+previous findings; touched files get their static and lint findings
+recomputed from the new PR diff, and their LLM findings (plus the general ones
+without a file) are handed to the provider to amend. Files that left the PR
+drop their findings. Without a previous state, or without an interdiff (e.g.
+after a force-push), a full review is run and stored.
+
+The store is in memory by default; ``AUTOPR_STATE_DIR`` keeps one JSON file per
+PR there so state survives restarts and can be cached between CI runs.
+"""
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from . import generator, lint, reviewer, routing, secret_scan, workers
+from .findings import json_default
+from .llm import llm, provider_for
+from .parser import parse_diff, split_diff
+from .resilience import ProviderUnavailable
+
+
+class StateStore:
+    """Last reviewed state per PR key, in memory or one JSON file per key under ``directory``."""
+
+    def __init__(self, directory: str | None = None):
+        self.directory = directory
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", key)[:80]
+        return os.path.join(self.directory or "", f"{safe}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.directory:
+            with self._lock:
+                return self._states.get(key)
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, state: Dict[str, Any]) -> None:
+        if not self.directory:
+            with self._lock:
+                self._states[key] = state
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(state, fh, default=json_default)
+        os.replace(tmp, path)
+
+    def delete(self, key: str) -> None:
+        if not self.directory:
+            with self._lock:
+                self._states.pop(key, None)
+            return
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+# pipeline stages for the rest of the review: static, lint and secret findings come from file_findings
+_STAGES = ("parsed", "tests", "coverage", "issue_alignment", "route", "fast_path", "llm_review", "pr")
+
+_store: StateStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> StateStore:
+    """Return the process-wide store, configured from ``AUTOPR_STATE_DIR`` on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StateStore(os.getenv("AUTOPR_STATE_DIR") or None)
+        return _store
+
+
+def file_findings(path: str, chunk: str) -> List[Dict[str, Any]]:
+    """Static analysis, lint and secret findings for one file's section of a diff, tagged with ``file``."""
+    findings = [reviewer._normalize_finding(f, "static") for f in workers.analyze_unit(chunk, "python", path)]
+    findings += [reviewer._normalize_finding(f, "lint") for f in lint.run_basic_lint(chunk)]
+    findings += [reviewer._normalize_finding(f, "secret", keep=("line", "rule")) for f in secret_scan.scan_diff(chunk)]
+    if path:
+        for f in findings:
+            f["file"] = path
+    return findings
+
+
+def _llm_findings(raw: Any) -> List[Dict[str, Any]]:
+    out = []
+    for f in raw or []:
+        finding = reviewer._normalize_finding(f, "ai")
+        if isinstance(f, dict) and isinstance(f.get("file"), str) and f["file"]:
+            finding["file"] = re.sub(r"^[ab]/", "", f["file"])
+        out.append(finding)
+    return out
+
+
+def _public(description: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in description.items() if not k.startswith("_")}
+
+
+def _assemble(summary: str, confidence: Any, llm_found: List[Dict[str, Any]], per_file: Dict[str, List[Dict[str, Any]]], det: Dict[str, Any], errors: Dict[str, str]) -> Dict[str, Any]:
+    # LLM findings are passed with the deterministic ones so merge_review keeps their ``file``
+    det = dict(det, findings=llm_found + [f for findings in per_file.values() for f in findings])
+    review = reviewer.merge_review({"summary": summary, "findings": [], "confidence": confidence}, det)
+    if errors:
+        review.setdefault("_errors", {}).update(errors)
+    return review
+
+
+def _full(head_sha: str, diff: str, commits: List[str], issue: str | None, test_log: str | None, coverage_before: str | None, coverage_after: str | None) -> Dict[str, Any]:
+    run = reviewer.run_review_pipeline(diff, commits=commits, issue_text=issue, test_log=test_log, coverage_before=coverage_before, coverage_after=coverage_after, include_pr=True, only=_STAGES)
+    det = reviewer._deterministic_from(run)
+    per_file = {path: file_findings(path, chunk) for path, chunk in split_diff(diff).items()}
+    errors: Dict[str, str] = {}
+    raw = run.get("llm_review")
+    if "llm_review" in run.errors or not isinstance(raw, dict):
+        errors["llm_review"] = run.errors.get("llm_review", "unusable provider response")
+        summary, confidence, llm_found = "LLM review unavailable; deterministic findings only.", 0.0, []
+    else:
+        summary, confidence, llm_found = raw.get("summary", ""), raw.get("confidence", 0.0), _llm_findings(raw.get("findings"))
+    if "pr" in run.errors:
+        errors["pr"] = run.errors["pr"]
+    description = run.get("pr") or {"_context": run.get("parsed") or {}}
+    review = _assemble(summary, confidence, llm_found, per_file, det, errors)
+    return {
+        "head_sha": head_sha,
+        "commits": commits,
+        "description": description,
+        "summary": summary,
+        "confidence": review["confidence"],
+        "llm_findings": llm_found,
+        "files": {path: {"findings": findings} for path, findings in per_file.items()},
+        "result": {
+            "pr": description,
+            "review": review,
+            "_incremental": {"mode": "full", "head": head_sha, "previous_head": None, "files_reviewed": list(per_file), "files_kept": [], "llm_input_chars": len(diff)},
+        },
+    }
+
+
+def _amend(previous: Dict[str, Any], head_sha: str, diff: str, interdiff: str, commits: List[str], issue: str | None, test_log: str | None, coverage_before: str | None, coverage_after: str | None) -> Dict[str, Any]:
+    touched = [p for p in split_diff(interdiff) if p]
+    files = split_diff(diff)
+    old_files = previous.get("files", {})
+    per_file: Dict[str, List[Dict[str, Any]]] = {}
+    kept_files: List[str] = []
+    for path, chunk in files.items():
+        if path in touched or path not in old_files:
+            per_file[path] = file_findings(path, chunk)
+        else:
+            per_file[path] = old_files[path]["findings"]
+            kept_files.append(path)
+
+    # deterministic blocks and the route are computed on the interdiff: that is what the provider sees
+    run = reviewer.run_review_pipeline(interdiff, commits=commits, issue_text=issue, test_log=test_log, coverage_before=coverage_before, coverage_after=coverage_after, include_llm=False, only=_STAGES)
+    det = reviewer._deterministic_from(run)
+    route = det.get("_route") or {"route": routing.DEFAULT_ROUTE}
+    provider = provider_for(route["route"], llm)
+
+    prev_llm = previous.get("llm_findings", [])
+    kept = [f for f in prev_llm if f.get("file") and f["file"] not in touched and f["file"] in files]
+    relevant = [f for f in prev_llm if not f.get("file") or f["file"] in touched]
+    prev_desc = previous.get("description") or {}
+    prev_commits = previous.get("commits", [])
+    new_commits = commits[len(prev_commits):] if commits[:len(prev_commits)] == prev_commits else commits
+
+    errors: Dict[str, str] = {}
+    summary, confidence, amended = previous.get("summary", ""), previous.get("confidence", 0.0), relevant
+    description = dict(prev_desc)
+    if det.get("_fast_path") is None:
+        def amend_review() -> Any:
+            return provider.amend_review({"summary": summary, "findings": relevant}, interdiff)
+
+        def amend_description() -> Any:
+            return provider.amend_pr_description(_public(prev_desc), interdiff, new_commits, issue)
+
+        # run both calls in the caller's context so a cancelled review stops them
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="autopr-amend")
+        results: Dict[str, Any] = {}
+        try:
+            futures = {name: pool.submit(contextvars.copy_context().run, fn) for name, fn in (("llm_review", amend_review), ("pr", amend_description))}
+            for name, fut in futures.items():
+                try:
+                    results[name] = fut.result()
+                except ProviderUnavailable as e:
+                    errors[name] = str(e)
+        finally:
+            pool.shutdown(wait=False)
+        raw = results.get("llm_review")
+        if isinstance(raw, dict) and "raw" not in raw:
+            summary = raw.get("summary") or summary
+            confidence = raw.get("confidence", confidence)
+            amended = _llm_findings(raw.get("findings"))
+        elif "llm_review" not in errors:
+            errors["llm_review"] = "unusable provider response; kept previous findings"
+        update = results.get("pr")
+        if isinstance(update, dict) and "raw" not in update:
+            for k in generator.DESCRIPTION_KEYS:
+                if update.get(k):
+                    description[k] = update[k]
+        elif "pr" not in errors:
+            errors["pr"] = "unusable provider response; kept previous description"
+    description["_context"] = parse_diff(diff)
+
+    llm_found = kept + amended
+    review = _assemble(summary, confidence, llm_found, per_file, det, errors)
+    return {
+        "head_sha": head_sha,
+        "commits": commits,
+        "description": description,
+        "summary": summary,
+        "confidence": review["confidence"],
+        "llm_findings": llm_found,
+        "files": {path: {"findings": findings} for path, findings in per_file.items()},
+        "result": {
+            "pr": description,
+            "review": review,
+            "_incremental": {"mode": "amend", "head": head_sha, "previous_head": previous.get("head_sha"), "files_reviewed": [p for p in files if p not in kept_files], "files_kept": kept_files, "llm_input_chars": 0 if det.get("_fast_path") else len(interdiff)},
+        },
+    }
+
+
+def review_incremental(key: str, head_sha: str, diff: str, commits: List[str] | None = None, interdiff: str | None = None, issue: str | None = None, test_log: str | None = None, coverage_before: str | None = None, coverage_after: str | None = None, store: StateStore | None = None) -> Dict[str, Any]:
+    """Review PR ``key`` at ``head_sha``, amending its stored state when possible.
+
+    ``diff`` is the full PR diff and ``interdiff`` the diff from the previously
+    reviewed head to ``head_sha``. Returns ``{"pr", "review", "_incremental"}``,
+    where ``_incremental.mode`` is ``full``, ``amend`` or ``unchanged``.
+    """
+    store = store if store is not None else get_store()
+    commits = list(commits or [])
+    previous = store.get(key)
+    if previous is not None and previous.get("head_sha") == head_sha:
+        result = dict(previous["result"])
+        result["_incremental"] = dict(result["_incremental"], mode="unchanged", llm_input_chars=0)
+        return result
+    # an interdiff without file headers cannot be matched to stored per-file findings
+    if previous is None or interdiff is None or (interdiff.strip() and not any(split_diff(interdiff))):
+        state = _full(head_sha, diff, commits, issue, test_log, coverage_before, coverage_after)
+    else:
+        state = _amend(previous, head_sha, diff, interdiff, commits, issue, test_log, coverage_before, coverage_after)
+    store.put(key, state)
+    return state["result"]
@@ -0,0 +1,324 @@
+"""Asynchronous review jobs with single-flight de-duplication.
+
+Large diffs can take longer than a load balancer is willing to hold a request
+open, so ``POST /jobs/review`` hands the work to a local worker pool and returns
+a job id straight away. Clients poll (or long-poll) ``GET /jobs/{id}`` and may
+register a callback URL on the local host to be notified when the job finishes.
+
+Requests are keyed by a content hash of their payload. While a job with the
+same hash is queued or running, new submissions attach to it instead of
+starting duplicate work — CI, bots and IDEs often submit the same diff at once.
+
+The store is in-process by default. Set ``AUTOPR_JOB_DB`` to a SQLite file path
+to share jobs (and de-duplication) between several uvicorn worker processes;
+each job is executed by the process that created it. That process holds a
+lease on its active jobs by refreshing their ``updated_at`` every third of
+``AUTOPR_JOB_LEASE`` seconds. A queued or running job whose lease ran out
+(its worker died) is marked failed, so identical submissions start a new job
+instead of attaching to it forever.
+
+Callbacks do not get a thread each: one watcher thread polls the jobs with
+pending callbacks, and finished ones are posted from a small pool. A failed
+post is retried with exponential backoff for ``CALLBACK_RETRY_WINDOW`` seconds.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from . import metrics
+from .findings import json_default
+
+ACTIVE = ("queued", "running")
+FINISHED = ("done", "failed")
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+CALLBACK_WORKERS = 4
+CALLBACK_POLL = 0.2
+# how long a finished job's callback is retried, and the first retry delay (doubling up to 30 s)
+CALLBACK_RETRY_WINDOW = 300.0
+CALLBACK_RETRY_DELAY = 1.0
+
+
+def content_key(payload: Dict[str, Any]) -> str:
+    """Stable hash of a request payload used for single-flight de-duplication."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def validate_callback_url(url: str) -> str:
+    """Only allow http(s) callbacks on the local host."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or parsed.hostname not in LOCAL_HOSTS:
+        raise ValueError("callback_url must be an http(s) URL on localhost")
+    return url
+
+
+class JobStore:
+    """In-process job store guarded by a condition variable."""
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._active: Dict[str, str] = {}
+        self._cond = threading.Condition()
+
+    def create_or_attach(self, key: str) -> Tuple[str, bool]:
+        """Return ``(job_id, created)``; attaches to an active job with the same key."""
+        with self._cond:
+            self._prune()
+            job_id = self._active.get(key)
+            if job_id is not None:
+                return job_id, False
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self._jobs[job_id] = {"id": job_id, "key": key, "status": "queued", "result": None, "error": None, "created_at": now, "updated_at": now}
+            self._active[key] = job_id
+            return job_id, True
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._cond:
+            job = self._jobs[job_id]
+            job.update(fields, updated_at=time.time())
+            if job["status"] in FINISHED:
+                self._active.pop(job["key"], None)
+            self._cond.notify_all()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Block until the job finishes or ``timeout`` elapses and return its current state."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job["status"] in FINISHED or remaining <= 0:
+                    return dict(job) if job is not None else None
+                self._cond.wait(remaining)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl
+        for job_id in [j for j, job in self._jobs.items() if job["status"] in FINISHED and job["updated_at"] < cutoff]:
+            del self._jobs[job_id]
+
+
+LOST_ERROR = "worker lost: the job's lease expired before it finished"
+
+
+class SQLiteJobStore(JobStore):
+    """Job store backed by SQLite so several worker processes share jobs and de-duplication."""
+
+    poll_interval = 0.1
+
+    def __init__(self, path: str, ttl: float = 3600.0, lease: float = 60.0):
+        super().__init__(ttl=ttl)
+        self.path = path
+        self.lease = lease
+        # active jobs created (and executed) by this process, kept alive by the heartbeat
+        self._owned: set = set()
+        self._heartbeat: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, key TEXT NOT NULL, status TEXT NOT NULL, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status)")
+
+    def _row(self, row: Any) -> Dict[str, Any]:
+        job = dict(zip(("id", "key", "status", "result", "error", "created_at", "updated_at"), row))
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def _expire(self, now: float) -> None:
+        # caller holds self._lock; fails active jobs whose owner stopped renewing the lease
+        self._conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE status IN (?, ?) AND updated_at < ?",
+            (LOST_ERROR, now) + ACTIVE + (now - self.lease,),
+        )
+
+    def _renew(self) -> None:
+        while True:
+            time.sleep(self.lease / 3)
+            with self._lock:
+                owned = list(self._owned)
+                if owned:
+                    marks = ", ".join("?" * len(owned))
+                    self._conn.execute(f"UPDATE jobs SET updated_at = ? WHERE status IN (?, ?) AND id IN ({marks})", (time.time(),) + ACTIVE + tuple(owned))
+
+    def create_or_attach(self, key: str) -> Tuple[str, bool]:
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", FINISHED + (now - self.ttl,))
+                self._expire(now)
+                row = conn.execute("SELECT id FROM jobs WHERE key = ? AND status IN (?, ?) LIMIT 1", (key,) + ACTIVE).fetchone()
+                if row is not None:
+                    conn.execute("COMMIT")
+                    return row[0], False
+                job_id = uuid.uuid4().hex
+                conn.execute("INSERT INTO jobs VALUES (?, ?, 'queued', NULL, NULL, ?, ?)", (job_id, key, now, now))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._owned.add(job_id)
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._renew, daemon=True, name="autopr-job-lease")
+                self._heartbeat.start()
+            return job_id, True
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], default=json_default)
+        fields["updated_at"] = time.time()
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", tuple(fields.values()) + (job_id,))
+            if fields.get("status") in FINISHED:
+                self._owned.discard(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT id, key, status, result, error, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row[2] in ACTIVE and row[6] < time.time() - self.lease:
+                self._expire(time.time())
+                row = self._conn.execute("SELECT id, key, status, result, error, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row is not None else None
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED or time.monotonic() >= deadline:
+                return job
+            time.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+
+def _post_callback(url: str, job: Dict[str, Any]) -> bool:
+    """POST the job to ``url``; False if it failed (connection error or non-2xx answer)."""
+    body = json.dumps(public_view(job), default=json_default).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=5):
+            return True
+    except Exception:
+        return False
+
+
+def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: job[k] for k in ("id", "status", "result", "error", "created_at", "updated_at")}
+
+
+class JobManager:
+    """Runs review jobs on a local thread pool on top of a ``JobStore``."""
+
+    def __init__(self, store: JobStore, workers: int = 4, runner: Callable[..., Dict[str, Any]] | None = None, callback_timeout: float = 3600.0):
+        self.store = store
+        # how long a callback waits for its job to finish
+        self.callback_timeout = callback_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="autopr-job")
+        self._runner = runner
+        # (job id, url, deadline) of callbacks whose job has not finished yet
+        self._callbacks: List[Tuple[str, str, float]] = []
+        self._callbacks_lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._delivery = ThreadPoolExecutor(max_workers=CALLBACK_WORKERS, thread_name_prefix="autopr-callback")
+
+    def _run(self, job_id: str, kwargs: Dict[str, Any], queued_at: float) -> None:
+        metrics.job_queue_time.observe(time.monotonic() - queued_at)
+        self.store.update(job_id, status="running")
+        try:
+            runner = self._runner
+            if runner is None:
+                from . import reviewer
+
+                runner = reviewer.review_pr
+            self.store.update(job_id, status="done", result=runner(**kwargs))
+        except Exception as e:
+            self.store.update(job_id, status="failed", error=str(e))
+
+    def _notify(self, job_id: str, url: str) -> None:
+        with self._callbacks_lock:
+            self._callbacks.append((job_id, url, time.monotonic() + self.callback_timeout))
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, daemon=True, name="autopr-callback-watch")
+                self._watcher.start()
+
+    def _watch(self) -> None:
+        # one thread for every pending callback; it exits when none are left
+        while True:
+            with self._callbacks_lock:
+                pending = list(self._callbacks)
+                if not pending:
+                    self._watcher = None
+                    return
+            now = time.monotonic()
+            settled = []
+            for entry in pending:
+                job_id, url, deadline = entry
+                job = self.store.get(job_id)
+                if job is not None and job["status"] in FINISHED:
+                    self._delivery.submit(self._deliver, url, job)
+                    settled.append(entry)
+                elif job is None or now >= deadline:
+                    settled.append(entry)
+            with self._callbacks_lock:
+                self._callbacks = [e for e in self._callbacks if e not in settled]
+            time.sleep(CALLBACK_POLL)
+
+    def _deliver(self, url: str, job: Dict[str, Any]) -> None:
+        # best-effort; the result stays available via GET /jobs/{id} when the receiver never answers
+        deadline = time.monotonic() + CALLBACK_RETRY_WINDOW
+        delay = CALLBACK_RETRY_DELAY
+        while not _post_callback(url, job):
+            if time.monotonic() + delay >= deadline:
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def submit(self, kwargs: Dict[str, Any], callback_url: str | None = None) -> Dict[str, Any]:
+        """Queue a review (or attach to an identical in-flight one) and return its state."""
+        if callback_url:
+            validate_callback_url(callback_url)
+        job_id, created = self.store.create_or_attach(content_key(kwargs))
+        if created:
+            self._executor.submit(self._run, job_id, kwargs, time.monotonic())
+        if callback_url:
+            self._notify(job_id, callback_url)
+        job = self.store.get(job_id) or {"id": job_id, "status": "queued"}
+        return {"id": job_id, "status": job["status"], "deduplicated": not created}
+
+    def get(self, job_id: str, wait: float = 0.0) -> Optional[Dict[str, Any]]:
+        job = self.store.wait(job_id, wait) if wait > 0 else self.store.get(job_id)
+        return public_view(job) if job is not None else None
+
+
+_manager: JobManager | None = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> JobManager:
+    """Return the process-wide job manager, configured from the environment on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            ttl = float(os.getenv("AUTOPR_JOB_TTL", "3600"))
+            db = os.getenv("AUTOPR_JOB_DB")
+            store = SQLiteJobStore(db, ttl=ttl, lease=float(os.getenv("AUTOPR_JOB_LEASE", "60"))) if db else JobStore(ttl=ttl)
+            _manager = JobManager(store, workers=int(os.getenv("AUTOPR_JOB_WORKERS", "4")))
+        return _manager
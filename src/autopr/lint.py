@@ -6,22 +6,24 @@ PATH, we can extend to call it; for now we provide conservative, fast checks.
 """
 from __future__ import annotations
 
-from typing import List, Dict, Any
+from typing import List
 
+from .findings import Finding
 
-def run_basic_lint(code: str) -> List[Dict[str, Any]]:
-    findings: List[Dict[str, Any]] = []
+
+def run_basic_lint(code: str) -> List[Finding]:
+    findings: List[Finding] = []
 
     for i, ln in enumerate(code.splitlines(), start=1):
         if len(ln) > 120:
-            findings.append({"type": "long_line", "message": "Line exceeds 120 characters", "line": i, "severity": "low"})
+            findings.append(Finding("long_line", "Line exceeds 120 characters", "low", line=i))
         if ln.endswith(" "):
-            findings.append({"type": "trailing_whitespace", "message": "Trailing whitespace", "line": i, "severity": "low"})
+            findings.append(Finding("trailing_whitespace", "Trailing whitespace", "low", line=i))
         if "import *" in ln:
-            findings.append({"type": "wildcard_import", "message": "Wildcard import found; avoid using import *", "line": i, "severity": "medium"})
+            findings.append(Finding("wildcard_import", "Wildcard import found; avoid using import *", "medium", line=i))
 
     # detect obvious 'eval(' calls
     if "eval(" in code:
-        findings.append({"type": "unsafe_eval", "message": "Use of eval() detected; this can be dangerous", "severity": "high"})
+        findings.append(Finding("unsafe_eval", "Use of eval() detected; this can be dangerous", "high"))
 
     return findings
@@ -1,24 +1,196 @@
 import os
-from typing import Dict, Any
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from . import cancellation, hedging, metrics, resilience, routing, secret_scan
+from .scheduler import provider_slot
 from .providers import OpenAIProvider, AnthropicProvider, StubProvider
 
+# provider methods whose latency and errors are recorded in autopr.metrics
+INSTRUMENTED = frozenset({"generate_pr_title", "generate_pr_description", "review_code", "amend_pr_description", "amend_review", "_chat"})
+# streaming methods: instrumented until the returned iterator is exhausted or closed
+STREAMED = frozenset({"stream_pr_description", "stream_review_code", "_stream_chat"})
+# provider methods whose arguments are passed through secret_scan.redact first
+REDACTED = INSTRUMENTED | STREAMED
 
-def _choose_provider() -> Any:
-    provider = os.getenv("AUTOPR_PROVIDER", "stub").lower()
-    if provider == "openai":
-        try:
-            return OpenAIProvider()
-        except Exception:
-            # fallback to stub if library missing or misconfigured
-            return StubProvider()
-    if provider == "anthropic":
-        try:
-            return AnthropicProvider()
-        except Exception:
-            return StubProvider()
 
-    return StubProvider()
+PROVIDER_CLASSES = {"openai": OpenAIProvider, "anthropic": AnthropicProvider}
 
 
-llm = _choose_provider()
+def parse_provider_list(value: str) -> List[Tuple[str, Optional[str]]]:
+    """Parse ``"openai,anthropic:claude-3-5-sonnet"`` into ``[(name, model), ...]``."""
+    specs = []
+    for item in value.split(","):
+        name, _, model = item.strip().partition(":")
+        if name:
+            specs.append((name.lower(), model or None))
+    return specs
+
+
+class InstrumentedProvider:
+    """One backend whose calls hold its ``provider_slot`` and are recorded in the provider metrics.
+
+    Each backend of a hedged provider is wrapped on its own, so the
+    ``AUTOPR_PROVIDER_CONCURRENCY`` slots and the metrics are per backend.
+    A streamed call holds its slot, and is timed, until its iterator is
+    exhausted or closed. Other attributes are forwarded to the backend.
+    """
+
+    def __init__(self, backend: Any):
+        self.backend = backend
+        self.label = getattr(backend, "label", None) or type(backend).__name__
+        # two backends of one provider class with different models get separate slots
+        model = getattr(getattr(backend, "inner", backend), "model", None)
+        self.slot = f"{self.label}:{model}" if model else self.label
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        attr = getattr(self.backend, name)
+        if name in INSTRUMENTED:
+            return self._timed(name, attr)
+        if name in STREAMED:
+            return self._streamed(name, attr)
+        return attr
+
+    def _timed(self, name: str, attr: Any) -> Any:
+        label, slot = self.label, self.slot
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            cancellation.check()
+            with provider_slot(slot):
+                # a superseded review may have waited here; do not send its call
+                cancellation.check()
+                start = time.perf_counter()
+                try:
+                    return attr(*args, **kwargs)
+                except Exception:
+                    metrics.provider_errors.inc(provider=label, method=name)
+                    raise
+                finally:
+                    metrics.provider_latency.observe(time.perf_counter() - start, provider=label, method=name)
+
+        return timed
+
+    def _streamed(self, name: str, attr: Any) -> Any:
+        label, slot = self.label, self.slot
+
+        def streamed(*args: Any, **kwargs: Any) -> Iterator[str]:
+            cancellation.check()
+            with provider_slot(slot):
+                cancellation.check()
+                start = time.perf_counter()
+                try:
+                    # closing this generator closes the provider's stream and releases the slot
+                    yield from attr(*args, **kwargs)
+                except Exception:
+                    metrics.provider_errors.inc(provider=label, method=name)
+                    raise
+                finally:
+                    metrics.provider_latency.observe(time.perf_counter() - start, provider=label, method=name)
+
+        return streamed
+
+
+def build_provider(name: str, model: Optional[str] = None) -> Any:
+    """Construct one instrumented backend wrapped in the resilience layer; ``None`` if it is unavailable."""
+    if name == "stub":
+        return InstrumentedProvider(StubProvider())
+    cls = PROVIDER_CLASSES.get(name)
+    if cls is None:
+        return None
+    try:
+        return InstrumentedProvider(resilience.from_env(cls(model=model)))
+    except Exception:
+        # library missing or misconfigured
+        metrics.provider_fallbacks.inc(requested=name)
+        return None
+
+
+def _choose_provider(model: Optional[str] = None) -> Any:
+    """Build the provider from ``AUTOPR_PROVIDERS`` (ordered, hedged) or ``AUTOPR_PROVIDER``.
+
+    A bare ``model`` (``"gpt-4o-mini"``) overrides the model of the primary
+    backend only, since it names a model of that provider; hedge backends keep
+    their own. A value with ``:`` or ``,`` is a provider list of its own
+    (``"openai:gpt-4o-mini,anthropic:claude-3-haiku"``).
+    """
+    if model and (":" in model or "," in model):
+        specs = parse_provider_list(model)
+    else:
+        specs = parse_provider_list(os.getenv("AUTOPR_PROVIDERS") or os.getenv("AUTOPR_PROVIDER", "stub"))
+        if model and specs:
+            specs[0] = (specs[0][0], model)
+    backends = [p for p in (build_provider(name, model) for name, model in specs) if p is not None]
+    if not backends:
+        # fallback to stub so the app stays usable offline
+        return InstrumentedProvider(StubProvider())
+    return hedging.from_env(backends)
+
+
+def _redacting(method: Any) -> Any:
+    def call(*args: Any, **kwargs: Any) -> Any:
+        # secrets in the diff, commits or previous results never leave the process
+        return method(*secret_scan.redact_value(args), **secret_scan.redact_value(kwargs))
+
+    return call
+
+
+class LazyProvider:
+    """Proxy that builds the configured provider on first use.
+
+    Importing ``autopr.llm`` must stay cheap: commands such as ``pr-ai ci-parse``
+    never call a provider, and constructing one can import an SDK and create
+    HTTP clients. Attribute access is forwarded to the real provider, which is
+    created once (thread-safe) from the environment at that moment. Concurrency
+    slots and metrics are per backend (see ``InstrumentedProvider``).
+    """
+
+    def __init__(self, factory=_choose_provider):
+        self._factory = factory
+        self._provider: Any = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Any:
+        provider = self._provider
+        if provider is None:
+            with self._lock:
+                if self._provider is None:
+                    self._provider = self._factory()
+                provider = self._provider
+        return provider
+
+    def reset(self) -> None:
+        """Drop the built provider so the next use re-reads the environment."""
+        with self._lock:
+            self._provider = None
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        attr = getattr(self.get(), name)
+        if name in REDACTED and secret_scan.redaction_enabled():
+            attr = _redacting(attr)
+        return attr
+
+
+llm = LazyProvider()
+
+_routes: Dict[str, LazyProvider] = {}
+_routes_lock = threading.Lock()
+
+
+def provider_for(route: str, default: Any = None) -> Any:
+    """Provider for a routing decision, using ``AUTOPR_<ROUTE>_MODEL`` (e.g. ``AUTOPR_SMALL_MODEL``).
+
+    Routes without a configured model use ``default`` (the module-level ``llm`` if not given).
+    """
+    model = routing.model_for(route)
+    if not model:
+        return default if default is not None else llm
+    with _routes_lock:
+        provider = _routes.get(model)
+        if provider is None:
+            provider = _routes[model] = LazyProvider(lambda: _choose_provider(model))
+        return provider
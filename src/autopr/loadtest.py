@@ -0,0 +1,153 @@
+"""Load-test harness for the AutoPR API.
+
+``run_loadtest`` fires ``requests`` synthetic review (or generate) requests at
+the API with ``concurrency`` in flight and reports throughput, status counts
+and latency percentiles. By default the FastAPI app is driven in-process
+through httpx's ASGI transport; pass ``url`` to target a running server.
+
+With ``mock=True`` a local ``mockserver`` is started and the in-process app is
+pointed at it through the real provider (``OPENAI_BASE_URL`` /
+``ANTHROPIC_BASE_URL``). The load test then covers the SDK client, retries and
+resilience layer, not just ``StubProvider``. The provider SDK must be
+installed; otherwise selection falls back to the stub and the report says so.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from . import mockserver
+
+ENDPOINTS = ("/review", "/generate", "/review/stream", "/generate/stream")
+
+
+def synthetic_diff(rng: random.Random, max_lines: int = 400) -> str:
+    """A small Python diff; sizes are skewed so most requests are small, a few large."""
+    lines = min(max_lines, int(rng.paretovariate(1.2) * 5))
+    name = f"module_{rng.randrange(1000)}.py"
+    body = [f"--- a/{name}", f"+++ b/{name}"]
+    for i in range(lines):
+        if i % 10 == 0:
+            body.append(f"+def handler_{i}(request):")
+        elif rng.random() < 0.05:
+            body.append(f"+    print(request)  # TODO remove {i}")
+        else:
+            body.append(f"+    value_{i} = request.get('field_{i}')")
+    return "\n".join(body) + "\n"
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0 for an empty list)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(p / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(results: List[Tuple[int, float]], duration: float) -> Dict[str, Any]:
+    latencies = sorted(lat for _, lat in results)
+    statuses: Dict[str, int] = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = sum(n for s, n in statuses.items() if s.startswith("2"))
+    return {
+        "requests": len(results),
+        "ok": ok,
+        "statuses": statuses,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(len(results) / duration, 2) if duration > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+    }
+
+
+async def _drive(client: Any, endpoint: str, payloads: List[Dict[str, Any]], concurrency: int) -> List[Tuple[int, float]]:
+    sem = asyncio.Semaphore(concurrency)
+    results: List[Tuple[int, float]] = []
+
+    async def one(payload: Dict[str, Any]) -> None:
+        async with sem:
+            start = time.perf_counter()
+            try:
+                # read the full body so streaming endpoints are timed to the last event
+                resp = await client.post(endpoint, json=payload)
+                await resp.aread()
+                status = resp.status_code
+            except Exception:
+                status = 0
+            results.append((status, time.perf_counter() - start))
+
+    await asyncio.gather(*(one(p) for p in payloads))
+    return results
+
+
+def _mock_env(server: mockserver.MockServer, provider: str) -> Dict[str, str]:
+    if provider == "anthropic":
+        return {"AUTOPR_PROVIDER": "anthropic", "ANTHROPIC_BASE_URL": server.url, "ANTHROPIC_API_KEY": "mock-key"}
+    return {"AUTOPR_PROVIDER": "openai", "OPENAI_BASE_URL": server.url + "/v1", "OPENAI_API_KEY": "mock-key"}
+
+
+def run_loadtest(requests: int = 200, concurrency: int = 16, endpoint: str = "/review", url: str | None = None, mock: bool = False, mock_config: mockserver.MockConfig | None = None, provider: str = "openai", seed: int = 0) -> Dict[str, Any]:
+    """Run the load test and return the report dict."""
+    import httpx
+
+    if endpoint not in ENDPOINTS:
+        raise ValueError(f"endpoint must be one of {', '.join(ENDPOINTS)}")
+    if mock and url:
+        raise ValueError("mock mode drives the app in-process; start `pr-ai mock-server` separately for a remote server")
+    rng = random.Random(seed)
+    payloads = [{"diff": synthetic_diff(rng), "commits": [f"feat: change {i}"]} for i in range(requests)]
+
+    server = None
+    saved: Dict[str, str | None] = {}
+    if mock:
+        server = mockserver.start(mock_config or mockserver.MockConfig(seed=seed))
+        env = _mock_env(server, provider)
+        # AUTOPR_PROVIDERS would take precedence over the mock provider
+        env["AUTOPR_PROVIDERS"] = ""
+        saved = {k: os.environ.get(k) for k in env}
+        os.environ.update(env)
+    provider_label = None
+    try:
+        if url:
+            client = httpx.AsyncClient(base_url=url, timeout=None)
+        else:
+            from .llm import llm
+            from .main import app
+
+            # rebuild the provider from the (possibly mock) environment
+            llm.reset()
+            provider_label = getattr(llm.get(), "label", None) or type(llm.get()).__name__
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://autopr", timeout=None)
+
+        async def go() -> List[Tuple[int, float]]:
+            async with client:
+                return await _drive(client, endpoint, payloads, concurrency)
+
+        start = time.perf_counter()
+        results = asyncio.run(go())
+        report = summarize(results, time.perf_counter() - start)
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        if mock:
+            from .llm import llm
+
+            llm.reset()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    report.update({"endpoint": endpoint, "concurrency": concurrency, "provider": provider_label})
+    if server is not None:
+        report["mock"] = dict(server.config.stats, latency=server.config.latency)
+    return report
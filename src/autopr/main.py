@@ -1,14 +1,151 @@
+import json
+import os
+import time
 from typing import List, Optional
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
 from autopr.llm import llm
 from autopr import generator
 from autopr import analysis
 from autopr import reviewer
+from autopr import streaming
+from autopr import jobs
+from autopr import batch
+from autopr import metrics
+from autopr import scheduler
+from autopr import webhooks
+from autopr.findings import json_default
 
 app = FastAPI(title="AutoPR - Minimal MVP")
 
+BATCH_MAX_ITEMS = int(os.getenv("AUTOPR_BATCH_MAX_ITEMS", "1000"))
+MAX_BODY_BYTES = int(os.getenv("AUTOPR_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+
+metrics.start_flusher()
+admission = scheduler.from_env()
+
+
+class BodySizeLimit:
+    """Reject request bodies over ``MAX_BODY_BYTES`` with 413, including chunked uploads.
+
+    A body without ``Content-Length`` is read here, up to the limit, before the
+    app sees it: an error raised while the app parses the body would turn into
+    a 400, so the 413 has to be sent from the middleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        too_large = JSONResponse({"detail": f"request body exceeds {MAX_BODY_BYTES} bytes"}, status_code=413)
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                # the server never delivers more than the declared length
+                if value.isdigit() and int(value) > MAX_BODY_BYTES:
+                    return await too_large(scope, receive, send)
+                return await self.app(scope, receive, send)
+        chunks = []
+        received = 0
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # the client went away; let the app see the disconnect
+                chunks = None
+                break
+            chunks.append(message.get("body", b""))
+            received += len(chunks[-1])
+            if received > MAX_BODY_BYTES:
+                return await too_large(scope, receive, send)
+            if not message.get("more_body", False):
+                break
+        pending = [message if chunks is None else {"type": "http.request", "body": b"".join(chunks), "more_body": False}]
+
+        async def replay():
+            return pending.pop() if pending else await receive()
+
+        return await self.app(scope, replay, send)
+
+
+app.add_middleware(BodySizeLimit)
+
+
+@app.exception_handler(scheduler.Overloaded)
+async def overloaded(request: Request, exc: scheduler.Overloaded):
+    return JSONResponse({"detail": f"server overloaded ({exc.reason}), retry later"}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
+
+
+class _AdmittedStreamingResponse(StreamingResponse):
+    """Releases its admission slot when the response ends, including when the client left before it started."""
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release()
+
+
+async def _admitted_stream(events, cost: int, media_type: str) -> StreamingResponse:
+    """A streaming response that holds an admission slot for as long as it is being produced.
+
+    The slot is taken before the response starts, so an overloaded server still
+    answers ``429``; it is released once, by whichever of the body or the
+    response finishes first.
+    """
+    await admission.acquire(cost)
+    start = time.monotonic()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            admission.release(time.monotonic() - start)
+
+    async def body():
+        try:
+            async for event in iterate_in_threadpool(events):
+                yield event
+        finally:
+            release()
+            try:
+                # stops the provider stream when the client went away
+                events.close()
+            except ValueError:
+                # still running in the threadpool; it finishes on its own
+                pass
+
+    return _AdmittedStreamingResponse(body(), release, media_type=media_type)
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    metrics.http_in_flight.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.http_in_flight.dec()
+        # label by route template (not raw path) to keep cardinality bounded
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        metrics.http_requests.inc(method=request.method, endpoint=endpoint, status=status)
+        metrics.http_latency.observe(time.perf_counter() - start, endpoint=endpoint)
+        size = request.headers.get("content-length")
+        if size and size.isdigit():
+            metrics.http_request_size.observe(int(size), endpoint=endpoint)
+
 
 class GenerateRequest(BaseModel):
     diff: str = Field(..., example="+ def add(a, b):\n+     return a + b")
@@ -18,8 +155,25 @@ class GenerateRequest(BaseModel):
 
 class ReviewRequest(BaseModel):
     diff: str = Field(..., example="print(\"debug\")\n# TODO: fix")
+    commits: List[str] = Field(default_factory=list)
+    issue: Optional[str] = None
+    test_log: Optional[str] = None
+    coverage_before: Optional[str] = None
+    coverage_after: Optional[str] = None
+
+
+class BatchReviewItem(ReviewRequest):
+    id: Optional[str] = None
 
 
+class BatchReviewRequest(BaseModel):
+    items: List[BatchReviewItem]
+    llm_concurrency: int = Field(4, ge=1, le=32)
+
+
+class ReviewJobRequest(ReviewRequest):
+    callback_url: Optional[str] = Field(None, example="http://127.0.0.1:9000/autopr-callback")
+
 
 class GenerateResponse(BaseModel):
     title: str
@@ -48,34 +202,126 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of request, stage and provider metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/generate", response_model=GenerateResponse, summary="Generate PR", response_description="Auto-generated PR description")
-def generate_pr(req: GenerateRequest):
+async def generate_pr(req: GenerateRequest):
     """Generate a structured PR description from diff, commits and optional issue link.
 
     This endpoint uses the configured LLM provider (or the stub in dev) to return a JSON object
     describing the PR title, what changed, why it changed, impacted files, tests, risk level and rollback plan.
     """
-    desc = generator.generate_pr_from(req.diff, req.commits, req.issue)
+    async with admission.slot(scheduler.estimate_cost(req.diff)):
+        desc = await run_in_threadpool(generator.generate_pr_from, req.diff, req.commits, req.issue)
     # Ensure we return a shape matching the model - if provider returns a 'raw' fallback, adapt it
-    if isinstance(desc, dict) and "title" in desc:
-        return {k: desc.get(k, "") for k in GenerateResponse.__fields__.keys()}
-    # minimal fallback
-    return GenerateResponse(
-        title=str(desc.get("title", "Auto PR")) if isinstance(desc, dict) else str(desc),
-        what_changed=desc.get("what_changed", "") if isinstance(desc, dict) else "",
-        why=desc.get("why", "") if isinstance(desc, dict) else "",
-        files_impacted=desc.get("files_impacted", []) if isinstance(desc, dict) else [],
-        tests=desc.get("tests", "") if isinstance(desc, dict) else "",
-        risk_level=desc.get("risk_level", "unknown") if isinstance(desc, dict) else "unknown",
-        rollback_plan=desc.get("rollback_plan", "") if isinstance(desc, dict) else "",
-    )
+    return streaming.shape_description(desc)
+
+
+@app.post("/generate/stream", summary="Generate PR (server-sent events)")
+async def generate_pr_stream(req: GenerateRequest):
+    """Stream PR generation as `text/event-stream`.
+
+    Emits the parsed diff context first, then each description field as it is decoded
+    from the provider's streaming response, then a final `result` event with the same
+    object `/generate` returns plus validation info.
+    """
+    events = streaming.stream_generate(req.diff, req.commits, req.issue)
+    return await _admitted_stream(events, scheduler.estimate_cost(req.diff), media_type="text/event-stream")
 
 
 @app.post("/review", response_model=ReviewResponse, summary="Review PR", response_description="AI-assisted code review findings")
-def review_pr(req: ReviewRequest):
+async def review_pr(req: ReviewRequest):
     """Analyze a diff and return review findings and a confidence score.
 
     The review output includes a brief summary, list of findings, each optionally annotated with a severity, and an overall confidence.
     """
-    out = reviewer.review_pr(req.diff)
-    return out
+    async with admission.slot(scheduler.estimate_cost(req.diff)):
+        return await run_in_threadpool(reviewer.review_pr, req.diff, commits=req.commits, issue_text=req.issue, test_log=req.test_log, coverage_before=req.coverage_before, coverage_after=req.coverage_after)
+
+
+@app.post("/review/stream", summary="Review PR (server-sent events)")
+async def review_pr_stream(req: ReviewRequest):
+    """Stream a review as `text/event-stream`.
+
+    In-process deterministic findings (lint, secrets, tests, coverage) are emitted immediately,
+    LLM findings and fields follow as they are decoded, static analysis and impact findings
+    arrive in a second `deterministic` event when ready, and a final `result` event carries
+    the merged, validated review.
+    """
+    events = streaming.stream_review(req.diff, commits=req.commits, issue_text=req.issue, test_log=req.test_log, coverage_before=req.coverage_before, coverage_after=req.coverage_after)
+    return await _admitted_stream(events, scheduler.estimate_cost(req.diff), media_type="text/event-stream")
+
+
+@app.post("/review/batch", summary="Review many diffs")
+async def review_batch(req: BatchReviewRequest):
+    """Review a list of diffs and stream results as newline-delimited JSON.
+
+    Each line is `{"id": ..., "review": {...}}` or `{"id": ..., "error": "..."}`, in
+    completion order. Items without an `id` are identified by a hash of their diff.
+    """
+    if len(req.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"at most {BATCH_MAX_ITEMS} items per batch")
+    items = []
+    for n, item in enumerate(req.items, start=1):
+        data = item.model_dump() if hasattr(item, "model_dump") else item.dict()
+        data["id"] = batch.item_id(data, n)
+        items.append(data)
+
+    async def lines():
+        # each item is admitted like a /review request, so a batch cannot crowd out interactive reviews
+        async for rec in batch.iter_reviews(items, llm_concurrency=req.llm_concurrency, admission=admission):
+            yield json.dumps(rec, default=json_default) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/jobs/review", status_code=202, summary="Queue a review job")
+def submit_review_job(req: ReviewJobRequest):
+    """Queue a review and return its job id immediately.
+
+    Identical payloads submitted while a job is queued or running attach to that job
+    (`deduplicated: true`) instead of starting new work. An optional `callback_url` on
+    the local host receives the finished job as a JSON POST.
+    """
+    kwargs = {"diff": req.diff, "commits": req.commits, "issue_text": req.issue, "test_log": req.test_log, "coverage_before": req.coverage_before, "coverage_after": req.coverage_after}
+    try:
+        return jobs.get_manager().submit(kwargs, callback_url=req.callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/jobs/{job_id}", summary="Get a review job")
+def get_review_job(job_id: str, wait: float = Query(0.0, ge=0.0, le=60.0, description="Long-poll for up to this many seconds")):
+    """Return the job status and, once finished, its result or error."""
+    job = jobs.get_manager().get(job_id, wait=wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+
+@app.post("/webhooks/github", status_code=202, summary="GitHub webhook receiver")
+async def github_webhook(request: Request):
+    """Queue a review for `pull_request` events signed with `GITHUB_WEBHOOK_SECRET`.
+
+    Pushes to the same PR within the debounce window are coalesced into one review of the
+    latest head, and a running review of an older head is cancelled. Other events are
+    acknowledged and ignored.
+    """
+    secret = os.getenv("GITHUB_WEBHOOK_SECRET")
+    if not secret:
+        raise HTTPException(status_code=503, detail="GITHUB_WEBHOOK_SECRET is not configured")
+    body = await request.body()
+    if not webhooks.verify_signature(secret, body, request.headers.get("X-Hub-Signature-256")):
+        raise HTTPException(status_code=401, detail="invalid webhook signature")
+    event = request.headers.get("X-GitHub-Event", "")
+    if event == "ping":
+        return {"status": "pong"}
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid JSON payload")
+    return webhooks.get_queue().handle(event, payload)
@@ -0,0 +1,255 @@
+"""Prometheus-compatible metrics without external dependencies.
+
+Counters, gauges and histograms are kept per process; each update takes one
+short per-metric lock. ``render()`` produces the Prometheus text exposition
+format served by ``GET /metrics``.
+
+Multi-process mode: when ``AUTOPR_METRICS_DIR`` is set (e.g. several uvicorn
+workers), every process writes a snapshot of its metrics to
+``<dir>/metrics-<pid>.json`` — on each scrape and from a background thread every
+``AUTOPR_METRICS_FLUSH`` seconds (default 5) — and ``render()`` sums the
+snapshots of all processes. Gauges of processes that are no longer alive are
+dropped; their counters and histograms are kept so totals stay monotonic.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_registry: Dict[str, "_Metric"] = {}
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {json.dumps(k): (list(v) if isinstance(v, list) else v) for k, v in self._values.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; values are ``[bucket counts..., sum, count]``."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def time(self, **labels: Any) -> "_Timer":
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, hist: Histogram, labels: Dict[str, Any]):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.hist.observe(time.perf_counter() - self.start, **self.labels)
+
+
+# --- metrics used across the app -------------------------------------------------
+
+http_requests = Counter("autopr_http_requests_total", "HTTP requests by endpoint and status", ("method", "endpoint", "status"))
+http_latency = Histogram("autopr_http_request_duration_seconds", "HTTP request latency until response headers", ("endpoint",))
+http_request_size = Histogram("autopr_http_request_size_bytes", "HTTP request body size", ("endpoint",), buckets=SIZE_BUCKETS)
+http_in_flight = Gauge("autopr_http_requests_in_flight", "HTTP requests currently being handled")
+stage_latency = Histogram("autopr_stage_duration_seconds", "Review pipeline stage duration", ("stage", "outcome"))
+provider_latency = Histogram("autopr_provider_call_duration_seconds", "LLM provider call duration", ("provider", "method"))
+provider_errors = Counter("autopr_provider_errors_total", "LLM provider calls that raised", ("provider", "method"))
+provider_fallbacks = Counter("autopr_provider_fallbacks_total", "Provider construction fell back to StubProvider", ("requested",))
+job_queue_time = Histogram("autopr_job_queue_seconds", "Time review jobs wait before a worker picks them up")
+
+
+# --- multi-process snapshots -----------------------------------------------------
+
+_flusher_started = False
+_flusher_lock = threading.Lock()
+
+
+def _metrics_dir() -> str | None:
+    return os.getenv("AUTOPR_METRICS_DIR") or None
+
+
+def _local_snapshot() -> Dict[str, Any]:
+    return {name: m.snapshot() for name, m in _registry.items()}
+
+
+def flush() -> None:
+    """Write this process's snapshot to the metrics directory (multi-process mode)."""
+    directory = _metrics_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(_local_snapshot(), fh)
+    os.replace(tmp, path)
+
+
+def start_flusher() -> None:
+    """Start the periodic snapshot thread once per process (no-op without a metrics dir)."""
+    global _flusher_started
+    if not _metrics_dir():
+        return
+    with _flusher_lock:
+        if _flusher_started:
+            return
+        _flusher_started = True
+    interval = float(os.getenv("AUTOPR_METRICS_FLUSH", "5"))
+
+    def loop() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                flush()
+            except OSError:
+                pass
+
+    threading.Thread(target=loop, name="autopr-metrics-flush", daemon=True).start()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _collect() -> Dict[str, Dict[str, Any]]:
+    directory = _metrics_dir()
+    if not directory:
+        return _local_snapshot()
+    flush()
+    merged: Dict[str, Dict[str, Any]] = {}
+    for fname in os.listdir(directory):
+        if not (fname.startswith("metrics-") and fname.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, fname), encoding="utf-8") as fh:
+                snap = json.load(fh)
+            alive = _pid_alive(int(fname[len("metrics-"):-len(".json")]))
+        except (OSError, ValueError):
+            continue
+        for name, values in snap.items():
+            metric = _registry.get(name)
+            if metric is None or (metric.kind == "gauge" and not alive):
+                continue
+            into = merged.setdefault(name, {})
+            for key, value in values.items():
+                if isinstance(value, list):
+                    prev = into.get(key) or [0.0] * len(value)
+                    into[key] = [a + b for a, b in zip(prev, value)]
+                else:
+                    into[key] = into.get(key, 0.0) + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Tuple[str, ...], values: List[str], le: str | None = None) -> str:
+    pairs = list(zip(names, values))
+    if le is not None:
+        pairs.append(("le", le))
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def render() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    data = _collect()
+    lines: List[str] = []
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(data.get(name, {}).items()):
+            labels = json.loads(key)
+            if isinstance(metric, Histogram):
+                for bound, count in zip(metric.buckets, value):
+                    lines.append(f"{name}_bucket{_fmt_labels(metric.labels, labels, str(bound))} {_num(count)}")
+                lines.append(f"{name}_bucket{_fmt_labels(metric.labels, labels, '+Inf')} {_num(value[-1])}")
+                lines.append(f"{name}_sum{_fmt_labels(metric.labels, labels)} {_num(value[-2])}")
+                lines.append(f"{name}_count{_fmt_labels(metric.labels, labels)} {_num(value[-1])}")
+            else:
+                lines.append(f"{name}{_fmt_labels(metric.labels, labels)} {_num(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Clear all in-process values (tests)."""
+    for metric in _registry.values():
+        metric.clear()
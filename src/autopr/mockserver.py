@@ -0,0 +1,272 @@
+"""Local OpenAI/Anthropic-compatible mock server for load tests.
+
+``StubProvider`` answers instantly in-process, so it never exercises the real
+provider code paths: SDK clients, HTTP connection pooling, retries or streaming.
+This server speaks the two wire formats the real providers use:
+
+- ``POST /v1/chat/completions`` (OpenAI chat completions, ``stream: true`` as SSE)
+- ``POST /v1/messages`` (Anthropic messages, ``stream: true`` as SSE events)
+
+Point the providers at it with ``OPENAI_BASE_URL=http://127.0.0.1:<port>/v1`` or
+``ANTHROPIC_BASE_URL=http://127.0.0.1:<port>`` and any API key.
+
+Faults are injected per request. A request can be delayed by a latency
+distribution, fail with a 500 (``error_rate``), be rejected with a 429 and a
+``Retry-After`` header (``rate_limit_rate``), or get a body cut off mid-JSON
+(``malformed_rate``). Answers are valid review or PR-description JSON, chosen
+by which prompt was sent.
+
+Latency specs: ``fixed:MS``, ``uniform:LO,HI``, ``lognormal:MEDIAN_MS,SIGMA`` and
+``exp:MEAN_MS``.
+"""
+from __future__ import annotations
+
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Return a sampler of seconds for a latency spec such as ``lognormal:300,0.8``."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] if args else []
+    if kind == "fixed":
+        ms = values[0] if values else 0.0
+        return lambda rng: ms / 1000.0
+    if kind == "uniform":
+        lo, hi = values
+        return lambda rng: rng.uniform(lo, hi) / 1000.0
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median), sigma) / 1000.0
+    if kind == "exp":
+        mean = values[0]
+        return lambda rng: rng.expovariate(1.0 / mean) / 1000.0
+    raise ValueError(f"unknown latency spec: {spec!r}")
+
+
+class MockConfig:
+    def __init__(self, latency: str = "fixed:0", error_rate: float = 0.0, rate_limit_rate: float = 0.0, malformed_rate: float = 0.0, retry_after: int = 1, chunk_chars: int = 16, seed: int | None = None):
+        self.latency = latency
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after = retry_after
+        self.chunk_chars = chunk_chars
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "malformed": 0}
+
+    def draw(self) -> tuple:
+        """Pick ``(delay_seconds, outcome)`` for one request under the lock (shared RNG)."""
+        with self.lock:
+            delay = self.sample_latency(self.rng)
+            roll = self.rng.random()
+            if roll < self.rate_limit_rate:
+                outcome = "rate_limited"
+            elif roll < self.rate_limit_rate + self.error_rate:
+                outcome = "errors"
+            elif roll < self.rate_limit_rate + self.error_rate + self.malformed_rate:
+                outcome = "malformed"
+            else:
+                outcome = "ok"
+            self.stats["requests"] += 1
+            self.stats[outcome] += 1
+        return delay, outcome
+
+
+def answer_for(prompt: str) -> str:
+    """Valid JSON matching what the prompt asks for."""
+    lowered = prompt.lower()
+    if "code reviewer" in lowered:
+        return json.dumps({
+            "summary": "Mock review: changes look reasonable.",
+            "findings": [{"type": "style", "message": "Consider adding a docstring.", "severity": "low"}],
+            "confidence": 0.8,
+        })
+    if "pr description" in lowered or "what_changed" in lowered:
+        return json.dumps({
+            "title": "Mock: update code",
+            "what_changed": "Mock description of the change.",
+            "why": "Generated by the AutoPR mock server.",
+            "files_impacted": ["mock.py"],
+            "tests": "Mock tests",
+            "risk_level": "low",
+            "rollback_plan": "Revert the commit.",
+        })
+    return "Mock: update code"
+
+
+def _chunks(text: str, size: int) -> Iterator[str]:
+    for i in range(0, len(text), max(1, size)):
+        yield text[i:i + size]
+
+
+def _openai_prompt(body: Dict[str, Any]) -> str:
+    return "\n".join(str(m.get("content", "")) for m in body.get("messages", []) if isinstance(m, dict))
+
+
+def _anthropic_prompt(body: Dict[str, Any]) -> str:
+    parts: List[str] = []
+    for m in body.get("messages", []):
+        content = m.get("content", "") if isinstance(m, dict) else ""
+        if isinstance(content, list):
+            parts.extend(str(block.get("text", "")) for block in content if isinstance(block, dict))
+        else:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+
+def _sse(data: Any, event: str | None = None) -> bytes:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {data if isinstance(data, str) else json.dumps(data)}\n\n".encode("utf-8")
+
+
+def _openai_response(model: str, text: str) -> Dict[str, Any]:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": len(text) // 4, "total_tokens": len(text) // 4},
+    }
+
+
+def _openai_stream(model: str, text: str, size: int) -> Iterator[bytes]:
+    cid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    base = {"id": cid, "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+    yield _sse(dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]))
+    for piece in _chunks(text, size):
+        yield _sse(dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}]))
+    yield _sse(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+    yield _sse("[DONE]")
+
+
+def _anthropic_response(model: str, text: str) -> Dict[str, Any]:
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:12]}",
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 0, "output_tokens": len(text) // 4},
+    }
+
+
+def _anthropic_stream(model: str, text: str, size: int) -> Iterator[bytes]:
+    message = dict(_anthropic_response(model, ""), content=[])
+    yield _sse({"type": "message_start", "message": message}, "message_start")
+    yield _sse({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}, "content_block_start")
+    for piece in _chunks(text, size):
+        yield _sse({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}}, "content_block_delta")
+    yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+    yield _sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": len(text) // 4}}, "message_delta")
+    yield _sse({"type": "message_stop"}, "message_stop")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, payload: Any, headers: Dict[str, str] | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self._send_raw(status, body, "application/json", headers)
+
+    def _send_raw(self, status: int, body: bytes, content_type: str, headers: Dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") in ("/health", "/v1/health"):
+            with self.server.config.lock:
+                stats = dict(self.server.config.stats)
+            self._send_json(200, {"status": "ok", "stats": stats})
+            return
+        self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"type": "invalid_request_error", "message": "invalid JSON body"}})
+            return
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/chat/completions"):
+            api = "openai"
+        elif path.endswith("/messages"):
+            api = "anthropic"
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        config = self.server.config
+        delay, outcome = config.draw()
+        time.sleep(delay)
+        if outcome == "rate_limited":
+            error = {"type": "rate_limit_error", "message": "mock rate limit"}
+            payload = {"type": "error", "error": error} if api == "anthropic" else {"error": dict(error, code="rate_limit_exceeded")}
+            self._send_json(429, payload, {"Retry-After": str(config.retry_after)})
+            return
+        if outcome == "errors":
+            error = {"type": "api_error", "message": "mock internal error"}
+            self._send_json(500, {"type": "error", "error": error} if api == "anthropic" else {"error": error})
+            return
+
+        model = str(body.get("model") or "mock-model")
+        text = answer_for(_openai_prompt(body) if api == "openai" else _anthropic_prompt(body))
+        if outcome == "malformed":
+            # a well-formed envelope cut off half-way, as seen from flaky proxies
+            full = json.dumps(_openai_response(model, text) if api == "openai" else _anthropic_response(model, text))
+            self._send_raw(200, full[: len(full) // 2].encode("utf-8"), "application/json")
+            return
+        if body.get("stream"):
+            events = _openai_stream(model, text, config.chunk_chars) if api == "openai" else _anthropic_stream(model, text, config.chunk_chars)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for event in events:
+                self.wfile.write(event)
+                self.wfile.flush()
+            self.close_connection = True
+            return
+        self._send_json(200, _openai_response(model, text) if api == "openai" else _anthropic_response(model, text))
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple, config: MockConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start(config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    """Start a mock server on a background thread (``port=0`` picks a free port)."""
+    server = MockServer((host, port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, name="autopr-mockserver", daemon=True).start()
+    return server
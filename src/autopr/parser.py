@@ -72,3 +72,50 @@ def parse_diff(diff_text: str) -> Dict[str, object]:
         "added_classes": added_classes,
         "summary": summary,
     }
+
+
+def _header_path(value: str) -> str:
+    # '+++ b/path\t2024-01-01 ...' -> 'path'; keeps '/dev/null' as is
+    path = value.split("\t", 1)[0].strip()
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+
+def split_diff(diff_text: str) -> Dict[str, str]:
+    """Split a unified diff into per-file chunks keyed by path.
+
+    The key is the new path, or the old path for deleted files. ``git diff``
+    sections without ``---``/``+++`` lines (binary files, pure renames) are keyed
+    by the ``b/`` path of their ``diff --git`` line. Text outside any file
+    section (e.g. a bare snippet) is keyed by ``""``.
+    """
+    lines = diff_text.splitlines()
+    chunks: Dict[str, List[str]] = {}
+    path = ""
+    current: List[str] = []
+    # inside a 'diff --git' header whose ---/+++ lines have not been seen yet
+    git_header = False
+
+    def flush() -> None:
+        if current:
+            chunks.setdefault(path, []).extend(current)
+
+    for i, line in enumerate(lines):
+        if line.startswith("diff --git "):
+            flush()
+            current = [line]
+            m = re.match(r"^diff --git a/.+ b/(.+)$", line)
+            path = m.group(1).strip() if m else ""
+            git_header = True
+            continue
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            if not git_header:
+                flush()
+                current = []
+            old, new = _header_path(line[4:]), _header_path(lines[i + 1][4:])
+            path = new if new != "/dev/null" else old
+            git_header = False
+        current.append(line)
+    flush()
+    return {name: "\n".join(body) + "\n" for name, body in chunks.items()}
@@ -0,0 +1,146 @@
+"""Small concurrent DAG executor for the review pipeline.
+
+Each ``Stage`` names the inputs it needs — pipeline inputs (``diff``,
+``commits``, ...) or the results of other stages — and receives them as keyword
+arguments. Stages whose inputs are ready run concurrently on a thread pool, so
+provider calls (I/O bound) overlap the CPU-bound analyzers and the wall time
+approaches that of the slowest stage rather than the sum of all of them.
+
+Failures are isolated: a stage that raises or exceeds its timeout is recorded in
+``errors`` and only the stages depending on it are skipped; everything else
+still completes. A timed-out stage's thread cannot be killed — its result is
+simply discarded.
+
+A run inherits the caller's ``cancellation`` token: stages run in copies of
+the caller's context, and a cancelled token stops the run with ``Cancelled``
+instead of waiting for the remaining stages.
+"""
+from __future__ import annotations
+
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+from . import cancellation, metrics
+
+if TYPE_CHECKING:
+    from .profiling import Profiler
+
+
+class Stage:
+    """A named unit of work with declared inputs and an optional timeout (seconds).
+
+    Inputs listed in ``optional`` are passed as ``None`` when the stage producing
+    them failed, instead of skipping this stage.
+    """
+
+    def __init__(self, name: str, func: Callable[..., Any], requires: Iterable[str] = (), timeout: float | None = None, optional: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.optional = tuple(optional)
+        self.requires = tuple(requires) + tuple(d for d in self.optional if d not in requires)
+        self.timeout = timeout
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r}, requires={self.requires!r})"
+
+
+class PipelineRun:
+    """Outcome of ``Pipeline.run``: per-stage results, errors and wall time."""
+
+    def __init__(self) -> None:
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self.elapsed: float = 0.0
+        self.perf: Optional[Dict[str, Any]] = None
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.results.get(name, default)
+
+
+class Pipeline:
+    def __init__(self, stages: Iterable[Stage], max_workers: int | None = None):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"duplicate stage: {stage.name}")
+            self.stages[stage.name] = stage
+        self.max_workers = max_workers or max(1, len(self.stages))
+
+    def _check(self, inputs: Dict[str, Any]) -> None:
+        for stage in self.stages.values():
+            for dep in stage.requires:
+                if dep not in self.stages and dep not in inputs:
+                    raise ValueError(f"stage {stage.name!r} requires unknown input {dep!r}")
+        # detect cycles with a DFS over stage dependencies
+        state: Dict[str, int] = {}
+
+        def visit(name: str) -> None:
+            if state.get(name) == 1:
+                raise ValueError(f"dependency cycle through {name!r}")
+            if state.get(name) == 2 or name not in self.stages:
+                return
+            state[name] = 1
+            for dep in self.stages[name].requires:
+                visit(dep)
+            state[name] = 2
+
+        for name in self.stages:
+            visit(name)
+
+    def run(self, inputs: Optional[Dict[str, Any]] = None, profiler: Optional["Profiler"] = None) -> PipelineRun:
+        inputs = dict(inputs or {})
+        self._check(inputs)
+        run = PipelineRun()
+        start = time.perf_counter()
+        remaining: List[Stage] = list(self.stages.values())
+        running: Dict[Future, tuple] = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="autopr-stage")
+
+        def value(name: str) -> Any:
+            return run.results[name] if name in self.stages else inputs[name]
+
+        try:
+            while remaining or running:
+                for stage in list(remaining):
+                    failed = [d for d in stage.requires if d in run.errors and d not in stage.optional]
+                    if failed:
+                        run.errors[stage.name] = f"skipped: {failed[0]} failed"
+                        remaining.remove(stage)
+                    elif all(d not in self.stages or d in run.results or d in run.errors for d in stage.requires):
+                        kwargs = {d: None if d in run.errors else value(d) for d in stage.requires}
+                        deadline = time.monotonic() + stage.timeout if stage.timeout is not None else None
+                        func = stage.func if profiler is None else profiler.wrap(stage.name, stage.func)
+                        running[executor.submit(contextvars.copy_context().run, func, **kwargs)] = (stage, deadline, time.monotonic())
+                        remaining.remove(stage)
+                if not running:
+                    continue
+
+                deadlines = [d for _, d, _ in running.values() if d is not None]
+                timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                done, _ = cancellation.wait_first(running, timeout=timeout)
+                for fut in done:
+                    stage, _, started = running.pop(fut)
+                    try:
+                        run.results[stage.name] = fut.result()
+                        outcome = "ok"
+                    except Exception as e:
+                        run.errors[stage.name] = f"{type(e).__name__}: {e}"
+                        outcome = "error"
+                    metrics.stage_latency.observe(time.monotonic() - started, stage=stage.name, outcome=outcome)
+                now = time.monotonic()
+                for fut, (stage, deadline, started) in list(running.items()):
+                    if deadline is not None and now >= deadline:
+                        running.pop(fut)
+                        fut.cancel()
+                        run.errors[stage.name] = f"timeout after {stage.timeout}s"
+                        metrics.stage_latency.observe(now - started, stage=stage.name, outcome="timeout")
+        except cancellation.Cancelled:
+            for fut in running:
+                fut.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=False)
+        run.elapsed = time.perf_counter() - start
+        return run
@@ -0,0 +1,124 @@
+"""Opt-in per-stage timing and memory instrumentation.
+
+Enabled with ``AUTOPR_PROFILE=1`` (or ``pr-ai review --profile``). For every
+pipeline stage it records wall time, CPU time of the executing thread and the
+peak ``tracemalloc`` allocation while the stage ran, and the reviewer attaches
+them as a ``_perf`` block. With ``AUTOPR_PROFILE_DUMP=<dir>`` each run also
+writes a merged cProfile/pstats file there.
+
+When profiling is off the pipeline receives ``profiler=None`` and pays a single
+``is None`` check per stage. tracemalloc is process-wide, so the peaks of
+stages that overlap in time are approximate: they can include each other's
+allocations, and one stage starting resets the peak another is tracking.
+
+``cpu_ms`` and ``peak_kb`` cover the API process only; for static analysis
+that is little more than waiting on the worker pipe. Work done in analysis
+worker processes (see ``workers``) is reported separately for the stage that
+requested it: ``worker_cpu_ms`` (user plus system time, summed over units) and
+``worker_peak_rss_kb`` (the largest peak resident set of the workers used).
+"""
+from __future__ import annotations
+
+import contextvars
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# (cpu seconds, peak rss kb) per worker unit of the stage being measured
+_worker_usage: contextvars.ContextVar[Optional[List[Tuple[float, int]]]] = contextvars.ContextVar("autopr_worker_usage", default=None)
+
+
+def enabled() -> bool:
+    return os.getenv("AUTOPR_PROFILE", "") not in ("", "0", "false")
+
+
+def record_worker_usage(cpu_seconds: float, peak_rss_kb: int) -> None:
+    """Credit a worker process's usage to the stage being profiled (no-op when not profiling)."""
+    usage = _worker_usage.get()
+    if usage is not None:
+        usage.append((cpu_seconds, peak_rss_kb))
+
+
+class Profiler:
+    """Collects per-stage measurements for a single pipeline run."""
+
+    def __init__(self, dump_dir: str | None = None):
+        self.dump_dir = dump_dir if dump_dir is not None else os.getenv("AUTOPR_PROFILE_DUMP") or None
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+        self._started_tracemalloc = False
+        self._start = 0.0
+        self.total = 0.0
+        self.dump_path: str | None = None
+
+    def __enter__(self) -> "Profiler":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.total = time.perf_counter() - self._start
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        if self.dump_dir and self._profiles:
+            self.dump_path = self._dump()
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Return ``func`` instrumented to record its measurements under ``name``."""
+
+        def measured(**kwargs: Any) -> Any:
+            prof = cProfile.Profile() if self.dump_dir else None
+            usage: List[Tuple[float, int]] = []
+            token = _worker_usage.set(usage)
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            wall, cpu = time.perf_counter(), time.thread_time()
+            if prof is not None:
+                try:
+                    prof.enable()
+                except ValueError:
+                    # Python 3.12+ allows one active profiler at a time; skip overlapping stages
+                    prof = None
+            try:
+                return func(**kwargs)
+            finally:
+                if prof is not None:
+                    prof.disable()
+                _worker_usage.reset(token)
+                record = {
+                    "wall_ms": round((time.perf_counter() - wall) * 1000, 3),
+                    "cpu_ms": round((time.thread_time() - cpu) * 1000, 3),
+                    "peak_kb": round(max(0, tracemalloc.get_traced_memory()[1] - base) / 1024, 1),
+                }
+                if usage:
+                    record["worker_cpu_ms"] = round(sum(c for c, _ in usage) * 1000, 3)
+                    record["worker_peak_rss_kb"] = max(r for _, r in usage)
+                with self._lock:
+                    self.stages[name] = record
+                    if prof is not None:
+                        self._profiles.append(prof)
+
+        return measured
+
+    def _dump(self) -> str:
+        os.makedirs(self.dump_dir, exist_ok=True)
+        path = os.path.join(self.dump_dir, f"autopr-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.pstats")
+        stats = pstats.Stats(self._profiles[0])
+        for prof in self._profiles[1:]:
+            stats.add(prof)
+        stats.dump_stats(path)
+        return path
+
+    def report(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"total_ms": round(self.total * 1000, 3), "stages": dict(self.stages)}
+        if self.dump_path:
+            out["pstats"] = self.dump_path
+        return out
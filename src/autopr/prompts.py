@@ -19,3 +19,13 @@ REVIEW_PROMPT = (
     "You are an automated code reviewer. Given a code diff, return a JSON object describing: summary, findings (array of objects with keys: type, message, severity), and confidence (0.0-1.0).\n\n"
     "Diff:\n{diff}\n\nReturn only valid JSON."
 )
+
+AMEND_DESCRIPTION_PROMPT = (
+    "You are an assistant that keeps a PR description up to date as JSON. New commits were pushed to the PR. Given the current description and the diff of only the new commits, return the updated PR description as a JSON object with the same keys: title, what_changed, why, files_impacted (array), tests (string), risk_level (low/medium/high), rollback_plan. Keep everything that is still accurate and only amend what the new commits change.\n\n"
+    "Current description:\n{previous}\n\nDiff of the new commits:\n{diff}\n\nNew commits:\n{commits}\n\nIssue: {issue}\n\n"
+    "Provide only valid JSON (no surrounding markdown).")
+
+AMEND_REVIEW_PROMPT = (
+    "You are an automated code reviewer updating a previous review after new commits were pushed. Given the previous summary, the previous findings for the files the new commits touch, and the diff of only the new commits, return a JSON object describing: summary (of the whole PR after this push), findings (array of objects with keys: type, message, severity, file) covering only the touched files and general remarks, dropping findings the new commits fix, and confidence (0.0-1.0).\n\n"
+    "Previous summary:\n{summary}\n\nPrevious findings:\n{findings}\n\nDiff of the new commits:\n{diff}\n\nReturn only valid JSON."
+)
@@ -1,9 +1,30 @@
 import os
 import json
-from typing import Any, Dict
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
 
 from . import prompts
 
+_call = threading.local()
+
+
+@contextmanager
+def request_timeout(seconds: float | None) -> Iterator[None]:
+    """Bound the SDK requests this thread makes to ``seconds`` (set by ``autopr.resilience``)."""
+    previous = getattr(_call, "timeout", None)
+    _call.timeout = seconds
+    try:
+        yield
+    finally:
+        _call.timeout = previous
+
+
+def _timeout_kwargs() -> Dict[str, Any]:
+    # only passed when set, so SDK clients (and test fakes) without the argument keep working
+    timeout = getattr(_call, "timeout", None)
+    return {"timeout": timeout} if timeout is not None else {}
+
 
 class BaseProvider:
     """Abstract provider that concrete adapters should implement."""
@@ -17,6 +38,35 @@ class BaseProvider:
     def review_code(self, diff: str) -> Dict[str, Any]:
         raise NotImplementedError()
 
+    def amend_pr_description(self, previous: Dict[str, Any], diff: str, commits: list[str], issue: str | None) -> Dict[str, Any]:
+        """Update ``previous`` for the new commits in ``diff`` (only the interdiff).
+
+        The default describes the interdiff on its own and overlays the non-empty
+        fields on the previous description.
+        """
+        update = self.generate_pr_description(diff, commits, issue)
+        if not isinstance(update, dict) or "raw" in update:
+            return update
+        return dict(previous, **{k: v for k, v in update.items() if v})
+
+    def amend_review(self, previous: Dict[str, Any], diff: str) -> Dict[str, Any]:
+        """Review only the interdiff given the previous review (``summary`` and the relevant ``findings``).
+
+        The default reviews the interdiff on its own.
+        """
+        return self.review_code(diff)
+
+    def stream_pr_description(self, diff: str, commits: list[str], issue: str | None) -> Iterator[str]:
+        """Yield the raw description text as it is produced.
+
+        Providers without native streaming yield the whole JSON document at once.
+        """
+        yield json.dumps(self.generate_pr_description(diff, commits, issue))
+
+    def stream_review_code(self, diff: str) -> Iterator[str]:
+        """Yield the raw review text as it is produced (see ``stream_pr_description``)."""
+        yield json.dumps(self.review_code(diff))
+
 
 class OpenAIProvider(BaseProvider):
     def __init__(self, api_key: str | None = None, model: str | None = None):
@@ -27,10 +77,23 @@ class OpenAIProvider(BaseProvider):
         api_key = api_key or os.getenv("OPENAI_API_KEY")
         if api_key:
             self._openai.api_key = api_key
+        self._api_key = api_key
+        self._client = None
         self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o")
 
+    def _v1_client(self) -> Any:
+        # openai>=1.0 exposes a client class; older releases only module-level helpers
+        if self._client is None and hasattr(self._openai, "OpenAI"):
+            # base_url=None lets the SDK use its default (or OPENAI_BASE_URL itself)
+            self._client = self._openai.OpenAI(api_key=self._api_key, base_url=os.getenv("OPENAI_BASE_URL") or None)
+        return self._client
+
     def _chat(self, prompt: str) -> str:
         client = self._openai
+        v1 = self._v1_client()
+        if v1 is not None:
+            resp = v1.chat.completions.create(model=self.model, messages=[{"role": "user", "content": prompt}], temperature=0.2, **_timeout_kwargs())
+            return resp.choices[0].message.content
         # Prefer ChatCompletion style but fall back to Completion if not available
         if hasattr(client, "ChatCompletion"):
             resp = client.ChatCompletion.create(model=self.model, messages=[{"role": "user", "content": prompt}], temperature=0.2)
@@ -40,6 +103,17 @@ class OpenAIProvider(BaseProvider):
         resp = client.Completion.create(model=self.model, prompt=prompt, max_tokens=800, temperature=0.2)
         return resp.choices[0].text
 
+    def _stream_chat(self, prompt: str) -> Iterator[str]:
+        v1 = self._v1_client()
+        if v1 is None:
+            yield self._chat(prompt)
+            return
+        stream = v1.chat.completions.create(model=self.model, messages=[{"role": "user", "content": prompt}], temperature=0.2, stream=True, **_timeout_kwargs())
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
     def generate_pr_title(self, diff: str, commits: list[str], issue: str | None) -> str:
         prompt = prompts.TITLE_PROMPT.format(diff=diff, commits="\n".join(commits), issue=issue or "")
         return self._chat(prompt).strip()
@@ -60,6 +134,29 @@ class OpenAIProvider(BaseProvider):
         except Exception:
             return {"raw": text}
 
+    def amend_pr_description(self, previous: Dict[str, Any], diff: str, commits: list[str], issue: str | None) -> Dict[str, Any]:
+        prompt = prompts.AMEND_DESCRIPTION_PROMPT.format(previous=json.dumps(previous, indent=2), diff=diff, commits="\n".join(commits), issue=issue or "")
+        text = self._chat(prompt)
+        try:
+            return json.loads(text)
+        except Exception:
+            return {"raw": text}
+
+    def amend_review(self, previous: Dict[str, Any], diff: str) -> Dict[str, Any]:
+        prompt = prompts.AMEND_REVIEW_PROMPT.format(summary=previous.get("summary", ""), findings=json.dumps(previous.get("findings", []), indent=2), diff=diff)
+        text = self._chat(prompt)
+        try:
+            return json.loads(text)
+        except Exception:
+            return {"raw": text}
+
+    def stream_pr_description(self, diff: str, commits: list[str], issue: str | None) -> Iterator[str]:
+        prompt = prompts.PR_DESCRIPTION_PROMPT.format(diff=diff, commits="\n".join(commits), issue=issue or "")
+        yield from self._stream_chat(prompt)
+
+    def stream_review_code(self, diff: str) -> Iterator[str]:
+        yield from self._stream_chat(prompts.REVIEW_PROMPT.format(diff=diff))
+
 
 class AnthropicProvider(BaseProvider):
     def __init__(self, api_key: str | None = None, model: str | None = None):
@@ -68,14 +165,28 @@ class AnthropicProvider(BaseProvider):
 
         self._anthropic = anthropic
         api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
-        self.client = anthropic.Client(api_key=api_key) if api_key else None
+        self.client = self._make_client(api_key, os.getenv("ANTHROPIC_BASE_URL")) if api_key else None
         self.model = model or os.getenv("ANTHROPIC_MODEL", "claude-2")
 
+    def _make_client(self, api_key: str, base_url: str | None) -> Any:
+        if base_url:
+            try:
+                return self._anthropic.Client(api_key=api_key, base_url=base_url)
+            except TypeError:
+                # older client shapes take no base_url
+                pass
+        return self._anthropic.Client(api_key=api_key)
+
     def _chat(self, prompt: str) -> str:
         # anthopic clients vary across versions; support a couple of shapes
         if self.client is None:
             raise RuntimeError("Anthropic client is not configured (missing ANTHROPIC_API_KEY)")
 
+        # current SDKs expose the messages API
+        if hasattr(self.client, "messages") and hasattr(self.client.messages, "create"):
+            resp = self.client.messages.create(model=self.model, max_tokens=800, messages=[{"role": "user", "content": prompt}], **_timeout_kwargs())
+            return "".join(getattr(block, "text", "") for block in resp.content)
+
         # Try a chat-like method
         if hasattr(self.client, "create_chat_completion"):
             resp = self.client.create_chat_completion(model=self.model, messages=[{"role": "user", "content": prompt}])
@@ -101,6 +212,15 @@ class AnthropicProvider(BaseProvider):
 
         raise RuntimeError("Unsupported Anthropic client interface")
 
+    def _stream_chat(self, prompt: str) -> Iterator[str]:
+        # the messages API streams text deltas; older client shapes only return whole completions
+        if hasattr(self.client, "messages") and hasattr(self.client.messages, "stream"):
+            with self.client.messages.stream(model=self.model, max_tokens=800, messages=[{"role": "user", "content": prompt}], **_timeout_kwargs()) as stream:
+                for text in stream.text_stream:
+                    yield text
+            return
+        yield self._chat(prompt)
+
     def generate_pr_title(self, diff: str, commits: list[str], issue: str | None) -> str:
         prompt = prompts.TITLE_PROMPT.format(diff=diff, commits="\n".join(commits), issue=issue or "")
         return self._chat(prompt).strip()
@@ -121,6 +241,29 @@ class AnthropicProvider(BaseProvider):
         except Exception:
             return {"raw": text}
 
+    def amend_pr_description(self, previous: Dict[str, Any], diff: str, commits: list[str], issue: str | None) -> Dict[str, Any]:
+        prompt = prompts.AMEND_DESCRIPTION_PROMPT.format(previous=json.dumps(previous, indent=2), diff=diff, commits="\n".join(commits), issue=issue or "")
+        text = self._chat(prompt)
+        try:
+            return json.loads(text)
+        except Exception:
+            return {"raw": text}
+
+    def amend_review(self, previous: Dict[str, Any], diff: str) -> Dict[str, Any]:
+        prompt = prompts.AMEND_REVIEW_PROMPT.format(summary=previous.get("summary", ""), findings=json.dumps(previous.get("findings", []), indent=2), diff=diff)
+        text = self._chat(prompt)
+        try:
+            return json.loads(text)
+        except Exception:
+            return {"raw": text}
+
+    def stream_pr_description(self, diff: str, commits: list[str], issue: str | None) -> Iterator[str]:
+        prompt = prompts.PR_DESCRIPTION_PROMPT.format(diff=diff, commits="\n".join(commits), issue=issue or "")
+        yield from self._stream_chat(prompt)
+
+    def stream_review_code(self, diff: str) -> Iterator[str]:
+        yield from self._stream_chat(prompts.REVIEW_PROMPT.format(diff=diff))
+
 
 class StubProvider(BaseProvider):
     """Very small stub provider retained for offline usage and tests.
@@ -0,0 +1,376 @@
+"""Rate limiting, retries, deadlines and circuit breaking for LLM providers.
+
+``ResilientProvider`` wraps any ``BaseProvider``:
+
+- two token buckets limit requests and (estimated) tokens per minute, so a
+  burst of reviews queues locally instead of collecting 429s;
+- retryable failures (429, 5xx, timeouts, connection errors) are retried with
+  full-jitter exponential backoff, honouring a ``Retry-After`` hint when the
+  SDK exposes one;
+- every call has an overall deadline covering waits, attempts and backoff;
+  streamed calls instead get a deadline for the first chunk and an idle
+  timeout between chunks (a stream cannot be retried once chunks were sent).
+  The time left is also passed to the SDK as its request timeout, so a call
+  given up on does not keep an executor thread blocked much longer;
+- a circuit breaker opens after consecutive retryable failures (a rejected
+  4xx request means the provider is up) and fails calls fast with
+  ``ProviderUnavailable`` until a probe succeeds, so reviews degrade to
+  deterministic-only findings instead of hanging on a dead provider.
+
+Every final failure is raised as ``ProviderUnavailable`` (chained to the
+original error). ``from_env`` reads the ``AUTOPR_LLM_*`` settings; see the
+README.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Iterator
+
+from . import cancellation, metrics
+from . import providers
+from .providers import BaseProvider
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+retries = metrics.Counter("autopr_provider_retries_total", "Provider call attempts that were retried", ("provider",))
+breaker_state = metrics.Gauge("autopr_provider_circuit_open", "1 while the provider circuit breaker is open", ("provider",))
+rate_limit_wait = metrics.Histogram("autopr_provider_rate_limit_wait_seconds", "Time calls wait for the local rate limiter", ("provider",))
+
+
+class ProviderUnavailable(RuntimeError):
+    """The provider could not produce a response within its limits."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``rate`` tokens per second up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0, deadline: float | None = None) -> bool:
+        """Take ``amount`` tokens, sleeping as needed; False if ``deadline`` would pass first."""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return True
+                wait = (amount - self._tokens) / self.rate
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures; half-open after ``reset_timeout``."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._clock() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        """Whether a call may proceed; in half-open state only one probe is let through."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def release_probe(self) -> None:
+        """Give up a half-open probe slot without recording an outcome."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True when this opened (or re-opened) the circuit."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._probing = False
+                return True
+            return False
+
+
+def _status(exc: BaseException) -> int | None:
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = _status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    # SDK exceptions without a status (APIConnectionError, APITimeoutError, ...)
+    name = type(exc).__name__
+    return any(word in name for word in ("Timeout", "Connection", "RateLimit", "Overloaded"))
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Seconds to wait according to the error, from ``retry_after`` or a ``Retry-After`` header."""
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or getattr(exc, "headers", None)
+        if headers is not None:
+            try:
+                value = headers.get("retry-after") or headers.get("Retry-After")
+            except AttributeError:
+                value = None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        # HTTP-date form is rare for LLM APIs; fall back to our own backoff
+        return None
+
+
+def _estimate_tokens(args: tuple, kwargs: Dict[str, Any]) -> int:
+    chars = 0
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, str):
+            chars += len(value)
+        elif isinstance(value, (list, tuple)):
+            chars += sum(len(v) for v in value if isinstance(v, str))
+    # ~4 characters per token plus the prompt template and the response
+    return chars // 4 + 1000
+
+
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="autopr-provider")
+
+
+def _bounded(timeout: float, func: Callable[..., Any], *args: Any) -> Any:
+    # runs on an executor thread: the SDK request gives up when the caller would
+    with providers.request_timeout(max(0.001, timeout)):
+        return func(*args)
+
+# end-of-stream marker for next()
+_END = object()
+
+
+class ResilientProvider(BaseProvider):
+    """Wrap ``inner`` with rate limits, retries, a deadline and a circuit breaker."""
+
+    def __init__(
+        self,
+        inner: BaseProvider,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        deadline: float = 110.0,
+        breaker: CircuitBreaker | None = None,
+        sleep: Callable[[float], None] = cancellation.sleep,
+        first_chunk_timeout: float = 60.0,
+        idle_timeout: float = 30.0,
+    ):
+        self.inner = inner
+        self.label = getattr(inner, "label", None) or type(inner).__name__
+        self.requests = TokenBucket(requests_per_minute / 60.0, max(1.0, requests_per_minute / 60.0 * 10)) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+        self.first_chunk_timeout = first_chunk_timeout
+        self.idle_timeout = idle_timeout
+
+    def _admit(self, cost: int, deadline: float) -> None:
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.label}: circuit open")
+        start = time.monotonic()
+        for bucket, amount in ((self.requests, 1), (self.tokens, cost)):
+            if bucket is not None and not bucket.acquire(amount, deadline=deadline):
+                # not a provider failure: release a half-open probe without judging it
+                self.breaker.release_probe()
+                raise ProviderUnavailable(f"{self.label}: rate limit would exceed the call deadline")
+        if self.requests is not None or self.tokens is not None:
+            rate_limit_wait.observe(time.monotonic() - start, provider=self.label)
+
+    def _fail(self, exc: BaseException) -> None:
+        if not (isinstance(exc, ProviderUnavailable) or is_retryable(exc)):
+            # a rejected request (4xx, bad output) says nothing about the provider's health
+            self.breaker.release_probe()
+            return
+        if self.breaker.record_failure():
+            breaker_state.set(1, provider=self.label)
+
+    def _succeed(self) -> None:
+        self.breaker.record_success()
+        breaker_state.set(0, provider=self.label)
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        hinted = retry_after(exc)
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Invoke ``inner.<method>`` under the resilience policy."""
+        func = getattr(self.inner, method)
+        deadline = time.monotonic() + self.deadline
+        cost = _estimate_tokens(args, kwargs)
+        attempt = 0
+        while True:
+            cancellation.check()
+            self._admit(cost, deadline)
+            remaining = deadline - time.monotonic()
+            future = _executor.submit(_bounded, remaining, lambda: func(*args, **kwargs))
+            try:
+                result = cancellation.result(future, timeout=max(0.0, remaining))
+            except cancellation.Cancelled:
+                # superseded, not a provider failure
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                self._fail(e)
+                # on 3.11+ FutureTimeout is the builtin TimeoutError, which providers raise too
+                if isinstance(e, FutureTimeout) and not future.done():
+                    # the worker thread cannot be interrupted; its late result is discarded
+                    raise ProviderUnavailable(f"{self.label}.{method}: deadline of {self.deadline}s exceeded") from None
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise ProviderUnavailable(f"{self.label}.{method}: {type(e).__name__}: {e}") from e
+                delay = self._backoff(attempt, e)
+                if time.monotonic() + delay >= deadline:
+                    raise ProviderUnavailable(f"{self.label}.{method}: retries would exceed the deadline") from e
+                retries.inc(provider=self.label)
+                attempt += 1
+                self._sleep(delay)
+                continue
+            self._succeed()
+            return result
+
+    def generate_pr_title(self, diff: str, commits: list[str], issue: str | None) -> str:
+        return self.call("generate_pr_title", diff, commits, issue)
+
+    def generate_pr_description(self, diff: str, commits: list[str], issue: str | None) -> Dict[str, Any]:
+        return self.call("generate_pr_description", diff, commits, issue)
+
+    def review_code(self, diff: str) -> Dict[str, Any]:
+        return self.call("review_code", diff)
+
+    def amend_pr_description(self, previous: Dict[str, Any], diff: str, commits: list[str], issue: str | None) -> Dict[str, Any]:
+        return self.call("amend_pr_description", previous, diff, commits, issue)
+
+    def amend_review(self, previous: Dict[str, Any], diff: str) -> Dict[str, Any]:
+        return self.call("amend_review", previous, diff)
+
+    def _chat(self, prompt: str) -> str:
+        return self.call("_chat", prompt)
+
+    def _stream(self, method: str, *args: Any) -> Iterator[str]:
+        # a stream cannot be replayed once chunks were sent: admission and chunk deadlines, no retries
+        self._admit(_estimate_tokens(args, {}), time.monotonic() + self.deadline)
+        source: Any = None
+        pending: Any = None
+        settled = False
+        try:
+            # the call and every chunk are awaited on the executor, so a stalled provider times out
+            deadline = time.monotonic() + self.first_chunk_timeout
+            # the SDK request is made on the first next(); later reads keep the timeout it was given
+            timeout = max(self.first_chunk_timeout, self.idle_timeout)
+            pending = _executor.submit(lambda: iter(getattr(self.inner, method)(*args)))
+            source = self._await_chunk(pending, deadline, method, "first chunk")
+            what = "first chunk"
+            while True:
+                pending = _executor.submit(_bounded, timeout, next, source, _END)
+                chunk = self._await_chunk(pending, deadline, method, what)
+                if chunk is _END:
+                    break
+                yield chunk
+                deadline, what = time.monotonic() + self.idle_timeout, "chunk"
+        except (cancellation.Cancelled, GeneratorExit):
+            # the consumer went away, not a provider failure
+            raise
+        except Exception as e:
+            self._fail(e)
+            settled = True
+            if isinstance(e, ProviderUnavailable):
+                raise
+            raise ProviderUnavailable(f"{self.label}.{method}: {type(e).__name__}: {e}") from e
+        else:
+            self._succeed()
+            settled = True
+        finally:
+            if not settled:
+                # stopped early: give a half-open probe back so the breaker can close again
+                self.breaker.release_probe()
+            if source is not None and pending.done():
+                close = getattr(source, "close", None)
+                if close is not None:
+                    close()
+
+    def _await_chunk(self, future: Future, deadline: float, method: str, what: str) -> Any:
+        try:
+            return cancellation.result(future, timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            if future.done():
+                raise
+            # the worker thread stays blocked on the provider; whatever it returns later is discarded
+            raise ProviderUnavailable(f"{self.label}.{method}: no {what} within {self.first_chunk_timeout if what == 'first chunk' else self.idle_timeout:g}s") from None
+
+    def stream_pr_description(self, diff: str, commits: list[str], issue: str | None) -> Iterator[str]:
+        return self._stream("stream_pr_description", diff, commits, issue)
+
+    def stream_review_code(self, diff: str) -> Iterator[str]:
+        return self._stream("stream_review_code", diff)
+
+
+def from_env(inner: BaseProvider) -> BaseProvider:
+    """Wrap ``inner`` using the environment (``AUTOPR_LLM_RESILIENCE=0`` disables it)."""
+    if os.getenv("AUTOPR_LLM_RESILIENCE", "1") == "0":
+        return inner
+    return ResilientProvider(
+        inner,
+        requests_per_minute=float(os.getenv("AUTOPR_LLM_RPM", "0")),
+        tokens_per_minute=float(os.getenv("AUTOPR_LLM_TPM", "0")),
+        max_retries=int(os.getenv("AUTOPR_LLM_RETRIES", "3")),
+        deadline=float(os.getenv("AUTOPR_LLM_DEADLINE", "110")),
+        first_chunk_timeout=float(os.getenv("AUTOPR_LLM_FIRST_CHUNK_TIMEOUT", "60")),
+        idle_timeout=float(os.getenv("AUTOPR_LLM_STREAM_IDLE_TIMEOUT", "30")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("AUTOPR_LLM_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("AUTOPR_LLM_BREAKER_RESET", "30")),
+        ),
+    )
@@ -1,15 +1,190 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Mapping
+from typing import Dict, Any, Iterable, List, Tuple
 
-from .llm import llm
+from .llm import llm, provider_for
+from .parser import parse_diff, split_diff
+from .pipeline import Pipeline, PipelineRun, Stage
 from . import analysis, lint, validators
-from . import ci_parser, coverage_utils, issue_validator
+from .findings import Finding
+from . import baseline as findings_baseline, cancellation, ci_parser, coverage_utils, fastpath, generator, issue_validator, ownership as ownership_map, profiling, routing, secret_scan, symbol_index, workers
 
+DETERMINISTIC_STAGES = ("static", "lint", "tests", "coverage", "issue_alignment", "route", "fast_path", "impact", "secrets", "baseline")
+# deterministic stages that leave the process (analysis workers) or may wait on I/O (index update)
+DEFERRED_STAGES = ("static", "impact")
 
-def review_pr(diff: str, commits: list[str] | None = None, issue_text: str | None = None, test_log: str | None = None, coverage_before: str | None = None, coverage_after: str | None = None) -> Dict[str, Any]:
-    # LLM review (may return dict or raw)
-    raw = llm.review_code(diff)
+
+def _normalize_finding(f: Any, default_type: str, keep: Iterable[str] = ()) -> Finding:
+    if not isinstance(f, Mapping):
+        return Finding(default_type, str(f), None)
+    out = Finding(f.get("type", default_type), f.get("message", str(f)), f.get("severity"))
+    for key in keep:
+        if key in f:
+            out[key] = f[key]
+    return out
+
+
+def _stage_timeout(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def review_stages(include_llm: bool = True, include_pr: bool = False) -> List[Stage]:
+    """Stages of the review pipeline.
+
+    Inputs are ``diff``, ``commits``, ``issue_text``, ``test_log``,
+    ``coverage_before``, ``coverage_after``, ``repo`` and ``baseline_file``.
+    The parsed diff is computed once (stage ``parsed``) and shared with PR
+    generation. Stage
+    ``route`` picks the model for the provider calls from the parse stats
+    alone, so the LLM calls overlap static analysis; stage ``fast_path`` replaces the LLM review with a template
+    for trivial diffs, and stage ``impact`` looks up call sites of changed
+    functions in the repository's symbol index (when there is a repository).
+    Stage ``secrets`` reports credentials on added lines. Static analysis runs
+    per file on resource-limited worker processes (see ``workers``). Stage
+    ``baseline`` drops static, lint and secret findings that are already in the
+    findings baseline (see ``baseline``).
+    """
+    det_timeout = _stage_timeout("AUTOPR_STAGE_TIMEOUT", 30.0)
+    llm_timeout = _stage_timeout("AUTOPR_LLM_TIMEOUT", 120.0)
+
+    def tests(test_log):
+        return ci_parser.parse_pytest_output(test_log) if test_log else None
+
+    def coverage(coverage_before, coverage_after):
+        if coverage_before is None or coverage_after is None:
+            return None
+        return coverage_utils.compare_coverage(coverage_before, coverage_after)
+
+    def issue_alignment(issue_text, diff, commits):
+        if not (issue_text and commits):
+            return None
+        return issue_validator.simple_issue_alignment(issue_text, diff, commits)
+
+    def impact(diff, repo):
+        return symbol_index.review_impact(diff, repo)
+
+    def baseline(diff, baseline_file, repo, static, lint, secrets):
+        return findings_baseline.review_baseline(diff, static, lint, secrets, path=baseline_file, repo=repo)
+
+    def route(parsed):
+        # diff stats only: waiting for static findings would serialize the LLM call behind the analysis workers
+        return routing.choose_route(parsed or {})
+
+    def llm_review(diff, route, fast_path):
+        if fast_path is not None:
+            return fastpath.review(fast_path)
+        return provider_for(route["route"], llm).review_code(diff)
+
+    stages = [
+        Stage("parsed", lambda diff: parse_diff(diff), requires=("diff",), timeout=det_timeout),
+        Stage("static", lambda diff: workers.analyze_diff(diff, language="python"), requires=("diff",), timeout=det_timeout),
+        Stage("lint", lambda diff: lint.run_basic_lint(diff), requires=("diff",), timeout=det_timeout),
+        Stage("secrets", lambda diff: secret_scan.scan_diff(diff), requires=("diff",), timeout=det_timeout),
+        Stage("tests", tests, requires=("test_log",), timeout=det_timeout),
+        Stage("coverage", coverage, requires=("coverage_before", "coverage_after"), timeout=det_timeout),
+        Stage("issue_alignment", issue_alignment, requires=("issue_text", "diff", "commits"), timeout=det_timeout),
+        Stage("route", route, optional=("parsed",), timeout=det_timeout),
+        Stage("fast_path", lambda diff, parsed: fastpath.classify(diff, parsed), requires=("diff",), optional=("parsed",), timeout=det_timeout),
+        Stage("baseline", baseline, requires=("diff", "baseline_file", "repo"), optional=("static", "lint", "secrets"), timeout=det_timeout),
+        Stage("impact", impact, requires=("diff", "repo"), timeout=_stage_timeout("AUTOPR_INDEX_TIMEOUT", 300.0)),
+    ]
+    if include_llm:
+        stages.append(Stage("llm_review", llm_review, requires=("diff", "route"), optional=("fast_path",), timeout=llm_timeout))
+    if include_pr:
+        def pr(diff, commits, parsed, route):
+            return generator.generate_pr_from(diff, commits, None, context=parsed, route=route)
+
+        stages.append(Stage("pr", pr, requires=("diff", "commits", "parsed", "route"), timeout=llm_timeout))
+    return stages
+
+
+def run_review_pipeline(diff: str, commits: list[str] | None = None, issue_text: str | None = None, test_log: str | None = None, coverage_before: str | None = None, coverage_after: str | None = None, include_llm: bool = True, include_pr: bool = False, profile: bool | None = None, repo: str | None = None, baseline: str | None = None, only: Iterable[str] | None = None) -> PipelineRun:
+    inputs = {"diff": diff, "commits": list(commits or []), "issue_text": issue_text, "test_log": test_log, "coverage_before": coverage_before, "coverage_after": coverage_after, "repo": repo, "baseline_file": baseline}
+    stages = review_stages(include_llm=include_llm, include_pr=include_pr)
+    if only is not None:
+        # a subset of the stages; optional inputs from stages left out are passed as None
+        keep = set(only)
+        stages = [s for s in stages if s.name in keep]
+        for stage in stages:
+            for dep in stage.optional:
+                if dep not in keep:
+                    inputs.setdefault(dep, None)
+    pipeline = Pipeline(stages)
+    if not (profiling.enabled() if profile is None else profile):
+        return pipeline.run(inputs)
+    with profiling.Profiler() as prof:
+        run = pipeline.run(inputs, profiler=prof)
+    run.perf = prof.report()
+    return run
+
+
+def _deterministic_from(run: PipelineRun) -> Dict[str, Any]:
+    findings: List[Dict[str, Any]] = []
+    # with a findings baseline, only the findings it does not know about
+    new = (run.get("baseline") or {}).get("findings") or {}
+    for sf in new.get("static", run.get("static")) or []:
+        findings.append(_normalize_finding(sf, "static"))
+    for lf in new.get("lint", run.get("lint")) or []:
+        findings.append(_normalize_finding(lf, "lint"))
+    for sf in new.get("secrets", run.get("secrets")) or []:
+        findings.append(_normalize_finding(sf, "secret", keep=("file", "line", "rule")))
+    impact = run.get("impact")
+    if impact:
+        findings.extend(_normalize_finding(f, "impact", keep=("file",)) for f in impact["findings"])
+
+    out: Dict[str, Any] = {"findings": findings}
+    for stage, key in (("tests", "_tests"), ("coverage", "_coverage"), ("issue_alignment", "_issue_alignment"), ("route", "_route"), ("fast_path", "_fast_path"), ("impact", "_impact")):
+        if run.get(stage) is not None:
+            out[key] = run.get(stage)
+    if run.get("baseline") is not None:
+        out["_baseline"] = {k: v for k, v in run.get("baseline").items() if k != "findings"}
+    errors = {k: v for k, v in run.errors.items() if k in DETERMINISTIC_STAGES}
+    if errors:
+        out["_errors"] = errors
+    return out
+
+
+def deterministic_review(diff: str, commits: list[str] | None = None, issue_text: str | None = None, test_log: str | None = None, coverage_before: str | None = None, coverage_after: str | None = None, repo: str | None = None, baseline: str | None = None, deferred: bool = True) -> Dict[str, Any]:
+    """Run the provider-independent part of the review.
+
+    Returns a dict with normalized ``findings`` (static analysis, lint, secrets
+    and impact, less those in the findings baseline) and the optional
+    ``_tests``, ``_coverage``, ``_issue_alignment``, ``_route``, ``_fast_path``,
+    ``_impact`` and ``_baseline`` blocks. With ``deferred=False`` the
+    ``DEFERRED_STAGES`` are left out: what remains runs in-process and is ready
+    within milliseconds, so streaming callers can emit it before the LLM has
+    produced anything and send ``deferred_review`` later.
+    """
+    only = None if deferred else ("parsed",) + tuple(s for s in DETERMINISTIC_STAGES if s not in DEFERRED_STAGES)
+    run = run_review_pipeline(diff, commits=commits, issue_text=issue_text, test_log=test_log, coverage_before=coverage_before, coverage_after=coverage_after, include_llm=False, repo=repo, baseline=baseline, only=only)
+    return _deterministic_from(run)
+
+
+def deferred_review(diff: str, repo: str | None = None, baseline: str | None = None) -> Dict[str, Any]:
+    """The ``DEFERRED_STAGES`` (static analysis and impact) in the shape of ``deterministic_review``."""
+    run = run_review_pipeline(diff, include_llm=False, repo=repo, baseline=baseline, only=DEFERRED_STAGES + ("baseline",))
+    return _deterministic_from(run)
+
+
+def combine_deterministic(first: Dict[str, Any], later: Dict[str, Any]) -> Dict[str, Any]:
+    """``deterministic_review(deferred=False)`` and ``deferred_review`` merged into one result."""
+    out = dict(first, findings=list(first.get("findings", [])) + list(later.get("findings", [])))
+    for key, value in later.items():
+        if key == "_baseline" and first.get("_baseline") is not None:
+            out[key] = dict(first["_baseline"], suppressed=first["_baseline"]["suppressed"] + value["suppressed"])
+        elif key == "_errors":
+            out[key] = {**first.get("_errors", {}), **value}
+        elif key != "findings":
+            out[key] = value
+    return out
+
+
+def merge_review(raw: Any, deterministic: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge an LLM review (dict or raw text) with deterministic results and validate it."""
     if isinstance(raw, dict):
         review = raw
     else:
@@ -19,38 +194,13 @@ def review_pr(diff: str, commits: list[str] | None = None, issue_text: str | Non
         except Exception:
             review = {"summary": "", "findings": [], "confidence": 0.0}
 
-    # deterministic static analysis
-    static_findings = analysis.analyze_diff(diff, language="python")
-    # lint findings
-    lint_findings = lint.run_basic_lint(diff)
-
     findings: List[Dict[str, Any]] = []
-    for f in review.get("findings", []):
+    for f in review.get("findings", []) or []:
         # already expected shape or massage
-        findings.append({"type": f.get("type", "ai"), "message": f.get("message", str(f)), "severity": f.get("severity") if isinstance(f, dict) else None})
-
+        findings.append(_normalize_finding(f, "ai"))
     # add static & lint findings
-    for sf in static_findings:
-        findings.append({"type": sf.get("type", "static"), "message": sf.get("message", ""), "severity": sf.get("severity")})
-    for lf in lint_findings:
-        findings.append({"type": lf.get("type", "lint"), "message": lf.get("message", ""), "severity": lf.get("severity")})
-
-    # parse test output if provided
-    test_summary = None
-    if test_log:
-        test_summary = ci_parser.parse_pytest_output(test_log)
-
-    # compare coverage if both texts provided
-    coverage_summary = None
-    if coverage_before is not None and coverage_after is not None:
-        coverage_summary = coverage_utils.compare_coverage(coverage_before, coverage_after)
-
-    # evaluate issue alignment heuristics when issue_text or commits provided
-    issue_alignment = None
-    if issue_text and commits:
-        issue_alignment = issue_validator.simple_issue_alignment(issue_text, diff, commits)
-
-    # lint findings
+    findings.extend(deterministic.get("findings", []))
+
     conf = float(review.get("confidence", 0.0)) if isinstance(review.get("confidence", 0.0), (int, float)) else 0.0
 
     out = {"summary": review.get("summary", ""), "findings": findings, "confidence": conf}
@@ -58,10 +208,161 @@ def review_pr(diff: str, commits: list[str] | None = None, issue_text: str | Non
     # validate shape, attach validation info
     val = validators.validate_review_output(out)
     out["_validation"] = val
-    if test_summary is not None:
-        out["_tests"] = test_summary
-    if coverage_summary is not None:
-        out["_coverage"] = coverage_summary
-    if issue_alignment is not None:
-        out["_issue_alignment"] = issue_alignment
+    for key in ("_tests", "_coverage", "_issue_alignment", "_route", "_fast_path", "_impact", "_baseline", "_errors"):
+        if deterministic.get(key) is not None:
+            out[key] = deterministic[key]
+    return out
+
+
+def degraded_review(deterministic: Dict[str, Any], error: str) -> Dict[str, Any]:
+    """Deterministic-only review used when the LLM stage failed or the provider is unavailable."""
+    deterministic.setdefault("_errors", {})["llm_review"] = error
+    return merge_review({"summary": "LLM review unavailable; deterministic findings only.", "findings": [], "confidence": 0.0}, deterministic)
+
+
+def _review_from(run: PipelineRun) -> Dict[str, Any]:
+    det = _deterministic_from(run)
+    if "llm_review" in run.errors:
+        # degrade to a deterministic-only review instead of failing the whole request
+        out = degraded_review(det, run.errors["llm_review"])
+    else:
+        out = merge_review(run.get("llm_review"), det)
+    if run.perf is not None:
+        out["_perf"] = run.perf
     return out
+
+
+# rough size of a token in diff text, for the per-shard budget
+CHARS_PER_TOKEN = 4
+
+
+def _budgeted(chunks: List[Tuple[str, str]], budget_tokens: int) -> Tuple[str, List[str]]:
+    """Join file sections up to ``budget_tokens``; returns the text and the files left out or cut short."""
+    limit = budget_tokens * CHARS_PER_TOKEN
+    parts: List[str] = []
+    used = 0
+    truncated: List[str] = []
+    for path, chunk in chunks:
+        if used + len(chunk) <= limit:
+            parts.append(chunk)
+            used += len(chunk)
+        elif not parts:
+            # a single file over budget still gets its first part reviewed
+            parts.append(chunk[:limit])
+            used = limit
+            truncated.append(path)
+        else:
+            truncated.append(path)
+    return "".join(parts), truncated
+
+
+def _review_component(component: str, chunks: List[Tuple[str, str]], budget_tokens: int) -> Dict[str, Any]:
+    text, truncated = _budgeted(chunks, budget_tokens)
+    route = routing.choose_route(parse_diff(text))
+    section: Dict[str, Any] = {
+        "component": component,
+        "files": [path for path, _ in chunks],
+        "truncated_files": truncated,
+        "route": route["route"],
+        "input_tokens": len(text) // CHARS_PER_TOKEN,
+    }
+    try:
+        raw = provider_for(route["route"], llm).review_code(text)
+    except Exception as e:
+        return dict(section, summary="", findings=[], confidence=0.0, error=f"{type(e).__name__}: {e}")
+    if not isinstance(raw, dict):
+        raw = {"summary": str(raw), "findings": [], "confidence": 0.0}
+    findings = []
+    for f in raw.get("findings") or []:
+        finding = _normalize_finding(f, "ai")
+        if isinstance(f, dict) and isinstance(f.get("file"), str):
+            finding["file"] = f["file"]
+        finding["component"] = component
+        findings.append(finding)
+    confidence = raw.get("confidence", 0.0)
+    return dict(section, summary=raw.get("summary", ""), findings=findings, confidence=float(confidence) if isinstance(confidence, (int, float)) else 0.0)
+
+
+def review_sharded(diff: str, owners: Any, commits: list[str] | None = None, issue_text: str | None = None, test_log: str | None = None, coverage_before: str | None = None, coverage_after: str | None = None, profile: bool | None = None, repo: str | None = None, baseline: str | None = None) -> Dict[str, Any]:
+    """Review a diff as one LLM call per owning component.
+
+    Files are grouped by ``owners`` (an ``ownership.OwnershipMap``) and each
+    component's part of the diff is reviewed concurrently
+    (``AUTOPR_SHARD_CONCURRENCY``, default 4) within its own input budget
+    (``AUTOPR_SHARD_TOKEN_BUDGET`` tokens, default 8000; files past the budget
+    are listed in ``truncated_files``). The deterministic stages run once over
+    the whole diff. The result is a normal review whose findings carry a
+    ``component`` and whose ``summary`` joins the component summaries, plus a
+    ``_components`` list with one section per component. A diff owned by a
+    single component is reviewed with ``review_pr`` as usual.
+    """
+    files = split_diff(diff)
+    groups: Dict[str, List[Tuple[str, str]]] = {}
+    for path, chunk in files.items():
+        component = (owners.owner(path) if path else None) or ownership_map.UNOWNED
+        groups.setdefault(component, []).append((path, chunk))
+    if len(groups) < 2:
+        return review_pr(diff, commits=commits, issue_text=issue_text, test_log=test_log, coverage_before=coverage_before, coverage_after=coverage_after, profile=profile, ownership=False, repo=repo, baseline=baseline)
+
+    run = run_review_pipeline(diff, commits=commits, issue_text=issue_text, test_log=test_log, coverage_before=coverage_before, coverage_after=coverage_after, include_llm=False, profile=profile, repo=repo, baseline=baseline)
+    det = _deterministic_from(run)
+    if det.get("_fast_path") is not None:
+        out = merge_review(fastpath.review(det["_fast_path"]), det)
+    else:
+        budget = int(os.getenv("AUTOPR_SHARD_TOKEN_BUDGET", "8000"))
+        workers = max(1, min(int(os.getenv("AUTOPR_SHARD_CONCURRENCY", "4")), len(groups)))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="autopr-shard")
+        try:
+            # submitted with the caller's context so a cancelled review stops every shard
+            futures = [pool.submit(contextvars.copy_context().run, _review_component, component, chunks, budget) for component, chunks in groups.items()]
+            sections = [cancellation.result(fut) for fut in futures]
+        finally:
+            pool.shutdown(wait=False)
+
+        ok = [s for s in sections if "error" not in s]
+        weight = sum(max(1, s["input_tokens"]) for s in ok)
+        confidence = sum(s["confidence"] * max(1, s["input_tokens"]) for s in ok) / weight if weight else 0.0
+        summary = f"Reviewed {len(sections)} components. " + " ".join(f"[{s['component']}] {s['summary'] or 'unavailable'}" for s in sections)
+        # component findings go in with the deterministic ones so merge_review keeps ``component``/``file``
+        det = dict(det, findings=[f for s in sections for f in s["findings"]] + det["findings"])
+        failed = [s for s in sections if "error" in s]
+        if failed:
+            det.setdefault("_errors", {})["llm_review"] = "; ".join(f"{s['component']}: {s['error']}" for s in failed)
+        out = merge_review({"summary": summary.strip(), "findings": [], "confidence": round(confidence, 3)}, det)
+        out["_components"] = sections
+    if run.perf is not None:
+        out["_perf"] = run.perf
+    return out
+
+
+def review_pr(diff: str, commits: list[str] | None = None, issue_text: str | None = None, test_log: str | None = None, coverage_before: str | None = None, coverage_after: str | None = None, profile: bool | None = None, ownership: Any = None, repo: str | None = None, baseline: str | None = None) -> Dict[str, Any]:
+    """Review a diff; ``profile`` (default: ``AUTOPR_PROFILE``) attaches a ``_perf`` block.
+
+    ``ownership`` (an ownership file path or ``OwnershipMap``; default
+    ``AUTOPR_OWNERSHIP_FILE``) shards the review by component, see
+    ``review_sharded``. Pass ``False`` to never shard. ``repo`` (default
+    ``AUTOPR_INDEX_ROOT``) is the checkout whose symbol index the ``impact``
+    stage queries. ``baseline`` (default ``AUTOPR_BASELINE_FILE``, else the
+    repository's ``.autopr/findings-baseline.bin``) is the fingerprint file of
+    pre-existing findings to leave out.
+    """
+    if ownership is not False:
+        owners = ownership_map.get_map(ownership) if ownership is None or isinstance(ownership, str) else ownership
+        if owners is not None:
+            return review_sharded(diff, owners, commits=commits, issue_text=issue_text, test_log=test_log, coverage_before=coverage_before, coverage_after=coverage_after, profile=profile, repo=repo, baseline=baseline)
+    run = run_review_pipeline(diff, commits=commits, issue_text=issue_text, test_log=test_log, coverage_before=coverage_before, coverage_after=coverage_after, profile=profile, repo=repo, baseline=baseline)
+    return _review_from(run)
+
+
+def review_and_generate(diff: str, commits: list[str] | None = None, issue_text: str | None = None, test_log: str | None = None, coverage_before: str | None = None, coverage_after: str | None = None, profile: bool | None = None, repo: str | None = None, baseline: str | None = None) -> Dict[str, Any]:
+    """Review the diff and generate a PR description in one pipeline run.
+
+    Returns ``{"pr": ..., "review": ...}``; the diff is parsed once and the two
+    provider calls run concurrently with the deterministic stages.
+    """
+    run = run_review_pipeline(diff, commits=commits, issue_text=issue_text, test_log=test_log, coverage_before=coverage_before, coverage_after=coverage_after, include_pr=True, profile=profile, repo=repo, baseline=baseline)
+    review = _review_from(run)
+    if "pr" in run.errors:
+        review.setdefault("_errors", {})["pr"] = run.errors["pr"]
+    pr = run.get("pr") or {"_context": run.get("parsed") or {}}
+    return {"pr": pr, "review": review}
@@ -0,0 +1,89 @@
+"""Route each request to a small/fast or a large model.
+
+Small changes such as typo fixes and one-line config tweaks do not need a
+flagship model. ``choose_route`` computes a few features from the parsed diff
+and the static-analysis findings, then returns the first rule whose bounds
+they all satisfy. If no rule matches, the request goes to ``DEFAULT_ROUTE``.
+
+Rules come from ``AUTOPR_ROUTING_RULES``. The value is a JSON list, or a path to
+a JSON file holding one. Each rule looks like::
+
+    {"route": "small", "max": {"changed_lines": 40, "files": 3}, "min": {}}
+
+The available features are ``added_lines``, ``removed_lines``,
+``changed_lines``, ``files``, ``functions``, ``classes`` and
+``static_findings``. ``static_findings`` is only counted when the caller
+passes findings; the review pipeline and PR generation route from the parsed
+diff alone so the provider call can start while static analysis is still
+running (it is 0 for them). The model for each route is set with
+``AUTOPR_SMALL_MODEL`` / ``AUTOPR_LARGE_MODEL`` (see ``llm.provider_for``).
+"""
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, Sequence
+
+DEFAULT_ROUTE = "large"
+
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {"route": "small", "max": {"changed_lines": 40, "files": 3, "functions": 2, "classes": 0, "static_findings": 3}},
+]
+
+
+def features(parsed: Dict[str, Any], static_findings: Sequence[Any] = ()) -> Dict[str, int]:
+    added = int(parsed.get("added_lines", 0))
+    removed = int(parsed.get("removed_lines", 0))
+    return {
+        "added_lines": added,
+        "removed_lines": removed,
+        "changed_lines": added + removed,
+        "files": len(parsed.get("files_changed", [])),
+        "functions": len(parsed.get("added_functions", [])),
+        "classes": len(parsed.get("added_classes", [])),
+        "static_findings": len(static_findings or ()),
+    }
+
+
+def load_rules() -> List[Dict[str, Any]]:
+    """Rules from ``AUTOPR_ROUTING_RULES`` (inline JSON or a file path), else the defaults."""
+    raw = os.getenv("AUTOPR_ROUTING_RULES")
+    if not raw:
+        return DEFAULT_RULES
+    if not raw.lstrip().startswith("["):
+        with open(raw, encoding="utf-8") as fh:
+            raw = fh.read()
+    rules = json.loads(raw)
+    if not isinstance(rules, list) or not all(isinstance(r, dict) and "route" in r for r in rules):
+        raise ValueError("AUTOPR_ROUTING_RULES must be a JSON list of objects with a 'route' key")
+    return rules
+
+
+def _matches(rule: Dict[str, Any], feats: Dict[str, int]) -> bool:
+    for name, bound in (rule.get("max") or {}).items():
+        if feats.get(name, 0) > bound:
+            return False
+    for name, bound in (rule.get("min") or {}).items():
+        if feats.get(name, 0) < bound:
+            return False
+    return True
+
+
+def model_for(route: str) -> str | None:
+    """Model (or provider list) configured for ``route`` via ``AUTOPR_<ROUTE>_MODEL``."""
+    return os.getenv(f"AUTOPR_{route.upper()}_MODEL") or None
+
+
+def choose_route(parsed: Dict[str, Any], static_findings: Sequence[Any] = (), rules: List[Dict[str, Any]] | None = None) -> Dict[str, Any]:
+    """Return ``{"route", "model", "rule", "features"}``.
+
+    ``rule`` is the index of the matching rule (None for the default route) and
+    ``model`` the configured override for the route, if any.
+    """
+    feats = features(parsed, static_findings)
+    route, index = DEFAULT_ROUTE, None
+    for i, rule in enumerate(load_rules() if rules is None else rules):
+        if _matches(rule, feats):
+            route, index = rule["route"], i
+            break
+    return {"route": route, "model": model_for(route), "rule": index, "features": feats}
@@ -0,0 +1,247 @@
+"""Secret and credential scanning of diffs, and redaction of provider input.
+
+Every rule in ``RULES`` starts with one of a few literal prefixes (``AKIA``,
+``ghp_``, ``-----BEGIN``, ``password``, ...). The prefixes of all rules are
+compiled into one trie-shaped regex, so a diff is scanned in a single pass
+however many rules there are, and all rules are combined into one alternation
+that is only tried, anchored, where a prefix occurs. A 100 MB diff scans in a
+few seconds on one core. Loosely shaped rules (generic ``password = "..."``
+assignments, short hex keys) also carry a minimum Shannon entropy, checked
+only on the matched candidate token, which filters placeholders such as
+``changeme`` or ``xxxxxxxx``. Generic assignments whose value looks like a
+class name (``private_key: "_RSAPrivateKey"``, a quoted type annotation) are
+not secrets either.
+
+``scan_diff`` reports matches on added lines as high-severity ``secret``
+findings with ``file`` and ``line`` (new-file line number). ``redact``
+replaces every match, on any line, with ``[REDACTED:<rule>]``; ``llm`` applies
+it to all text sent to a provider unless ``AUTOPR_REDACT_SECRETS=0``.
+"""
+from __future__ import annotations
+
+import math
+import os
+import re
+from collections import Counter
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .findings import Finding
+
+# spelled out in lower, upper and title case: the prefilter matches literals
+_GENERIC_KEYWORDS = tuple(sorted({v for k in ("password", "passwd", "secret", "api_key", "apikey", "access_key", "auth_token", "private_key", "client_secret") for v in (k, k.upper(), k.title().replace("_", ""), k.title())}))
+
+# (id, description, literal prefixes, pattern, minimum entropy of the secret or
+# None). The pattern must start with one of its prefixes; assertions on what
+# precedes the prefix go after it as lookbehinds. A named group ``s`` marks the
+# secret inside the match; without it the whole match is the secret.
+RULES: List[Tuple[str, str, Tuple[str, ...], str, Optional[float]]] = [
+    ("aws-access-key", "AWS access key ID", ("AKIA", "ASIA", "ABIA", "ACCA"), r"(?:AKIA|ASIA|ABIA|ACCA)[0-9A-Z]{16}\b", None),
+    ("aws-secret-key", "AWS secret access key", ("aws", "AWS", "Aws"), r"(?:aws_?secret_?access_?key|AWS_?SECRET_?ACCESS_?KEY|AwsSecretAccessKey)\W{0,5}(?P<s>[A-Za-z0-9/+=]{40})(?![A-Za-z0-9/+=])", 3.5),
+    ("github-token", "GitHub token", ("ghp_", "gho_", "ghu_", "ghs_", "ghr_"), r"gh[pousr]_[A-Za-z0-9]{36,255}\b", None),
+    ("github-fine-grained-pat", "GitHub fine-grained token", ("github_pat_",), r"github_pat_[A-Za-z0-9_]{22,255}\b", None),
+    ("gitlab-token", "GitLab token", ("glpat-", "gldt-", "glptt-", "glrt-"), r"gl(?:pat|dt|ptt|rt)-[A-Za-z0-9_\-]{20,}\b", None),
+    ("slack-token", "Slack token", ("xoxa-", "xoxb-", "xoxp-", "xoxo-", "xoxs-", "xoxr-"), r"xox[abposr]-[A-Za-z0-9-]{10,}", None),
+    ("slack-webhook", "Slack webhook URL", ("https://hooks.slack.com/",), r"https://hooks\.slack\.com/(?:services|workflows)/[A-Za-z0-9+/]{20,}", None),
+    ("discord-webhook", "Discord webhook URL", ("https://discord", "https://ptb.discord", "https://canary.discord"), r"https://(?:ptb\.|canary\.)?discord(?:app)?\.com/api/webhooks/[0-9]+/[A-Za-z0-9_-]{40,}", None),
+    ("stripe-key", "Stripe secret key", ("sk_live_", "sk_test_", "rk_live_", "rk_test_"), r"[sr]k_(?:live|test)_[0-9A-Za-z]{24,99}\b", None),
+    ("google-api-key", "Google API key", ("AIza",), r"AIza[0-9A-Za-z_\-]{35}", None),
+    ("google-oauth-secret", "Google OAuth client secret", ("GOCSPX-",), r"GOCSPX-[0-9A-Za-z_\-]{28}", None),
+    ("anthropic-key", "Anthropic API key", ("sk-ant-",), r"sk-ant-(?:api|admin)\d{2}-[A-Za-z0-9_\-]{80,}", None),
+    ("openai-key", "OpenAI API key", ("sk-",), r"sk-(?:proj-|svcacct-|admin-)?[A-Za-z0-9_\-]{20,}T3BlbkFJ[A-Za-z0-9_\-]{20,}", None),
+    ("openai-project-key", "OpenAI project key", ("sk-proj-", "sk-svcacct-"), r"sk-(?:proj|svcacct)-[A-Za-z0-9_\-]{40,}", 4.0),
+    ("huggingface-token", "Hugging Face token", ("hf_",), r"hf_[A-Za-z]{34}\b", 3.5),
+    ("npm-token", "npm access token", ("npm_",), r"npm_[A-Za-z0-9]{36}\b", None),
+    ("pypi-token", "PyPI upload token", ("pypi-AgEI",), r"pypi-AgEIcHlwaS5vcmc[A-Za-z0-9_\-]{50,}", None),
+    ("sendgrid-key", "SendGrid API key", ("SG.",), r"SG\.[A-Za-z0-9_\-]{22}\.[A-Za-z0-9_\-]{43}", None),
+    ("twilio-key", "Twilio API key", ("SK",), r"SK[0-9a-f]{32}\b", 3.0),
+    ("mailgun-key", "Mailgun API key", ("key-",), r"key-[0-9a-z]{32}\b", 3.5),
+    ("mailchimp-key", "Mailchimp API key", ("-us",), r"-us[0-9]{1,2}\b(?<=[^0-9a-f][0-9a-f]{32}-us[0-9])", None),
+    ("square-token", "Square access token", ("sq0atp-", "sq0csp-", "EAAA"), r"(?:sq0atp-|sq0csp-|EAAA)[0-9A-Za-z_\-]{22,60}", 3.5),
+    ("shopify-token", "Shopify access token", ("shpat_", "shpca_", "shppa_", "shpss_"), r"shp(?:at|ca|pa|ss)_[a-fA-F0-9]{32}", None),
+    ("digitalocean-token", "DigitalOcean token", ("dop_v1_", "doo_v1_", "dor_v1_"), r"do[opr]_v1_[a-f0-9]{64}", None),
+    ("databricks-token", "Databricks token", ("dapi",), r"dapi[a-f0-9]{32}(?:-\d)?\b", 3.0),
+    ("vault-token", "HashiCorp Vault token", ("hvs.", "hvb."), r"hv[sb]\.[A-Za-z0-9_\-]{24,}", 3.5),
+    ("doppler-token", "Doppler token", ("dp.",), r"dp\.(?:pt|st|sa|ct|scim|audit)\.[A-Za-z0-9]{40,44}", None),
+    ("linear-key", "Linear API key", ("lin_api_",), r"lin_api_[A-Za-z0-9]{40}", None),
+    ("postman-key", "Postman API key", ("PMAK-",), r"PMAK-[a-f0-9]{24}-[a-f0-9]{34}", None),
+    ("telegram-bot-token", "Telegram bot token", (":AA",), r":AA(?:(?<=[^0-9][0-9]{8}:AA)|(?<=[^0-9][0-9]{9}:AA)|(?<=[^0-9][0-9]{10}:AA))[0-9A-Za-z_\-]{33}\b", None),
+    ("azure-storage-key", "Azure storage account key", ("AccountKey=",), r"AccountKey=(?P<s>[A-Za-z0-9+/]{86}==)", None),
+    ("azure-sas", "Azure SAS signature", ("sig=",), r"sig=(?<=[?&]sig=)(?P<s>[A-Za-z0-9%+/]{40,}={0,2})", 4.0),
+    ("jwt", "JSON Web Token", ("eyJ",), r"eyJ[A-Za-z0-9_\-]{10,}\.eyJ[A-Za-z0-9_\-]{10,}\.[A-Za-z0-9_\-]{10,}", None),
+    ("private-key", "private key", ("-----BEGIN ",), r"-----BEGIN (?:RSA |EC |DSA |OPENSSH |ENCRYPTED |PGP )?PRIVATE KEY(?: BLOCK)?-----", None),
+    ("url-credentials", "password in URL", ("://",), r"://[^\s:/@'\"]{1,64}:(?P<s>[^\s:/@'\"]{6,128})@", 2.5),
+    ("generic-secret", "hard-coded secret", _GENERIC_KEYWORDS, r"(?:" + "|".join(_GENERIC_KEYWORDS) + r")[\w.\-]{0,20}['\"]?\s{0,3}(?:=|:|:=|=>)\s{0,3}['\"](?P<s>[^'\"\s]{8,128})['\"]", 3.2),
+]
+
+_PLACEHOLDER = re.compile(r"^(?:\$\{.*\}|<.*>|%\(.*\)s|\{\{.*\}\}|(?i:.*(?:example|placeholder|changeme|dummy|redacted|your[_-]).*))$")
+# a (possibly module-qualified) class name: quoted annotations such as ``key: "rsa.RSAPrivateKey"``
+_CLASS_NAME = re.compile(r"^(?:[A-Za-z_]+\.)*_?[A-Z][A-Za-z]+$")
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    # 'ghp_|gho_' -> 'gh(?:o_|p_)': one branch per character instead of one per word
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # a word ending here makes the rest optional (prefixes only need to match, not be maximal)
+        return "" if "" in node else body
+
+    return build(trie)
+
+
+def _compile() -> Tuple["re.Pattern[str]", "re.Pattern[str]", List[Tuple[str, str, Optional[float]]]]:
+    parts = []
+    meta = []
+    for i, (rule_id, description, _, pattern, entropy) in enumerate(RULES):
+        parts.append(f"(?P<r{i}>{pattern.replace('(?P<s>', f'(?P<r{i}s>')})")
+        meta.append((rule_id, description, entropy))
+    prefilter = re.compile(_trie_pattern(p for rule in RULES for p in rule[2]))
+    return prefilter, re.compile("|".join(parts)), meta
+
+
+# PREFILTER finds candidate positions in one pass; MATCHER (every rule, one
+# alternation) is only tried, anchored, at those positions
+PREFILTER, MATCHER, _META = _compile()
+
+
+def shannon_entropy(value: str) -> float:
+    """Bits per character of ``value``."""
+    if not value:
+        return 0.0
+    n = len(value)
+    return -sum(c / n * math.log2(c / n) for c in Counter(value).values())
+
+
+def _accept(m: "re.Match[str]") -> Optional[Tuple[int, int, int]]:
+    # (rule index, start, end of the secret) for a real finding, None for a filtered candidate
+    i = int(m.lastgroup[1:])
+    start, end = m.span(f"r{i}s") if f"r{i}s" in MATCHER.groupindex and m.group(f"r{i}s") is not None else m.span()
+    entropy = _META[i][2]
+    if entropy is not None:
+        value = m.string[start:end]
+        if _PLACEHOLDER.match(value) or shannon_entropy(value) < entropy:
+            return None
+        if _META[i][0] == "generic-secret" and _CLASS_NAME.match(value):
+            return None
+    return i, start, end
+
+
+def iter_secrets(text: str) -> Iterator[Tuple[int, int, int]]:
+    """Yield ``(rule index, start, end)`` for every accepted secret in ``text``."""
+    resume = 0
+    for candidate in PREFILTER.finditer(text):
+        pos = candidate.start()
+        if pos < resume:
+            continue
+        m = MATCHER.match(text, pos)
+        if m is None:
+            continue
+        hit = _accept(m)
+        if hit is not None:
+            resume = m.end()
+            yield hit
+
+
+_HUNK = re.compile(r"@@ -\d+(?:,\d+)? \+(\d+)")
+
+
+class _Locator:
+    """(file, new-file line, is an added line) for increasing positions in a diff.
+
+    Lines are consumed once, front to back, so locating every finding of a
+    diff costs one pass over it however many findings there are.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.cursor = 0  # start of the first line not consumed yet
+        self.lines = 0  # lines before the cursor
+        self.path: Optional[str] = None
+        self.new: Optional[int] = None  # new-file line at the cursor, inside a hunk
+
+    def _consume(self, line: str) -> None:
+        if line.startswith("+++ "):
+            self.path = re.sub(r"^[ab]/", "", line[4:].split("\t", 1)[0].strip())
+            self.new = None
+        elif line.startswith("@@ "):
+            m = _HUNK.match(line)
+            self.new = int(m.group(1)) if m else None
+        elif self.new is not None and not line.startswith("-"):
+            self.new += 1
+
+    def locate(self, pos: int) -> Tuple[Optional[str], int, bool]:
+        text = self.text
+        line_start = text.rfind("\n", self.cursor, pos) + 1 or self.cursor
+        while self.cursor < line_start:
+            end = text.find("\n", self.cursor)
+            self._consume(text[self.cursor:end])
+            self.cursor = end + 1
+            self.lines += 1
+        end = text.find("\n", line_start)
+        line = text[line_start:end if end != -1 else len(text)]
+        added = line.startswith("+") and not line.startswith("+++")
+        return self.path, self.lines + 1 if self.new is None else self.new, added
+
+
+def scan_diff(diff: str) -> List[Finding]:
+    """High-severity findings for secrets on added lines (every line for a non-diff snippet)."""
+    is_diff = diff.startswith("+") or "\n+" in diff
+    findings = []
+    locate = _Locator(diff).locate
+    for i, start, end in iter_secrets(diff):
+        path, lineno, added = locate(start)
+        if is_diff and not added:
+            continue
+        rule_id, description, _ = _META[i]
+        finding = Finding(
+            "secret",
+            f"Possible {description} in added code; revoke it and load it from the environment or a secret store",
+            "high",
+            line=lineno,
+            rule=rule_id,
+        )
+        if path:
+            finding["file"] = path
+        findings.append(finding)
+    return findings
+
+
+def redact(text: str) -> str:
+    """``text`` with every detected secret replaced by ``[REDACTED:<rule>]``."""
+    out = []
+    last = 0
+    for i, start, end in iter_secrets(text):
+        out.append(text[last:start])
+        out.append(f"[REDACTED:{_META[i][0]}]")
+        last = end
+    if not out:
+        return text
+    out.append(text[last:])
+    return "".join(out)
+
+
+def redact_value(value: Any) -> Any:
+    """Redact strings inside ``value`` (str, list, tuple or mapping, recursively)."""
+    if isinstance(value, str):
+        return redact(value)
+    if isinstance(value, list):
+        return [redact_value(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(redact_value(v) for v in value)
+    if isinstance(value, Mapping):
+        return {k: redact_value(v) for k, v in value.items()}
+    return value
+
+
+def redaction_enabled() -> bool:
+    return os.getenv("AUTOPR_REDACT_SECRETS", "1") != "0"
@@ -0,0 +1,247 @@
+"""Server-sent-event helpers for streaming reviews and PR descriptions.
+
+In-process deterministic results (lint, secrets, test/coverage parsing) are
+ready long before the LLM answers, so the streaming variants of ``/review`` and
+``/generate`` emit them first, then forward LLM findings and description fields
+as soon as they can be decoded from the provider's streamed JSON, and finish with
+the same merged, validated object the non-streaming endpoints return. Static
+analysis (worker processes) and impact (symbol index update) run alongside the
+LLM and arrive in a second ``deterministic`` event once they are done.
+
+Event sequence for a review::
+
+    event: deterministic   {"findings": [...], "_tests": ..., ...}
+    event: finding         one normalized LLM finding (repeated)
+    event: field           {"name": "summary", "value": "..."} (repeated)
+    event: deterministic   {"findings": [...], "_impact": ...}  static and impact findings
+    event: result          merged review object
+
+For generate the first event is ``context`` (the parsed diff summary).
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from .llm import llm, provider_for
+from .resilience import ProviderUnavailable
+from .findings import json_default
+from .parser import parse_diff
+from . import fastpath, generator, reviewer, routing, validators
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format a single server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=json_default)}\n\n"
+
+
+class JSONMemberStream:
+    """Incrementally scan a streamed JSON object and report completed members.
+
+    ``feed`` returns ``(key, value)`` pairs for top-level members as soon as
+    their value is complete. Members named in ``array_keys`` are reported one
+    element at a time instead, so each finding is available as soon as its
+    closing brace arrives. Text before the first ``{`` (e.g. a markdown fence)
+    is ignored, and members that fail to decode are skipped.
+    """
+
+    def __init__(self, array_keys: Iterable[str] = ("findings",)):
+        self._array_keys = set(array_keys)
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._str_start = -1
+        self._expect_key = False
+        self._key: str | None = None
+        self._value_start: int | None = None
+        self._item_start: int | None = None
+        self.done = False
+
+    def _emit(self, events: List[Tuple[str, Any]], start: int, end: int) -> None:
+        try:
+            value = json.loads(self._buf[start:end])
+        except ValueError:
+            return
+        events.append((self._key or "", value))
+
+    def _in_array_member(self) -> bool:
+        return self._value_start is not None and self._buf[self._value_start] == "[" and self._key in self._array_keys
+
+    def _open_token(self, i: int) -> None:
+        if self._depth == 1 and not self._expect_key and self._value_start is None:
+            self._value_start = i
+        elif self._depth == 2 and self._item_start is None and self._in_array_member():
+            self._item_start = i
+
+    def _end_scalar(self, i: int, events: List[Tuple[str, Any]]) -> None:
+        if self._depth == 1 and self._value_start is not None and self._buf[self._value_start] not in '{["':
+            self._emit(events, self._value_start, i)
+            self._value_start = None
+        elif self._depth == 2 and self._item_start is not None and self._buf[self._item_start] not in '{["':
+            self._emit(events, self._item_start, i)
+            self._item_start = None
+
+    def _close_string(self, i: int, events: List[Tuple[str, Any]]) -> None:
+        if self._depth == 1:
+            if self._expect_key:
+                self._key = json.loads(self._buf[self._str_start:i + 1])
+                self._expect_key = False
+            elif self._value_start == self._str_start:
+                self._emit(events, self._value_start, i + 1)
+                self._value_start = None
+        elif self._depth == 2 and self._item_start == self._str_start:
+            self._emit(events, self._item_start, i + 1)
+            self._item_start = None
+
+    def _close_container(self, i: int, events: List[Tuple[str, Any]]) -> None:
+        if self._depth == 0:
+            self.done = True
+        elif self._depth == 1 and self._value_start is not None:
+            if not self._in_array_member():
+                self._emit(events, self._value_start, i + 1)
+            self._value_start = None
+        elif self._depth == 2 and self._item_start is not None and self._in_array_member():
+            self._emit(events, self._item_start, i + 1)
+            self._item_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        events: List[Tuple[str, Any]] = []
+        self._buf += chunk
+        buf = self._buf
+        i = self._pos
+        while i < len(buf) and not self.done:
+            ch = buf[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                    self._close_string(i, events)
+            elif self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._expect_key = True
+            elif ch == '"':
+                self._in_str = True
+                self._str_start = i
+                self._open_token(i)
+            elif ch in "{[":
+                self._open_token(i)
+                self._depth += 1
+            elif ch in "}]":
+                self._end_scalar(i, events)
+                self._depth -= 1
+                self._close_container(i, events)
+            elif ch == ",":
+                self._end_scalar(i, events)
+                if self._depth == 1:
+                    self._expect_key = True
+            elif ch != ":" and not ch.isspace():
+                self._open_token(i)
+            i += 1
+        self._pos = i
+        return events
+
+    def text(self) -> str:
+        return self._buf
+
+
+def _parse_streamed(text: str) -> Any:
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            return json.loads(text[start:end + 1])
+        except ValueError:
+            pass
+    return {"raw": text}
+
+
+def stream_review(diff: str, commits: list[str] | None = None, issue_text: str | None = None, test_log: str | None = None, coverage_before: str | None = None, coverage_after: str | None = None, repo: str | None = None, baseline: str | None = None) -> Iterator[str]:
+    """Yield SSE events for a review: in-process findings first, LLM output as decoded, deferred findings when ready, then the result."""
+    det = reviewer.deterministic_review(diff, commits=commits, issue_text=issue_text, test_log=test_log, coverage_before=coverage_before, coverage_after=coverage_after, repo=repo, baseline=baseline, deferred=False)
+    yield sse_event("deterministic", det)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autopr-deferred")
+    later = executor.submit(contextvars.copy_context().run, reviewer.deferred_review, diff, repo=repo, baseline=baseline)
+    executor.shutdown(wait=False)
+    sent = False
+
+    def deferred() -> str:
+        nonlocal det, sent
+        part = later.result()
+        det, sent = reviewer.combine_deterministic(det, part), True
+        return sse_event("deterministic", part)
+
+    if det.get("_fast_path"):
+        yield deferred()
+        yield sse_event("result", reviewer.merge_review(fastpath.review(det["_fast_path"]), det))
+        return
+
+    members = JSONMemberStream(array_keys=("findings",))
+    try:
+        provider = provider_for(det["_route"]["route"], llm) if det.get("_route") else llm
+        for chunk in provider.stream_review_code(diff):
+            for key, value in members.feed(chunk):
+                if key == "findings":
+                    yield sse_event("finding", reviewer._normalize_finding(value, "ai"))
+                else:
+                    yield sse_event("field", {"name": key, "value": value})
+            if not sent and later.done():
+                yield deferred()
+    except ProviderUnavailable as e:
+        if not sent:
+            yield deferred()
+        yield sse_event("result", reviewer.degraded_review(det, str(e)))
+        return
+
+    if not sent:
+        yield deferred()
+    yield sse_event("result", reviewer.merge_review(_parse_streamed(members.text()), det))
+
+
+def shape_description(desc: Any) -> Dict[str, Any]:
+    """Coerce a generator result into the public ``GenerateResponse`` shape."""
+    if isinstance(desc, dict) and "title" in desc:
+        return {k: desc.get(k, []) if k == "files_impacted" else desc.get(k, "") for k in generator.DESCRIPTION_KEYS}
+    d = desc if isinstance(desc, dict) else {}
+    return {
+        "title": str(d.get("title", "Auto PR")) if d else str(desc),
+        "what_changed": d.get("what_changed", ""),
+        "why": d.get("why", ""),
+        "files_impacted": d.get("files_impacted", []),
+        "tests": d.get("tests", ""),
+        "risk_level": d.get("risk_level", "unknown"),
+        "rollback_plan": d.get("rollback_plan", ""),
+    }
+
+
+def stream_generate(diff: str, commits: List[str], issue: str | None = None) -> Iterator[str]:
+    """Yield SSE events for PR generation: parsed context, description fields, then the result."""
+    context = parse_diff(diff)
+    yield sse_event("context", context)
+
+    fast = fastpath.classify(diff, context)
+    if fast is not None:
+        result = shape_description(fastpath.describe(fast, commits, issue))
+        result["_validation"] = validators.validate_generate_output(result)
+        yield sse_event("result", result)
+        return
+
+    route = routing.choose_route(context)
+    provider = provider_for(route["route"], llm)
+    members = JSONMemberStream(array_keys=())
+    try:
+        for chunk in provider.stream_pr_description(diff, commits, issue):
+            for key, value in members.feed(chunk):
+                yield sse_event("field", {"name": key, "value": value})
+        desc = generator.finalize_description(_parse_streamed(members.text()), diff, commits, issue, context, provider=provider)
+    except ProviderUnavailable:
+        desc = generator.context_description(commits, issue, context)
+    result = shape_description(desc)
+    result["_validation"] = validators.validate_generate_output(result)
+    yield sse_event("result", result)
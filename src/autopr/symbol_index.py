@@ -0,0 +1,394 @@
+"""On-disk index of Python definitions, imports and call references.
+
+``SymbolIndex(root)`` keeps a SQLite database (``AUTOPR_INDEX_DB``, default
+``<root>/.autopr/symbols.db``) with one row per definition, import and call
+site of every Python file under ``root`` (``git ls-files`` when ``root`` is a
+git checkout, otherwise a directory walk). Rows come from the AST, not from
+regexes.
+
+``update()`` is incremental: files whose size and mtime are unchanged are
+skipped, the rest are re-hashed and only files whose content hash changed are
+parsed again. When many files need parsing (the first build), they are parsed
+in a process pool across ``AUTOPR_INDEX_JOBS`` workers (default: all cores).
+Lookups hit indexed columns and take well under a millisecond.
+
+``impact(diff)`` is what reviews use. For each function or class whose ``def``
+line a diff removes or changes, it lists the call sites and the imports of
+that name elsewhere in the repo (only calls that can resolve to that
+definition, see ``call_sites``), and ``impact_findings`` turns these into
+review findings. The ``impact`` review stage runs it when the review has a
+repository (``pr-ai review --repo``) or ``AUTOPR_INDEX_ROOT`` is set.
+"""
+from __future__ import annotations
+
+import ast
+import contextlib
+import hashlib
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .parser import split_diff
+
+SCHEMA_VERSION = "2"
+# below this many files to parse, a process pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+SKIP_DIRS = frozenset({".git", ".hg", ".venv", "venv", "env", "node_modules", "__pycache__", ".tox", ".nox", "build", "dist", ".autopr", ".mypy_cache", ".pytest_cache"})
+MAX_SITES = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, module TEXT, hash TEXT, size INTEGER, mtime_ns INTEGER, error TEXT);
+CREATE TABLE IF NOT EXISTS defs (path TEXT, name TEXT, qualname TEXT, kind TEXT, line INTEGER, params TEXT);
+CREATE TABLE IF NOT EXISTS imports (path TEXT, module TEXT, name TEXT, asname TEXT, line INTEGER);
+CREATE TABLE IF NOT EXISTS refs (path TEXT, name TEXT, base TEXT, line INTEGER);
+CREATE INDEX IF NOT EXISTS defs_name ON defs (name);
+CREATE INDEX IF NOT EXISTS defs_path ON defs (path);
+CREATE INDEX IF NOT EXISTS imports_name ON imports (name);
+CREATE INDEX IF NOT EXISTS imports_module ON imports (module);
+CREATE INDEX IF NOT EXISTS imports_path ON imports (path);
+CREATE INDEX IF NOT EXISTS refs_name ON refs (name);
+CREATE INDEX IF NOT EXISTS refs_path ON refs (path);
+"""
+
+
+def module_name(path: str) -> str:
+    """Dotted module for a repo-relative path (``src/pkg/mod.py`` -> ``pkg.mod``)."""
+    parts = path[:-3].split("/") if path.endswith(".py") else path.split("/")
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    if parts and parts[0] == "src":
+        parts = parts[1:]
+    return ".".join(parts)
+
+
+def _dotted(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted(node.value)
+        return f"{base}.{node.attr}" if base else None
+    return None
+
+
+def _base(node: ast.AST) -> str:
+    # what a method is called on: ``a.b`` for a.b.f(), ``A()`` for A().f(), "" when it cannot be named
+    if isinstance(node, ast.Call):
+        func = _dotted(node.func)
+        return f"{func}()" if func else ""
+    return _dotted(node) or ""
+
+
+def extract(path: str, source: str) -> Dict[str, List[Tuple[Any, ...]]]:
+    """Definition, import and call-reference rows for one file's source."""
+    tree = ast.parse(source)
+    module = module_name(path)
+    package = module if path.endswith("__init__.py") else module.rpartition(".")[0]
+    defs: List[Tuple[Any, ...]] = []
+    imports: List[Tuple[Any, ...]] = []
+    refs: List[Tuple[Any, ...]] = []
+
+    def visit(node: ast.AST, scope: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                qualname = f"{scope}.{child.name}" if scope else child.name
+                if isinstance(child, ast.ClassDef):
+                    defs.append((child.name, qualname, "class", child.lineno, None))
+                else:
+                    defs.append((child.name, qualname, "method" if isinstance(node, ast.ClassDef) else "function", child.lineno, ast.unparse(child.args)))
+                visit(child, qualname)
+                continue
+            if isinstance(child, ast.Import):
+                for alias in child.names:
+                    imports.append((alias.name, None, alias.asname, child.lineno))
+            elif isinstance(child, ast.ImportFrom):
+                base = child.module or ""
+                if child.level:
+                    anchor = package.split(".") if package else []
+                    anchor = anchor[:len(anchor) - (child.level - 1)] if child.level > 1 else anchor
+                    base = ".".join(p for p in anchor + ([child.module] if child.module else []) if p)
+                for alias in child.names:
+                    imports.append((base, alias.name, alias.asname, child.lineno))
+            elif isinstance(child, ast.Call):
+                func = child.func
+                if isinstance(func, ast.Name):
+                    refs.append((func.id, None, child.lineno))
+                elif isinstance(func, ast.Attribute):
+                    refs.append((func.attr, _base(func.value), child.lineno))
+            visit(child, scope)
+
+    visit(tree, "")
+    return {"defs": defs, "imports": imports, "refs": refs}
+
+
+def _index_file(root: str, path: str) -> Tuple[str, str, int, int, Optional[Dict[str, List[Tuple[Any, ...]]]], Optional[str]]:
+    # runs in worker processes: read, hash and parse one file
+    full = os.path.join(root, path)
+    st = os.stat(full)
+    with open(full, "rb") as fh:
+        data = fh.read()
+    digest = hashlib.sha1(data).hexdigest()
+    try:
+        return path, digest, st.st_size, st.st_mtime_ns, extract(path, data.decode("utf-8", "replace")), None
+    except (SyntaxError, ValueError, RecursionError) as e:
+        return path, digest, st.st_size, st.st_mtime_ns, None, f"{type(e).__name__}: {e}"
+
+
+def _parse_batch(root: str, paths: List[str]) -> List[Tuple[Any, ...]]:
+    out = []
+    for path in paths:
+        try:
+            out.append(_index_file(root, path))
+        except OSError:
+            # deleted since it was listed; the next update drops it
+            continue
+    return out
+
+
+class SymbolIndex:
+    def __init__(self, root: str, db_path: str | None = None):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or os.getenv("AUTOPR_INDEX_DB") or os.path.join(self.root, ".autopr", "symbols.db")
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        with self._db() as db:
+            db.executescript(_SCHEMA)
+            row = db.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row is None or row[0] != SCHEMA_VERSION:
+                db.executescript("DELETE FROM files; DELETE FROM defs; DELETE FROM imports; DELETE FROM refs;")
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (SCHEMA_VERSION,))
+
+    @contextlib.contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.row_factory = sqlite3.Row
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def python_files(self) -> List[str]:
+        """Repo-relative paths of the Python files to index."""
+        try:
+            out = subprocess.run(["git", "-C", self.root, "ls-files", "-z", "--cached", "--others", "--exclude-standard", "--", "*.py"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True).stdout
+            return sorted(p for p in out.decode("utf-8", "surrogateescape").split("\0") if p and os.path.isfile(os.path.join(self.root, p)))
+        except (OSError, subprocess.CalledProcessError):
+            pass
+        found = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS and not d.endswith(".egg-info")]
+            rel = os.path.relpath(dirpath, self.root)
+            for name in filenames:
+                if name.endswith(".py"):
+                    found.append(name if rel == "." else f"{rel.replace(os.sep, '/')}/{name}")
+        return sorted(found)
+
+    def update(self, jobs: int | None = None) -> Dict[str, int]:
+        """Bring the index in line with the files on disk; returns counts of indexed, removed and unchanged files."""
+        with self._lock, self._db() as db:
+            known = {row[0]: tuple(row)[1:] for row in db.execute("SELECT path, hash, size, mtime_ns FROM files")}
+            current = self.python_files()
+            stale: List[str] = []
+            unchanged = 0
+            for path in current:
+                previous = known.get(path)
+                try:
+                    st = os.stat(os.path.join(self.root, path))
+                except OSError:
+                    continue
+                if previous is not None and previous[1] == st.st_size and previous[2] == st.st_mtime_ns:
+                    unchanged += 1
+                else:
+                    stale.append(path)
+            listed = set(current)
+            removed = [p for p in known if p not in listed]
+
+            results = self._parse(stale, jobs)
+            indexed = 0
+            for path, digest, size, mtime_ns, rows, error in results:
+                previous = known.get(path)
+                if previous is not None and previous[0] == digest:
+                    # touched but not changed: only refresh the stat fields
+                    db.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?", (size, mtime_ns, path))
+                    unchanged += 1
+                    continue
+                self._delete(db, path)
+                db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", (path, module_name(path), digest, size, mtime_ns, error))
+                if rows is not None:
+                    db.executemany("INSERT INTO defs VALUES (?, ?, ?, ?, ?, ?)", [(path, *r) for r in rows["defs"]])
+                    db.executemany("INSERT INTO imports VALUES (?, ?, ?, ?, ?)", [(path, *r) for r in rows["imports"]])
+                    db.executemany("INSERT INTO refs VALUES (?, ?, ?, ?)", [(path, *r) for r in rows["refs"]])
+                indexed += 1
+            for path in removed:
+                self._delete(db, path)
+                db.execute("DELETE FROM files WHERE path = ?", (path,))
+        return {"indexed": indexed, "removed": len(removed), "unchanged": unchanged, "files": len(current)}
+
+    def _parse(self, paths: List[str], jobs: int | None) -> Iterable[Tuple[Any, ...]]:
+        jobs = jobs or int(os.getenv("AUTOPR_INDEX_JOBS", "0")) or os.cpu_count() or 1
+        if jobs <= 1 or len(paths) < PARALLEL_MIN_FILES:
+            return _parse_batch(self.root, paths)
+        size = max(16, len(paths) // (jobs * 4))
+        batches = [paths[k:k + size] for k in range(0, len(paths), size)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            return [r for batch in pool.map(_parse_batch, [self.root] * len(batches), batches) for r in batch]
+
+    @staticmethod
+    def _delete(db: sqlite3.Connection, path: str) -> None:
+        for table in ("defs", "imports", "refs"):
+            db.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+
+    def _query(self, sql: str, args: Tuple[Any, ...]) -> List[Dict[str, Any]]:
+        with self._db() as db:
+            return [dict(row) for row in db.execute(sql, args)]
+
+    def definitions(self, name: str, path: str | None = None) -> List[Dict[str, Any]]:
+        if path is None:
+            return self._query("SELECT path, name, qualname, kind, line, params FROM defs WHERE name = ? ORDER BY path, line", (name,))
+        return self._query("SELECT path, name, qualname, kind, line, params FROM defs WHERE name = ? AND path = ? ORDER BY line", (name, path))
+
+    def call_sites(self, name: str, path: str | None = None, owner: str | None = None, limit: int = MAX_SITES) -> List[Dict[str, Any]]:
+        """Calls of ``name`` or ``<anything>.name``; with ``path``, only calls that can reach its definition there.
+
+        Those are bare ``name(...)`` calls in ``path`` and in files that import
+        the name from its module (under their alias), ``<module>.name(...)``
+        where the module is imported, ``self.name`` / ``cls.name`` in ``path``
+        and, for a method of class ``owner``, ``Owner.name`` / ``Owner().name``
+        where the class is visible. ``obj.get()`` on some other object is not
+        a call of a changed ``get``.
+        """
+        if path is None:
+            return self._query("SELECT path, line, base FROM refs WHERE name = ? ORDER BY path, line LIMIT ?", (name, limit))
+        module = module_name(path)
+        parent, _, last = module.rpartition(".")
+        # per file: names a bare call may use, and bases an attribute call may use
+        bare: Dict[str, set] = {path: {name}}
+        bases: Dict[str, set] = {path: {"self", "cls"}}
+        with self._db() as db:
+            for row in db.execute("SELECT path, name, asname FROM imports WHERE module = ? AND name IN (?, ?)", (module, name, owner or name)):
+                alias = row["asname"] or row["name"]
+                if row["name"] == name:
+                    bare.setdefault(row["path"], set()).add(alias)
+                if row["name"] == owner:
+                    bases.setdefault(row["path"], set()).update((alias, f"{alias}()"))
+            for row in db.execute("SELECT path, name, asname FROM imports WHERE (module = ? AND name IS NULL) OR (module = ? AND name = ?)", (module, parent, last)):
+                bases.setdefault(row["path"], set()).add(row["asname"] or (last if row["name"] else module))
+            if owner:
+                bases[path].update((owner, f"{owner}()"))
+            names = {name} | {n for aliases in bare.values() for n in aliases}
+            paths = set(bare) | set(bases)
+            rows = db.execute(
+                f"SELECT path, line, base, name FROM refs WHERE name IN ({','.join('?' * len(names))}) AND path IN ({','.join('?' * len(paths))}) ORDER BY path, line",
+                (*names, *paths),
+            ).fetchall()
+        sites = []
+        for row in rows:
+            if row["base"] is None:
+                ok = row["name"] in bare.get(row["path"], ())
+            else:
+                ok = row["name"] == name and row["base"] in bases.get(row["path"], ())
+            if ok:
+                sites.append({"path": row["path"], "line": row["line"], "base": row["base"]})
+                if len(sites) >= limit:
+                    break
+        return sites
+
+    def importers(self, name: str, module: str | None = None) -> List[Dict[str, Any]]:
+        """``from <module> import name`` statements (any module when ``module`` is None)."""
+        if module is None:
+            return self._query("SELECT path, module, line FROM imports WHERE name = ? ORDER BY path, line", (name,))
+        return self._query("SELECT path, module, line FROM imports WHERE name = ? AND module = ? ORDER BY path, line", (name, module))
+
+    def impact(self, diff: str) -> Dict[str, Any]:
+        """Call sites and importers of functions and classes whose ``def`` line ``diff`` removes or changes.
+
+        The index is expected to reflect the PR head, so a name still defined
+        in the file had its signature changed, and one that is gone was removed.
+        """
+        changed: List[Dict[str, Any]] = []
+        for path, chunk in split_diff(diff).items():
+            if not path.endswith(".py"):
+                continue
+            removed = _def_lines(chunk, "-")
+            added = _def_lines(chunk, "+")
+            for name, old in removed.items():
+                if name.startswith("__") or added.get(name) == old:
+                    continue
+                current = self.definitions(name, path)
+                change = "signature" if current else "removed"
+                entry: Dict[str, Any] = {"name": name, "file": path, "change": change}
+                # the class of a method that still exists; a removed one is only looked up through self/cls
+                owner = next((d["qualname"].split(".")[-2] for d in current if d["kind"] == "method"), None)
+                entry["call_sites"] = [{"path": s["path"], "line": s["line"]} for s in self.call_sites(name, path, owner)]
+                module = module_name(path)
+                entry["importers"] = [{"path": i["path"], "line": i["line"]} for i in self.importers(name, module) if i["path"] != path]
+                changed.append(entry)
+        return {"changed": changed}
+
+
+_DEF_RE = re.compile(r"^\s*(?:async\s+)?(def|class)\s+([A-Za-z_][A-Za-z0-9_]*)\s*(.*)$")
+
+
+def _def_lines(chunk: str, sign: str) -> Dict[str, str]:
+    # name -> normalized rest of the def line, for '-' or '+' lines of one file's diff
+    out: Dict[str, str] = {}
+    for line in chunk.splitlines():
+        if not line.startswith(sign) or line.startswith(sign * 3):
+            continue
+        m = _DEF_RE.match(line[1:])
+        if m:
+            out[m.group(2)] = re.sub(r"\s+", "", m.group(3))
+    return out
+
+
+def _where(items: List[Dict[str, Any]], limit: int) -> str:
+    listed = ", ".join(f"{i['path']}:{i['line']}" for i in items[:limit])
+    return listed + (f" (+{len(items) - limit} more)" if len(items) > limit else "")
+
+
+def impact_findings(impact: Dict[str, Any], limit: int = 5) -> List[Dict[str, Any]]:
+    """Review findings for ``impact()``'s result: removed names still imported, changed signatures still called."""
+    findings = []
+    for entry in impact.get("changed", []):
+        name, path = entry["name"], entry["file"]
+        importers, sites = entry["importers"], entry["call_sites"]
+        if entry["change"] == "removed" and importers:
+            findings.append({"type": "impact", "message": f"`{name}` was removed from {path} but is still imported by {_where(importers, limit)}", "severity": "high", "file": path})
+        elif entry["change"] == "removed" and sites:
+            findings.append({"type": "impact", "message": f"`{name}` was removed from {path}; calls to a `{name}` remain at {_where(sites, limit)}", "severity": "medium", "file": path})
+        elif entry["change"] == "signature" and sites:
+            findings.append({"type": "impact", "message": f"Signature of `{name}` in {path} changed; check its call sites: {_where(sites, limit)}", "severity": "medium", "file": path})
+    return findings
+
+
+_indexes: Dict[str, SymbolIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(root: str) -> SymbolIndex:
+    """Process-wide index for ``root``."""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = SymbolIndex(root)
+        return index
+
+
+def review_impact(diff: str, root: str | None = None) -> Optional[Dict[str, Any]]:
+    """Update the index of ``root`` (default ``AUTOPR_INDEX_ROOT``) and return the diff's impact with findings, or None."""
+    root = root or os.getenv("AUTOPR_INDEX_ROOT")
+    if not root:
+        return None
+    index = get_index(root)
+    index.update()
+    impact = index.impact(diff)
+    impact["findings"] = impact_findings(impact)
+    return impact
@@ -0,0 +1,215 @@
+"""GitHub webhook receiver that debounces and supersedes PR reviews.
+
+``POST /webhooks/github`` verifies the ``X-Hub-Signature-256`` HMAC against
+``GITHUB_WEBHOOK_SECRET`` and hands ``pull_request`` events to a
+``PullRequestQueue`` keyed by repository and PR number.
+
+A push starts a debounce timer (``AUTOPR_WEBHOOK_DEBOUNCE`` seconds, default
+10). Another push to the same PR before it fires replaces the queued event, so
+five quick pushes produce one review of the last head. A push that arrives
+while a review of an older head is running cancels that review through its
+``cancellation`` token. The pipeline stops at its next check point, and
+provider calls that were queued or waiting to retry are never sent. Closing
+the PR cancels both.
+
+A review fetches the diff and commit subjects from the GitHub API, runs
+``incremental.review_incremental`` (amending the previous review from the
+interdiff when one is stored) and posts ``comment.render_comment`` as an issue
+comment (see ``autopr.github``).
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import cancellation, comment, metrics
+
+RELEVANT_ACTIONS = frozenset({"opened", "synchronize", "reopened", "ready_for_review"})
+
+events = metrics.Counter("autopr_webhook_events_total", "GitHub webhook deliveries by event and outcome", ("event", "outcome"))
+superseded = metrics.Counter("autopr_webhook_superseded_total", "PR reviews dropped for a newer push", ("stage",))
+
+
+def verify_signature(secret: str, body: bytes, header: str | None) -> bool:
+    """Check GitHub's ``X-Hub-Signature-256: sha256=<hex>`` header in constant time."""
+    if not secret or not header or not header.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, header[len("sha256="):])
+
+
+def pull_request_event(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The fields a review needs from a ``pull_request`` payload, or None if malformed."""
+    pr = payload.get("pull_request") or {}
+    repo = (payload.get("repository") or {}).get("full_name")
+    number = pr.get("number") or payload.get("number")
+    head = (pr.get("head") or {}).get("sha")
+    if not repo or not number or not head:
+        return None
+    return {"action": payload.get("action"), "repo": repo, "number": int(number), "head_sha": head, "draft": bool(pr.get("draft"))}
+
+
+def review_pull_request(event: Dict[str, Any], client: Any = None) -> Dict[str, Any]:
+    """Fetch, review and comment on one PR head; checks for cancellation between steps.
+
+    With a stored review of an earlier head, only the interdiff between the two
+    heads is sent to the provider (see ``incremental``).
+    """
+    from . import github, incremental
+
+    client = client or github.from_env()
+    key = f"{event['repo']}#{event['number']}"
+    diff = client.pull_diff(event["repo"], event["number"])
+    cancellation.check()
+    commits = client.pull_commits(event["repo"], event["number"])
+    cancellation.check()
+    interdiff = None
+    previous = incremental.get_store().get(key)
+    if previous is not None and previous.get("head_sha") != event["head_sha"]:
+        try:
+            interdiff = client.compare_diff(event["repo"], previous["head_sha"], event["head_sha"])
+        except github.GitHubError:
+            # old head gone after a force-push: review the whole PR again
+            interdiff = None
+        cancellation.check()
+    result = incremental.review_incremental(key, event["head_sha"], diff, commits=commits, interdiff=interdiff)
+    # a newer push may have arrived during the review; its comment supersedes this one
+    cancellation.check()
+    client.create_comment(event["repo"], event["number"], comment.render_comment(result))
+    return result
+
+
+class PullRequestQueue:
+    """Debounce pushes per PR and cancel reviews of superseded heads."""
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Any] = review_pull_request, debounce: float = 10.0, workers: int = 2):
+        self.handler = handler
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._running: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="autopr-webhook")
+        self.stats: Dict[str, int] = {"queued": 0, "coalesced": 0, "cancelled": 0, "completed": 0, "failed": 0}
+
+    def submit(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a review of ``event``'s head after the debounce window."""
+        key = (event["repo"], event["number"])
+        with self._lock:
+            running = self._running.get(key)
+            if running is not None and key not in self._pending and running["head_sha"] == event["head_sha"]:
+                # redelivery or a no-op event for the head already being reviewed
+                return {"status": "duplicate", "repo": key[0], "number": key[1], "head_sha": event["head_sha"]}
+            self._cancel_running(key, f"superseded by {event['head_sha']}")
+            coalesced = 0
+            previous = self._pending.pop(key, None)
+            if previous is not None:
+                previous["timer"].cancel()
+                coalesced = previous["coalesced"] + 1
+                self.stats["coalesced"] += 1
+                superseded.inc(stage="debounce")
+            entry: Dict[str, Any] = {"event": event, "coalesced": coalesced, "queued_at": time.monotonic()}
+            entry["timer"] = threading.Timer(self.debounce, self._fire, args=(key, entry))
+            entry["timer"].daemon = True
+            self._pending[key] = entry
+            self.stats["queued"] += 1
+            entry["timer"].start()
+        return {"status": "queued", "repo": key[0], "number": key[1], "head_sha": event["head_sha"], "coalesced": coalesced}
+
+    def cancel(self, repo: str, number: int, reason: str = "cancelled") -> bool:
+        """Drop the queued event and cancel the running review for a PR; True if there was either."""
+        key = (repo, number)
+        with self._lock:
+            entry = self._pending.pop(key, None)
+            if entry is not None:
+                entry["timer"].cancel()
+            return self._cancel_running(key, reason) or entry is not None
+
+    def _cancel_running(self, key: Tuple[str, int], reason: str) -> bool:
+        running = self._running.get(key)
+        if running is None or running["token"].cancelled:
+            return False
+        running["token"].cancel(reason)
+        superseded.inc(stage="in_flight")
+        return True
+
+    def _fire(self, key: Tuple[str, int], entry: Dict[str, Any]) -> None:
+        with self._lock:
+            # a newer push replaced this entry after the timer had already fired
+            if self._pending.get(key) is not entry:
+                return
+            del self._pending[key]
+            record = {"head_sha": entry["event"]["head_sha"], "token": cancellation.CancelToken()}
+            self._running[key] = record
+        self._executor.submit(self._run, key, entry["event"], record)
+
+    def _run(self, key: Tuple[str, int], event: Dict[str, Any], record: Dict[str, Any]) -> None:
+        outcome = "completed"
+        try:
+            with cancellation.scope(record["token"]):
+                cancellation.check()
+                self.handler(event)
+        except cancellation.Cancelled:
+            outcome = "cancelled"
+        except Exception as e:
+            outcome = "failed"
+            record["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self.stats[outcome] += 1
+                if self._running.get(key) is record:
+                    del self._running[key]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": [f"{repo}#{number}" for repo, number in self._pending],
+                "running": [f"{repo}#{number}@{r['head_sha'][:12]}" for (repo, number), r in self._running.items()],
+                "stats": dict(self.stats),
+            }
+
+    def handle(self, event_name: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Route one webhook delivery; returns the JSON body for the response."""
+        if event_name != "pull_request":
+            events.inc(event=event_name or "unknown", outcome="ignored")
+            return {"status": "ignored", "reason": f"event {event_name!r} not handled"}
+        event = pull_request_event(payload)
+        if event is None:
+            events.inc(event=event_name, outcome="invalid")
+            return {"status": "ignored", "reason": "payload lacks repository, number or head sha"}
+        if event["action"] == "closed":
+            cancelled = self.cancel(event["repo"], event["number"], "pull request closed")
+            events.inc(event=event_name, outcome="closed")
+            return {"status": "cancelled" if cancelled else "ignored", "repo": event["repo"], "number": event["number"]}
+        if event["action"] not in RELEVANT_ACTIONS or event["draft"]:
+            events.inc(event=event_name, outcome="ignored")
+            return {"status": "ignored", "reason": f"action {event['action']!r} not reviewed"}
+        result = self.submit(event)
+        events.inc(event=event_name, outcome=result["status"])
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for entry in self._pending.values():
+                entry["timer"].cancel()
+            self._pending.clear()
+            for record in self._running.values():
+                record["token"].cancel("shutdown")
+        self._executor.shutdown(wait=False)
+
+
+_queue: PullRequestQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> PullRequestQueue:
+    """Return the process-wide queue, configured from the environment on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = PullRequestQueue(debounce=float(os.getenv("AUTOPR_WEBHOOK_DEBOUNCE", "10")), workers=int(os.getenv("AUTOPR_WEBHOOK_WORKERS", "2")))
+        return _queue
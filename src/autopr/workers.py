@@ -0,0 +1,334 @@
+"""Resource-bounded worker processes for static analysis.
+
+Pathological inputs (deeply nested expressions, giant literal tables, minified
+code in a ``.py`` file) can make ``ast.parse`` recurse until the interpreter
+crashes, allocate gigabytes or spin for minutes. Analysis units therefore run
+in a small pool of worker processes instead of the API process:
+
+- each unit gets ``AUTOPR_ANALYSIS_CPU_SECONDS`` of CPU time (``RLIMIT_CPU``,
+  raised per unit from the worker's current usage; the kernel kills a worker
+  that overruns it with ``SIGXCPU``);
+- each worker's address space is capped at ``AUTOPR_ANALYSIS_MEMORY_MB``
+  (``RLIMIT_AS``; Linux does not enforce ``RLIMIT_RSS``), so a runaway
+  allocation fails with ``MemoryError`` inside the worker;
+- the parent waits at most ``AUTOPR_ANALYSIS_DEADLINE`` seconds of wall time
+  per unit, counted from when the worker has received the unit (so a fresh
+  worker's start-up does not count), and kills the worker after that (this
+  also covers units blocked off-CPU);
+- a worker is retired after ``AUTOPR_ANALYSIS_MAX_TASKS`` units, or as soon as
+  a unit hit a limit, and replaced on demand.
+
+A unit that hits a limit becomes a ``resource_limit`` finding ("skipped:
+resource limit ...") and the rest of the review carries on. Each unit is one
+file's section of the diff. ``AUTOPR_ANALYSIS_WORKERS`` sets the pool size
+(default: CPU count, at most 4); ``0`` analyzes in-process, where only
+``RecursionError`` and ``MemoryError`` are contained.
+"""
+from __future__ import annotations
+
+import atexit
+import contextvars
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Tuple
+
+from . import analysis, cancellation, metrics, profiling
+from .findings import Finding
+from .parser import split_diff
+
+try:  # POSIX only; elsewhere the deadline is the only limit
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+LIMIT_TYPE = "resource_limit"
+# seconds a worker may take to start and receive a unit before it is killed
+START_TIMEOUT = 60.0
+
+limit_hits = metrics.Counter("autopr_analysis_resource_limits_total", "Analysis units skipped for exceeding a resource limit", ("reason",))
+recycled = metrics.Counter("autopr_analysis_workers_recycled_total", "Analysis worker processes retired", ("reason",))
+
+
+class ResourceLimit(Exception):
+    """An analysis unit exceeded its CPU, memory, recursion or wall-clock budget."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _set_cpu_budget(seconds: float) -> None:
+    # RLIMIT_CPU counts the whole process lifetime, so the budget is relative to what was used so far
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + seconds) + 1
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _usage(before: Any) -> Tuple[float, int] | None:
+    # CPU seconds since ``before`` and the worker's peak RSS in KB (ru_maxrss is in bytes on macOS)
+    if before is None:
+        return None
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = after.ru_utime + after.ru_stime - before.ru_utime - before.ru_stime
+    return cpu, after.ru_maxrss // 1024 if sys.platform == "darwin" else after.ru_maxrss
+
+
+def _worker_main(conn: Any, cpu_seconds: float, memory_bytes: int) -> None:
+    # Ctrl-C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None and memory_bytes:
+        hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+        if hard != resource.RLIM_INFINITY:
+            memory_bytes = min(memory_bytes, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, hard))
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        # the parent starts the unit's clock here, after start-up and unpickling (which may import modules)
+        conn.send("started")
+        fn, args = task
+        if resource is not None and cpu_seconds:
+            _set_cpu_budget(cpu_seconds)
+        before = resource.getrusage(resource.RUSAGE_SELF) if resource is not None else None
+        try:
+            reply: Tuple[str, Any] = ("ok", fn(*args))
+        except MemoryError:
+            reply = ("limit", "memory")
+        except RecursionError:
+            reply = ("limit", "recursion depth")
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        usage = _usage(before)
+        try:
+            conn.send(reply + (usage,))
+        except MemoryError:
+            conn.send(("limit", "memory", usage))
+
+
+def _exit_reason(exitcode: int | None) -> str:
+    if exitcode is not None and hasattr(signal, "SIGXCPU") and exitcode == -signal.SIGXCPU:
+        return "cpu time"
+    if exitcode == -signal.SIGSEGV:
+        # the C parser overflowed the stack
+        return "recursion depth"
+    return f"worker exited ({exitcode})"
+
+
+class _Worker:
+    def __init__(self, ctx: Any, cpu_seconds: float, memory_bytes: int):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, cpu_seconds, memory_bytes), daemon=True, name="autopr-analysis")
+        self.process.start()
+        child.close()
+        self.tasks = 0
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                self.process.kill()
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+def _await_reply(worker: _Worker, limit: float, what: str) -> None:
+    waited = 0.0
+    while not worker.conn.poll(cancellation.POLL_INTERVAL):
+        waited += cancellation.POLL_INTERVAL
+        cancellation.check()
+        if limit and waited >= limit:
+            raise ResourceLimit(f"{what} over {limit:g}s")
+
+
+class WorkerPool:
+    """Worker processes that run one unit at a time under CPU, memory and wall-clock limits.
+
+    ``run`` is thread-safe: concurrent callers each get a worker, or wait for
+    one when all ``size`` are busy. Workers are started lazily.
+    """
+
+    def __init__(self, size: int = 2, cpu_seconds: float = 10.0, memory_mb: int = 1024, deadline: float = 20.0, max_tasks: int = 200):
+        self.size = max(1, size)
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = int(memory_mb * 1024 * 1024) if memory_mb else 0
+        self.deadline = deadline
+        self.max_tasks = max(1, max_tasks)
+        methods = multiprocessing.get_all_start_methods()
+        # never fork the (multi-threaded) server process itself
+        self._ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if "forkserver" in methods:
+            self._ctx.set_forkserver_preload([__name__])
+        self._idle: List[_Worker] = []
+        self._alive = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _acquire(self) -> _Worker:
+        with self._cond:
+            while not self._idle and self._alive >= self.size:
+                if self._closed:
+                    raise RuntimeError("worker pool is closed")
+                self._cond.wait(cancellation.POLL_INTERVAL)
+                cancellation.check()
+            if self._closed:
+                raise RuntimeError("worker pool is closed")
+            if self._idle:
+                return self._idle.pop()
+            self._alive += 1
+        try:
+            return _Worker(self._ctx, self.cpu_seconds, self.memory_bytes)
+        except BaseException:
+            with self._cond:
+                self._alive -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, worker: _Worker, retire: str | None = None, kill: bool = False) -> None:
+        if retire is None and worker.tasks >= self.max_tasks:
+            retire = "max tasks"
+        with self._cond:
+            if retire is None and not self._closed:
+                self._idle.append(worker)
+                self._cond.notify()
+                return
+        recycled.inc(reason=retire or "shutdown")
+        worker.stop(kill=kill)
+        with self._cond:
+            self._alive -= 1
+            self._cond.notify()
+
+    def run(self, fn: Callable[..., Any], *args: Any, deadline: float | None = None) -> Any:
+        """``fn(*args)`` in a worker; raises ``ResourceLimit`` if the unit ran out of budget.
+
+        ``fn`` and its arguments must be picklable (a module-level function).
+        """
+        deadline = self.deadline if deadline is None else deadline
+        worker = self._acquire()
+        worker.tasks += 1
+        try:
+            try:
+                worker.conn.send((fn, args))
+                _await_reply(worker, START_TIMEOUT, "start-up")
+                worker.conn.recv()
+                _await_reply(worker, deadline, "wall time")
+                status, value, usage = worker.conn.recv()
+            except (EOFError, OSError):
+                # the worker died: killed by the kernel at its CPU limit, or crashed
+                worker.process.join(timeout=1.0)
+                raise ResourceLimit(_exit_reason(worker.process.exitcode))
+        except ResourceLimit as e:
+            self._release(worker, retire=e.reason, kill=True)
+            raise
+        except BaseException:
+            # cancelled or broken pipe: the worker's state is unknown
+            self._release(worker, retire="aborted", kill=True)
+            raise
+        if usage is not None:
+            profiling.record_worker_usage(*usage)
+        if status == "limit":
+            self._release(worker, retire=value)
+            raise ResourceLimit(value)
+        self._release(worker)
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for worker in idle:
+            worker.stop()
+            with self._cond:
+                self._alive -= 1
+
+
+_pool: WorkerPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> WorkerPool | None:
+    """The process-wide pool configured from ``AUTOPR_ANALYSIS_*``, or None when disabled."""
+    global _pool
+    size = int(os.getenv("AUTOPR_ANALYSIS_WORKERS", str(min(4, os.cpu_count() or 1))))
+    if size <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(
+                size=size,
+                cpu_seconds=float(os.getenv("AUTOPR_ANALYSIS_CPU_SECONDS", "10")),
+                memory_mb=int(os.getenv("AUTOPR_ANALYSIS_MEMORY_MB", "1024")),
+                deadline=float(os.getenv("AUTOPR_ANALYSIS_DEADLINE", "20")),
+                max_tasks=int(os.getenv("AUTOPR_ANALYSIS_MAX_TASKS", "200")),
+            )
+        return _pool
+
+
+@atexit.register
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def skipped_finding(path: str, reason: str) -> Finding:
+    where = f" in {path}" if path else ""
+    return Finding(LIMIT_TYPE, f"skipped: resource limit ({reason}) while analyzing{where}", "low", file=path)
+
+
+def analyze_unit(chunk: str, language: str = "python", path: str = "") -> List[Finding]:
+    """Findings of ``analysis.analyze_diff`` for one unit, or a ``resource_limit`` finding."""
+    pool = get_pool()
+    try:
+        if pool is not None:
+            return pool.run(analysis.analyze_diff, chunk, language)
+        try:
+            return analysis.analyze_diff(chunk, language=language)
+        except MemoryError:
+            raise ResourceLimit("memory")
+        except RecursionError:
+            raise ResourceLimit("recursion depth")
+    except ResourceLimit as e:
+        limit_hits.inc(reason=e.reason)
+        return [skipped_finding(path, e.reason)]
+
+
+def analyze_diff(diff: str, language: str = "python") -> List[Finding]:
+    """Static analysis of ``diff``, one unit per file, run on the worker pool; findings carry ``file``."""
+    units = list(split_diff(diff).items()) or [("", diff)]
+    pool = get_pool()
+    if len(units) == 1 or pool is None:
+        results = [analyze_unit(chunk, language, path) for path, chunk in units]
+    else:
+        with ThreadPoolExecutor(max_workers=min(pool.size, len(units)), thread_name_prefix="autopr-analysis") as ex:
+            futures = [ex.submit(contextvars.copy_context().run, analyze_unit, chunk, language, path) for path, chunk in units]
+            results = [cancellation.result(fut) for fut in futures]
+    # line numbers count the unit's added lines, so findings say which file they belong to
+    out: List[Finding] = []
+    for (path, _), findings in zip(units, results):
+        if path:
+            for f in findings:
+                f["file"] = path
+        out.extend(findings)
+    return out
@@ -0,0 +1,80 @@
+import json
+import random
+import shutil
+import subprocess
+
+import pytest
+from click.testing import CliRunner
+
+from autopr import baseline, reviewer, workers
+from autopr.cli import cli
+
+LONG = "x" * 130
+LEGACY = f"import os\n\n\nclass Store:\n    def save(self, path):\n        data = '{LONG}'\n        return open(path).write(data)\n"
+
+
+def _git(repo, *args):
+    return subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True).stdout.decode()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.email", "dev@example.com")
+    _git(tmp_path, "config", "user.name", "dev")
+    (tmp_path / "store.py").write_text(LEGACY)
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "legacy")
+    return tmp_path
+
+
+def test_fingerprint_set_round_trip(tmp_path):
+    rng = random.Random(7)
+    fps = [rng.getrandbits(64) for _ in range(50000)]
+    path = str(tmp_path / "set.bin")
+    assert baseline.write_set(path, fps + fps[:10]) == 50000
+    fs = baseline.FingerprintSet(path)
+    assert len(fs) == 50000 and fs.capacity >= 100000
+    assert all(fp in fs for fp in fps[:1000])
+    assert not any(rng.getrandbits(64) in fs for _ in range(1000))
+    assert 0 not in fs
+    (tmp_path / "bad.bin").write_bytes(b"nope" * 10)
+    with pytest.raises(ValueError):
+        baseline.FingerprintSet(str(tmp_path / "bad.bin"))
+
+
+def test_fingerprints_ignore_line_numbers_and_track_symbols():
+    full = baseline.new_file_diff("store.py", LEGACY)
+    moved = baseline.new_file_diff("store.py", "\n\n" + LEGACY)
+    lint = [{"type": "long_line", "line": 10}]
+    assert baseline.finding_fingerprints(full, {"lint": lint}) == baseline.finding_fingerprints(moved, {"lint": [{"type": "long_line", "line": 12}]})
+    # a hunk inside a method: the header names the enclosing class, as in the full file
+    hunk = f"--- a/store.py\n+++ b/store.py\n@@ -5,3 +5,4 @@ class Store:\n     def save(self, path):\n         data = '{LONG}'\n+        path = str(path)\n         return open(path).write(data)\n"
+    assert baseline.finding_fingerprints(hunk, {"lint": [{"type": "long_line", "line": 5}]}) == baseline.finding_fingerprints(full, {"lint": lint})
+    other = baseline.new_file_diff("other.py", LEGACY)
+    assert baseline.finding_fingerprints(other, {"lint": [{"type": "long_line", "line": 10}]}) != baseline.finding_fingerprints(full, {"lint": lint})
+
+
+def test_resource_limit_findings_pass_through_a_baseline(tmp_path):
+    path = str(tmp_path / "set.bin")
+    baseline.write_set(path, [5, 7, 9])
+    skipped = workers.skipped_finding("a.py", "memory")
+    diff = baseline.new_file_diff("a.py", "x = 1\n")
+    assert baseline.filter_new(diff, baseline.FingerprintSet(path), {"static": [skipped]}) == ({"static": [skipped]}, 0)
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+def test_review_reports_only_new_findings(repo, monkeypatch):
+    monkeypatch.delenv("AUTOPR_BASELINE_FILE", raising=False)
+    before = json.loads(CliRunner().invoke(cli, ["baseline-findings", "--repo", str(repo)]).output)
+    assert before["files"] == 1 and before["entries"] >= 2
+    assert before["path"] == str(repo / ".autopr" / "findings-baseline.bin")
+
+    (repo / "store.py").write_text(LEGACY + "\n\nprint('migrated')\n")
+    diff = _git(repo, "diff")
+    types = lambda review: sorted(f["type"] for f in review["findings"])
+    without = reviewer._deterministic_from(reviewer.run_review_pipeline(diff, include_llm=False))
+    assert types(without) == ["debug_print", "long_line"]
+    review = reviewer._deterministic_from(reviewer.run_review_pipeline(diff, include_llm=False, repo=str(repo)))
+    assert types(review) == ["debug_print"]
+    assert review["_baseline"] == {"path": before["path"], "entries": before["entries"], "suppressed": 1}
@@ -0,0 +1,72 @@
+import json
+
+from click.testing import CliRunner
+from fastapi.testclient import TestClient
+
+from autopr import batch
+from autopr.cli import cli
+from autopr.main import app
+
+
+def _write_inputs(path, n):
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(n):
+            fh.write(json.dumps({"id": f"pr-{i}", "diff": f"+print({i})\n+# TODO {i}"}) + "\n")
+        fh.write("not json\n")
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh]
+
+
+def test_run_batch_writes_results_and_errors(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_inputs(src, 5)
+    stats = batch.run_batch(str(src), str(out), jobs=2, llm_concurrency=2)
+    assert stats == {"reviewed": 5, "errors": 1, "skipped": 0}
+    recs = {r["id"]: r for r in _read(out)}
+    assert "debug_print" in {f["type"] for f in recs["pr-3"]["review"]["findings"]}
+    assert "invalid JSON" in recs["line:6"]["error"]
+
+
+def test_run_batch_resumes_after_truncated_write(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_inputs(src, 4)
+    batch.run_batch(str(src), str(out))
+    lines = out.read_text(encoding="utf-8").splitlines(keepends=True)
+    # simulate a crash: two results written, third cut off mid-line
+    out.write_text("".join(lines[:2]) + lines[2][:10], encoding="utf-8")
+
+    stats = batch.run_batch(str(src), str(out))
+    # the invalid line's error record is not a checkpoint, so that line is tried again
+    assert stats["skipped"] == sum("review" in json.loads(l) for l in lines[:2])
+    reviewed = sorted(r["id"] for r in _read(out) if "review" in r)
+    assert reviewed == sorted(r["id"] for r in [json.loads(l) for l in lines] if "review" in r)
+
+
+def test_resume_retries_items_that_failed(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_inputs(src, 2)
+    out.write_text(json.dumps({"id": "pr-0", "review": {"summary": "done"}}) + "\n" + json.dumps({"id": "pr-1", "error": "server overloaded (queue full), retry later"}) + "\n", encoding="utf-8")
+    assert batch.completed_ids(str(out)) == {"pr-0"}
+    stats = batch.run_batch(str(src), str(out))
+    assert stats["skipped"] == 1 and stats["reviewed"] == 1
+    assert "review" in [r for r in _read(out) if r["id"] == "pr-1"][-1]
+
+
+def test_review_batch_cli(tmp_path):
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    _write_inputs(src, 2)
+    result = CliRunner().invoke(cli, ["review-batch", "--input", str(src), "--output", str(out)])
+    assert result.exit_code == 0
+    assert json.loads(result.output)["reviewed"] == 2
+
+
+def test_review_batch_endpoint_streams_ndjson():
+    client = TestClient(app)
+    r = client.post("/review/batch", json={"items": [{"id": "a", "diff": "+print(1)"}, {"diff": "+x = 1"}]})
+    assert r.status_code == 200
+    recs = [json.loads(line) for line in r.text.splitlines()]
+    assert {rec["id"] for rec in recs} >= {"a"}
+    assert all("review" in rec for rec in recs)
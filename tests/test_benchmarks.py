@@ -0,0 +1,58 @@
+import io
+
+from benchmarks import __main__ as bench_cli
+from benchmarks import generators, suite
+
+
+def test_generators_are_seeded():
+    assert generators.unified_diff(3, files=4, lines_per_file=50) == generators.unified_diff(3, files=4, lines_per_file=50)
+    assert generators.unified_diff(3, files=4) != generators.unified_diff(4, files=4)
+    diff = generators.unified_diff(0, files=3, lines_per_file=40)
+    assert diff.count("diff --git") == 3
+
+    log = generators.pytest_log(1, size_bytes=50_000, fail_ratio=0.05)
+    assert log == generators.pytest_log(1, size_bytes=50_000, fail_ratio=0.05)
+    fh = io.StringIO()
+    generators.write_pytest_log(fh, seed=1, size_bytes=50_000, fail_ratio=0.05)
+    assert fh.getvalue() == log
+
+    from autopr.ci_parser import parse_pytest_output
+    from autopr.coverage_utils import parse_coverage_summary
+
+    summary = parse_pytest_output(log)
+    assert summary["failed"] == len(summary["failures"]) > 0
+    assert parse_coverage_summary(generators.coverage_report(0, files=20))["coverage_percent"] > 0
+
+
+def test_run_small_subset(monkeypatch):
+    # the end-to-end benchmarks switch to the stub provider; restore the env afterwards
+    monkeypatch.setenv("AUTOPR_PROVIDER", "stub")
+    monkeypatch.setenv("AUTOPR_PROVIDERS", "")
+    report = suite.run(["parse_diff", "review_pr_small"], size="small", repeat=1)
+    assert set(report["results"]) == {"parse_diff", "review_pr_small"}
+    assert report["results"]["parse_diff"]["min_s"] <= report["results"]["parse_diff"]["mean_s"]
+
+
+def test_finding_memory_reports_the_saving():
+    report = suite.finding_memory(2000)
+    assert report["finding_bytes"] < report["dict_bytes"]
+    assert report["saving"] >= 0.3
+
+
+def _report(**times):
+    return {"results": {k: {"min_s": v, "median_s": v, "mean_s": v, "repeat": 1} for k, v in times.items()}}
+
+
+def test_compare_flags_regressions(tmp_path, capsys):
+    base = _report(a=1.0, b=1.0, c=1.0, tiny=0.0001, gone=1.0)
+    cur = _report(a=1.05, b=1.5, c=0.5, tiny=0.0005, added=1.0)
+    status = {r["name"]: r["status"] for r in suite.compare(base, cur, threshold=0.1)}
+    assert status == {"a": "ok", "b": "regression", "c": "improved", "tiny": "ok", "gone": "missing", "added": "new"}
+
+    import json
+
+    (tmp_path / "base.json").write_text(json.dumps(base))
+    (tmp_path / "cur.json").write_text(json.dumps(cur))
+    assert bench_cli.main(["compare", str(tmp_path / "base.json"), str(tmp_path / "cur.json")]) == 1
+    assert "regression(s) beyond 10%: b" in capsys.readouterr().out
+    assert bench_cli.main(["compare", str(tmp_path / "base.json"), str(tmp_path / "cur.json"), "--threshold", "0.6"]) == 0
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from autopr import cancellation
+from autopr.pipeline import Pipeline, Stage
+from autopr.providers import StubProvider
+from autopr.resilience import CircuitBreaker, ResilientProvider
+
+
+def test_cancel_stops_a_running_pipeline():
+    token = cancellation.CancelToken()
+    seen = []
+
+    def slow():
+        seen.append(cancellation.current() is token)
+        time.sleep(2)
+        return 1
+
+    pipe = Pipeline([Stage("slow", slow), Stage("after", lambda slow: slow + 1, requires=["slow"])])
+    threading.Timer(0.1, token.cancel, args=("superseded",)).start()
+    start = time.monotonic()
+    with cancellation.scope(token), pytest.raises(cancellation.Cancelled) as exc:
+        pipe.run()
+    assert time.monotonic() - start < 1.0
+    assert exc.value.reason == "superseded"
+    # stage threads run in a copy of the caller's context
+    assert seen == [True]
+
+
+def test_cancelled_retry_is_not_sent_and_does_not_trip_breaker():
+    calls = []
+
+    class Flaky(StubProvider):
+        def review_code(self, diff):
+            calls.append(diff)
+            raise TimeoutError("upstream timeout")
+
+    breaker = CircuitBreaker(failure_threshold=5)
+    provider = ResilientProvider(Flaky(), max_retries=3, base_delay=5.0, max_delay=5.0, breaker=breaker)
+    token = cancellation.CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    start = time.monotonic()
+    with cancellation.scope(token), pytest.raises(cancellation.Cancelled):
+        provider.review_code("+x")
+    # the backoff sleep woke up on cancel and no retry was sent
+    assert time.monotonic() - start < 1.0
+    assert len(calls) == 1
+    assert breaker.state == "closed"
+
+
+def test_check_without_token_is_a_noop():
+    cancellation.check()
+    token = cancellation.CancelToken()
+    token.cancel("closed")
+    with cancellation.scope(token):
+        with pytest.raises(cancellation.Cancelled):
+            cancellation.check()
+    cancellation.check()
@@ -36,3 +36,42 @@ tests/test_example.py:5: AssertionError
     res = ci_parser.parse_pytest_output(log)
     assert res["failed"] == 1
     assert len(res["failures"]) >= 1
+
+
+def _fixture_failure(i):
+    return f"""________________________ test_case_{i} ________________________
+
+db = <Connection object at 0x7f{i:08x}>
+
+    def test_case_{i}(db):
+>       assert db.query({i})
+
+tests/test_cases.py:{10 + i}: 
+conftest.py:44: in query
+    return self.conn.execute(sql)
+E   ConnectionError: could not connect to /tmp/db-{i}.sock after {i % 7} retries
+
+conftest.py:52: ConnectionError
+"""
+
+
+def test_failures_are_clustered_by_signature():
+    other = "________________________ test_other ________________________\n\n    def test_other():\n>       assert 1 == 2\nE       assert 1 == 2\n\ntests/test_x.py:3: AssertionError\n"
+    log = "=== FAILURES ===\n" + "".join(_fixture_failure(i) for i in range(500)) + other + "==== 501 failed in 2.00s ====\n"
+    res = ci_parser.parse_pytest_output(log)
+    assert res["failed"] == 501
+    assert len(res["failures"]) == ci_parser.MAX_FAILURES and res["failures_omitted"] == 501 - ci_parser.MAX_FAILURES
+    assert res["failures"][0] == {"name": "test_case_0", "message": "ConnectionError: could not connect to /tmp/db-0.sock after 0 retries"}
+    first, second = res["failure_clusters"]
+    assert first["count"] == 500 and first["examples"] == ["test_case_0", "test_case_1", "test_case_2"]
+    assert first["exception"] == "ConnectionError" and first["frames"] == ["conftest.py:query", "conftest.py"]
+    assert first["message"] == "could not connect to <path> after # retries"
+    assert (second["count"], second["exception"], second["message"]) == (1, "AssertionError", "assert # == #")
+    assert res["clusters_omitted"] == 0
+
+
+def test_cluster_count_is_bounded():
+    records = [{"name": f"test_{i}", "exception": "KeyError", "frames": [f"mod_{i}.py:f"], "error": "'k'"} for i in range(100)]
+    clusters, omitted = ci_parser.cluster_failures(records, max_clusters=10)
+    assert len(clusters) == 10 and omitted == 90
+    assert ci_parser.normalize_message("bad <Obj at 0xdeadBEEF> in C:\\work\\a.py line 12") == "bad <Obj at <addr>> in <path> line #"
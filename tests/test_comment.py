@@ -0,0 +1,40 @@
+from autopr import comment
+
+
+def test_render_comment_matches_workflow_layout():
+    result = {
+        "pr": {"title": "Add helper", "what_changed": "Adds add()", "files_impacted": ["a.py", "b.py"], "risk_level": "low", "_context": {"files_changed": ["a.py"]}},
+        "review": {
+            "summary": "Looks fine",
+            "findings": [{"type": "todo", "message": "TODO left", "severity": "low"}, {"type": "style", "message": "naming"}],
+            "_tests": {"passed": 3, "failed": 1, "errors": 0, "skipped": 0},
+            "_coverage": {"before": 80.0, "after": None, "delta": None},
+            "_issue_alignment": {"score": 0.5, "matched": []},
+        },
+    }
+    body = comment.render_comment(result)
+    assert body.startswith(comment.MARKER)
+    assert "### 📝 Suggested PR Title\n**Add helper**" in body
+    assert "**Files impacted:** a.py, b.py" in body
+    assert "**Findings (top 2):**\n- [LOW] **todo** — TODO left\n- [INFO] **style** — naming\n" in body
+    assert "- Passed: 3  •  Failed: 1  •  Errors: 0  •  Skipped: 0" in body
+    assert "- Before: 80.0%  •  After: N/A%  •  Δ: N/A%" in body
+    assert "- Score: 0.50  •  Matched: none" in body
+    assert "### 🗂️ Files changed\n- a.py\n\n" in body
+    assert body.endswith("*This comment was generated automatically by AutoPR.*")
+
+
+def test_render_bare_review_caps_findings():
+    findings = [{"type": "t", "message": str(i), "severity": "high"} for i in range(40)]
+    body = comment.render_comment({"summary": "s", "findings": findings, "confidence": 0.5})
+    assert "**Findings (top 25):**" in body
+    assert body.count("- [HIGH]") == 25
+    assert "Suggested PR Title" not in body
+
+
+def test_render_comment_lists_failure_clusters():
+    clusters = [{"count": 900 - i, "exception": "ConnectionError", "frames": ["conftest.py:db"], "message": f"refused #{i}", "examples": ["test_a", "test_b"]} for i in range(7)]
+    body = comment.render_comment({"summary": "s", "findings": [], "_tests": {"passed": 0, "failed": 6300, "errors": 0, "skipped": 0, "failure_clusters": clusters, "clusters_omitted": 3}})
+    assert "- 900× **ConnectionError** in `conftest.py:db`: refused #0 (e.g. `test_a`, `test_b`)\n" in body
+    assert body.count("× **ConnectionError**") == comment.MAX_CLUSTERS
+    assert "- …and 5 more failure signatures\n" in body
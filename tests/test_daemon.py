@@ -0,0 +1,78 @@
+import json
+import threading
+
+import pytest
+from click.testing import CliRunner
+
+from autopr import daemon
+from autopr.cli import cli
+
+
+@pytest.fixture
+def running_daemon(tmp_path, monkeypatch):
+    path = str(tmp_path / "d.sock")
+    monkeypatch.setenv("AUTOPR_DAEMON_SOCKET", path)
+    server = daemon.make_server(path)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def test_call_without_daemon_raises_unavailable(tmp_path):
+    with pytest.raises(daemon.DaemonUnavailable):
+        daemon.call("ping", path=str(tmp_path / "missing.sock"))
+
+
+def test_forward_or_run_falls_back_in_process(tmp_path, monkeypatch):
+    monkeypatch.setenv("AUTOPR_DAEMON_SOCKET", str(tmp_path / "missing.sock"))
+    out = daemon.forward_or_run("coverage-compare", {"before_text": "TOTAL 10 2 80%", "after_text": "TOTAL 10 1 90%"})
+    assert out["delta"] == 10.0
+
+
+def test_forward_or_run_falls_back_when_the_daemon_hangs(tmp_path, monkeypatch):
+    import socket
+
+    path = str(tmp_path / "stuck.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(1)  # accepts connections but never answers
+    monkeypatch.setenv("AUTOPR_DAEMON_SOCKET", path)
+    monkeypatch.setenv("AUTOPR_DAEMON_TIMEOUT", "0.2")
+    try:
+        out = daemon.forward_or_run("coverage-compare", {"before_text": "TOTAL 10 2 80%", "after_text": "TOTAL 10 1 90%"})
+    finally:
+        listener.close()
+    assert out["delta"] == 10.0
+
+
+def test_cli_commands_forward_to_daemon(running_daemon, monkeypatch):
+    calls = []
+    original = daemon.resolve
+
+    def spy(command):
+        calls.append(command)
+        return original(command)
+
+    monkeypatch.setattr(daemon, "resolve", spy)
+    runner = CliRunner()
+    result = runner.invoke(cli, ["analyze", "--diff", "+def foo():\n+    print('x')"])
+    assert result.exit_code == 0
+    assert "debug_print" in result.output
+    assert calls == ["analyze"]
+
+    status = json.loads(runner.invoke(cli, ["daemon", "status"]).output)
+    assert status["running"] is True
+
+
+def test_daemon_reports_command_errors(running_daemon):
+    with pytest.raises(RuntimeError):
+        daemon.call("review", {"unexpected": 1})
+    with pytest.raises(RuntimeError):
+        daemon.call("nope")
+
+
+def test_make_server_refuses_second_daemon(running_daemon):
+    with pytest.raises(RuntimeError):
+        daemon.make_server(running_daemon)
@@ -0,0 +1,60 @@
+import pytest
+
+from autopr import fastpath, generator, reviewer
+from autopr.providers import StubProvider
+
+DOCS = "--- a/README.md\n+++ b/README.md\n-teh docs\n+the docs\n"
+LOCK = "--- a/poetry.lock\n+++ b/poetry.lock\n-version = \"1.0\"\n+version = \"1.1\"\n+hash = \"abc\"\n"
+BUMP = "--- a/pyproject.toml\n+++ b/pyproject.toml\n-version = \"1.2.3\"\n+version = \"1.3.0\"\n"
+SPACES = "--- a/app.js\n+++ b/app.js\n-let a=1;  \n+let a = 1;\n"
+REINDENT = "--- a/app.py\n+++ b/app.py\n-    return x\n+return x\n"
+CODE = "--- a/app.py\n+++ b/app.py\n-x = 1\n+x = 2\n"
+
+
+@pytest.mark.parametrize("diff,kind", [(DOCS, "docs"), (LOCK, "lockfile"), (BUMP, "version_bump"), (SPACES, "whitespace")])
+def test_classify_trivial_diffs(diff, kind):
+    assert fastpath.classify(diff)["class"] == kind
+
+
+def test_code_and_python_reindent_are_not_fast_path():
+    assert fastpath.classify(CODE) is None
+    assert fastpath.classify(REINDENT) is None
+    assert fastpath.classify("--- a/requirements.txt\n+++ b/requirements.txt\n+requests==2.0\n") is None
+
+
+def test_reordering_and_string_contents_are_not_whitespace():
+    swap = "--- a/a.py\n+++ b/a.py\n-x = check()\n-y = use(x)\n+y = use(x)\n+x = check()\n"
+    assert fastpath.classify(swap) is None
+    assert fastpath.classify("--- a/a.js\n+++ b/a.js\n-s = \"a b\";\n+s = \"ab\";\n") is None
+    assert fastpath.classify("--- a/a.js\n+++ b/a.js\n-foo(a,\n-    \"a b\")\n+foo(a, \"a b\")\n")["class"] == "whitespace"
+
+
+def test_code_in_docs_directories_is_not_docs():
+    conf = "--- a/docs/conf.py\n+++ b/docs/conf.py\n+os.system('make html')\n"
+    assert fastpath.classify(conf) is None
+    assert not any(fastpath._is_doc(p) for p in ("src/x/docs/handler.py", "notice.py", "changelog.py"))
+    assert all(fastpath._is_doc(p) for p in ("docs/guide.rst", "LICENSE", "NOTICE", "CHANGELOG.md"))
+
+
+class Exploding(StubProvider):
+    def review_code(self, diff):
+        raise AssertionError("provider must not be called")
+
+    def generate_pr_description(self, diff, commits, issue):
+        raise AssertionError("provider must not be called")
+
+
+def test_fast_path_skips_provider(monkeypatch):
+    monkeypatch.setattr(reviewer.llm, "_provider", Exploding())
+    review = reviewer.review_pr(BUMP)
+    assert review["_fast_path"]["class"] == "version_bump"
+    assert review["summary"].startswith("Deterministic review: version bump")
+    desc = generator.generate_pr_from(BUMP, [])
+    assert desc["title"] == "Bump version to 1.3.0"
+    assert desc["_fast_path"]["version"] == "1.3.0"
+
+
+def test_force_llm_disables_fast_path(monkeypatch):
+    monkeypatch.setenv("AUTOPR_FORCE_LLM", "1")
+    assert fastpath.classify(DOCS) is None
+    assert "_fast_path" not in reviewer.review_pr(DOCS)
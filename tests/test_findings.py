@@ -0,0 +1,39 @@
+import io
+import json
+import pickle
+
+from autopr import lint, reviewer
+from autopr.findings import Finding, json_default, write_json
+
+
+def test_finding_behaves_like_the_dict_it_replaces():
+    f = Finding("long_line", "Line exceeds 120 characters", "low", line=3)
+    assert f == {"type": "long_line", "message": "Line exceeds 120 characters", "severity": "low", "line": 3}
+    assert "file" not in f and f.get("file") is None and len(f) == 4
+    f["file"] = "a.py"
+    f["confidence"] = 0.5
+    assert list(f) == ["type", "message", "severity", "file", "line", "confidence"]
+    del f["line"]
+    assert dict(f) == f.to_dict() == {"type": "long_line", "message": "Line exceeds 120 characters", "severity": "low", "file": "a.py", "confidence": 0.5}
+    # the missing-field sentinel survives a round trip through worker processes
+    assert pickle.loads(pickle.dumps(f)) == f and "line" not in pickle.loads(pickle.dumps(f))
+    assert json.loads(json.dumps([f], default=json_default)) == [f.to_dict()]
+
+
+def test_normalize_keeps_only_requested_keys():
+    found = lint.run_basic_lint("x = 1 \n")
+    assert isinstance(found[0], Finding)
+    assert reviewer._normalize_finding(found[0], "lint") == {"type": "trailing_whitespace", "message": "Trailing whitespace", "severity": "low"}
+    assert reviewer._normalize_finding(found[0], "lint", keep=("line", "file")) == dict(found[0])
+    assert reviewer._normalize_finding("oops", "ai") == {"type": "ai", "message": "oops", "severity": None}
+
+
+def test_write_json_streams_the_same_document():
+    res = {
+        "review": {"summary": "sé", "findings": [Finding("todo", "TODO", "low", line=i, file="a.py") for i in range(50)] + [{"type": "ai", "message": "m", "severity": None}], "confidence": 0.5, "_perf": {}},
+        "pr": {"files_impacted": [], "title": None},
+    }
+    buf = io.StringIO()
+    write_json(res, buf, buffer_size=64)
+    assert buf.getvalue().endswith("}\n")
+    assert json.loads(buf.getvalue()) == json.loads(json.dumps(res, indent=2, default=json_default))
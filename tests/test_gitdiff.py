@@ -0,0 +1,79 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+from click.testing import CliRunner
+
+from autopr import gitdiff
+from autopr.cli import cli
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.email", "dev@example.com")
+    _git(tmp_path, "config", "user.name", "dev")
+    (tmp_path / "app.py").write_text("def f():\n    return 1\n")
+    (tmp_path / "notes.txt").write_text("".join(f"line {i}\n" for i in range(20)))
+    (tmp_path / "logo.bin").write_bytes(bytes(range(256)))
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "initial")
+    _git(tmp_path, "tag", "base")
+
+    (tmp_path / "app.py").write_text("def f():\n    print('debug')\n    return 2\n")
+    _git(tmp_path, "mv", "notes.txt", "docs.txt")
+    (tmp_path / "logo.bin").write_bytes(bytes(reversed(range(256))))
+    (tmp_path / "bundle.js").write_text("var a=1;\n")
+    (tmp_path / ".gitattributes").write_text("bundle.js linguist-generated\n")
+    (tmp_path / "big.sql").write_text("".join(f"insert {i};\n" for i in range(50)))
+    (tmp_path / "with space.py").write_text("x = 1\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "feat: change f")
+    (tmp_path / "app.py").write_text("def f():\n    print('debug')\n    return 3\n")
+    _git(tmp_path, "commit", "-q", "-am", "fix: return 3")
+    return tmp_path
+
+
+def test_list_changes_reads_raw_and_numstat(repo):
+    changes = {c["path"]: c for c in gitdiff.list_changes(str(repo), "base", "HEAD")}
+    assert changes["docs.txt"]["status"] == "R" and changes["docs.txt"]["old_path"] == "notes.txt"
+    assert changes["logo.bin"]["binary"] and changes["logo.bin"]["added"] is None
+    assert (changes["app.py"]["added"], changes["app.py"]["removed"]) == (2, 1)
+    assert changes["with space.py"]["status"] == "A"
+
+
+def test_collect_skips_unreviewable_files(repo):
+    out = gitdiff.collect(str(repo), "base", "HEAD", exclude=["*.sql"], jobs=4)
+    assert out["commits"] == ["feat: change f", "fix: return 3"]
+    assert sorted(out["files"]) == [".gitattributes", "app.py", "with space.py"]
+    assert {s["path"]: s["reason"] for s in out["skipped"]} == {"logo.bin": "binary", "bundle.js": "generated", "big.sql": "excluded", "docs.txt": "renamed"}
+    assert "+    print('debug')" in out["diff"] and "insert" not in out["diff"]
+    # same text git itself would produce for the kept files
+    expected = subprocess.run(["git", "-C", str(repo), "diff", "-M", "base", "HEAD", "--", *out["files"]], capture_output=True, text=True).stdout
+    assert sorted(out["diff"].split("diff --git")) == sorted(expected.split("diff --git"))
+
+
+def test_collect_drops_oversized_files(repo, monkeypatch):
+    monkeypatch.setenv("AUTOPR_GIT_MAX_FILE_LINES", "10")
+    out = gitdiff.collect(str(repo), "base", "HEAD", exclude=[])
+    assert {"path": "big.sql", "reason": "too large (50 lines)"} in out["skipped"]
+
+
+def test_cli_review_from_repo(repo, monkeypatch):
+    monkeypatch.setenv("AUTOPR_NO_DAEMON", "1")
+    result = CliRunner().invoke(cli, ["review", "--repo", str(repo), "--base", "base", "--head", "HEAD", "--exclude", "*.sql"])
+    assert result.exit_code == 0, result.output
+    out = json.loads(result.output)
+    assert any("debug" in f["type"] for f in out["findings"])
+    assert out["_git"]["base"] == "base" and {"path": "big.sql", "reason": "excluded"} in out["_git"]["skipped"]
+
+    bad = CliRunner().invoke(cli, ["review", "--repo", str(repo), "--base", "nope"])
+    assert bad.exit_code != 0 and "failed" in bad.output
+    assert CliRunner().invoke(cli, ["review"]).exit_code == 2
@@ -0,0 +1,133 @@
+import time
+
+import pytest
+
+from autopr import hedging, llm as llm_mod, metrics
+from autopr.hedging import HedgedProvider
+from autopr.providers import BaseProvider, StubProvider
+from autopr.resilience import ProviderUnavailable
+
+
+class Backend(BaseProvider):
+    def __init__(self, name, delay=0.0, result=None, error=None):
+        self.label = name
+        self.delay = delay
+        self.result = result if result is not None else {"summary": name, "findings": [], "confidence": 0.5}
+        self.error = error
+        self.calls = 0
+        self.started = None
+
+    def review_code(self, diff):
+        self.calls += 1
+        self.started = time.monotonic()
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = Backend("primary"), Backend("backup")
+    p = HedgedProvider([primary, backup], delay=0.5)
+    assert p.review_code("+x")["summary"] == "primary"
+    assert backup.calls == 0
+
+
+def test_slow_primary_is_hedged_and_backup_wins():
+    metrics.reset()
+    primary, backup = Backend("primary", delay=0.5), Backend("backup")
+    p = HedgedProvider([primary, backup], delay=0.02, budget=1.0)
+    start = time.monotonic()
+    assert p.review_code("+x")["summary"] == "backup"
+    assert time.monotonic() - start < 0.3
+    assert 'autopr_hedge_wins_total{winner="backup",position="1"} 1' in metrics.render()
+
+
+def test_failing_primary_fails_over_immediately():
+    primary, backup = Backend("primary", error=RuntimeError("down")), Backend("backup")
+    p = HedgedProvider([primary, backup], delay=10.0)
+    start = time.monotonic()
+    assert p.review_code("+x")["summary"] == "backup"
+    assert time.monotonic() - start < 1.0
+
+
+def test_unparsed_answer_is_not_accepted_over_a_valid_one():
+    primary, backup = Backend("primary", result={"raw": "not json"}), Backend("backup", delay=0.05)
+    p = HedgedProvider([primary, backup], delay=10.0)
+    assert p.review_code("+x")["summary"] == "backup"
+    only = HedgedProvider([Backend("primary", result={"raw": "not json"})])
+    assert only.review_code("+x") == {"raw": "not json"}
+
+
+def test_all_backends_failing_raises_provider_unavailable():
+    p = HedgedProvider([Backend("a", error=RuntimeError("x")), Backend("b", error=RuntimeError("y"))], delay=0.01)
+    with pytest.raises(ProviderUnavailable):
+        p.review_code("+x")
+
+
+def test_budget_caps_hedges():
+    backup = Backend("backup")
+    p = HedgedProvider([Backend("primary", delay=0.03), backup], delay=0.0, budget=0.1)
+    for _ in range(10):
+        p.review_code("+x")
+    assert backup.calls == 1
+
+
+def test_later_hedges_are_staggered_from_the_previous_launch():
+    a, b, c = Backend("a", delay=0.5), Backend("b", delay=0.5), Backend("c")
+    p = HedgedProvider([a, b, c], delay=0.1, budget=2.0)
+    assert p.review_code("+x")["summary"] == "c"
+    assert c.started - b.started >= 0.08
+
+
+def test_budget_counts_every_extra_request():
+    a, b, c = Backend("a"), Backend("b", delay=0.1), Backend("c")
+    p = HedgedProvider([a, b, c], delay=0.01, budget=0.1)
+    for _ in range(20):
+        p.review_code("+x")
+    a.delay = 0.1
+    for _ in range(5):
+        p.review_code("+x")
+    # a call that sends two backup requests uses two units of the budget: 10% of 25 calls
+    assert b.calls + c.calls <= 3
+
+
+def test_slow_primary_that_loses_is_still_sampled():
+    p = HedgedProvider([Backend("primary", delay=0.2), Backend("backup")], delay=0.01, budget=1.0)
+    assert p.review_code("+x")["summary"] == "backup"
+    time.sleep(0.3)
+    assert len(p._latencies) == 1 and p._latencies[0] >= 0.2
+
+
+def test_adaptive_delay_uses_primary_p95():
+    p = HedgedProvider([Backend("primary"), Backend("backup")], initial_delay=3.0, min_delay=0.0)
+    assert p.hedge_delay() == 3.0
+    p._latencies.extend([0.1] * 95 + [2.0] * 5)
+    assert p.hedge_delay() == pytest.approx(0.1)
+
+
+def test_provider_list_selection(monkeypatch):
+    assert llm_mod.parse_provider_list("openai, anthropic:claude-3-5-sonnet") == [("openai", None), ("anthropic", "claude-3-5-sonnet")]
+    monkeypatch.setenv("AUTOPR_PROVIDERS", "stub,stub")
+    chosen = llm_mod._choose_provider()
+    assert isinstance(chosen, HedgedProvider) and len(chosen.backends) == 2
+    # unavailable backends are dropped; a single remaining one is used directly
+    monkeypatch.setenv("AUTOPR_PROVIDERS", "nosuch,stub")
+    chosen = llm_mod._choose_provider()
+    assert isinstance(chosen, llm_mod.InstrumentedProvider) and isinstance(chosen.backend, StubProvider)
+    assert isinstance(hedging.from_env([StubProvider()]), StubProvider)
+
+
+def test_losing_backend_stops_retrying_once_the_hedge_answers():
+    from autopr.resilience import ResilientProvider
+
+    class Unavailable(Exception):
+        status_code = 503
+
+    primary = Backend("primary", delay=0.05, error=Unavailable("busy"))
+    p = HedgedProvider([ResilientProvider(primary, max_retries=3, base_delay=0.1, max_delay=0.1), Backend("backup", delay=0.01)], delay=0.02, budget=1.0)
+    assert p.review_code("+x")["summary"] == "backup"
+    calls = primary.calls
+    time.sleep(0.5)
+    # at most the attempt already on the wire finishes; no further retries are sent
+    assert primary.calls == calls <= 1
@@ -0,0 +1,100 @@
+from autopr import incremental
+from autopr.llm import llm
+from autopr.providers import StubProvider
+
+A = "diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n@@ -0,0 +1,2 @@\n+def a():\n+    print('debug')\n"
+B1 = "diff --git a/b.py b/b.py\n--- a/b.py\n+++ b/b.py\n@@ -0,0 +1,2 @@\n+def b():\n+    return 1\n"
+B2 = "diff --git a/b.py b/b.py\n--- a/b.py\n+++ b/b.py\n@@ -0,0 +1,3 @@\n+def b():\n+    # TODO: tidy\n+    return 2\n"
+INTERDIFF = "diff --git a/b.py b/b.py\n--- a/b.py\n+++ b/b.py\n@@ -1,2 +1,3 @@\n def b():\n-    return 1\n+    # TODO: tidy\n+    return 2\n"
+
+
+class Recording(StubProvider):
+    def __init__(self):
+        self.calls = []
+
+    def review_code(self, diff):
+        self.calls.append(("review_code", diff))
+        return {"summary": "first", "findings": [
+            {"type": "ai", "message": "a issue", "severity": "low", "file": "a.py"},
+            {"type": "ai", "message": "b issue", "severity": "low", "file": "b/b.py"},
+            {"type": "ai", "message": "general", "severity": "low"},
+        ], "confidence": 0.7}
+
+    def generate_pr_description(self, diff, commits, issue):
+        self.calls.append(("generate_pr_description", diff))
+        return dict(super().generate_pr_description(diff, commits, issue), title="First title", why="because")
+
+    def amend_review(self, previous, diff):
+        self.calls.append(("amend_review", diff, previous))
+        return {"summary": "amended", "findings": [{"type": "ai", "message": "b changed", "severity": "medium", "file": "b.py"}], "confidence": 0.8}
+
+    def amend_pr_description(self, previous, diff, commits, issue):
+        self.calls.append(("amend_pr_description", diff, previous, commits))
+        return {"title": "Amended title"}
+
+
+def test_push_amends_from_interdiff(monkeypatch):
+    monkeypatch.delenv("AUTOPR_LARGE_MODEL", raising=False)
+    monkeypatch.delenv("AUTOPR_SMALL_MODEL", raising=False)
+    provider = Recording()
+    monkeypatch.setattr(llm, "_provider", provider)
+    store = incremental.StateStore()
+
+    first = incremental.review_incremental("o/r#1", "h1", A + B1, commits=["feat: a and b"], store=store)
+    assert first["_incremental"]["mode"] == "full"
+    assert {c[0] for c in provider.calls} == {"review_code", "generate_pr_description"}
+    assert {"file": "a.py"}.items() <= next(f for f in first["review"]["findings"] if f["type"] == "debug_print").items()
+
+    provider.calls.clear()
+    second = incremental.review_incremental("o/r#1", "h2", A + B2, commits=["feat: a and b", "fix: b"], interdiff=INTERDIFF, store=store)
+    info = second["_incremental"]
+    assert info["mode"] == "amend" and info["previous_head"] == "h1"
+    assert info["files_kept"] == ["a.py"] and info["llm_input_chars"] == len(INTERDIFF)
+
+    calls = {c[0]: c for c in provider.calls}
+    assert set(calls) == {"amend_review", "amend_pr_description"}
+    # only the interdiff is sent, with the previous findings for touched files and general remarks
+    assert calls["amend_review"][1] == INTERDIFF
+    assert [f["message"] for f in calls["amend_review"][2]["findings"]] == ["b issue", "general"]
+    assert calls["amend_pr_description"][2]["title"] == "First title"
+    assert calls["amend_pr_description"][3] == ["fix: b"]
+
+    messages = [f["message"] for f in second["review"]["findings"]]
+    assert "a issue" in messages and "b changed" in messages
+    assert "b issue" not in messages and "general" not in messages
+    assert any(f.get("file") == "b.py" and f["type"] == "todo" for f in second["review"]["findings"])
+    assert second["review"]["summary"] == "amended"
+    assert second["pr"]["title"] == "Amended title" and second["pr"]["why"] == "because"
+
+    provider.calls.clear()
+    again = incremental.review_incremental("o/r#1", "h2", A + B2, store=store)
+    assert again["_incremental"]["mode"] == "unchanged" and provider.calls == []
+
+
+def test_missing_interdiff_falls_back_to_full_review(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm, "_provider", StubProvider())
+    store = incremental.StateStore(str(tmp_path))
+    incremental.review_incremental("o/r#2", "h1", A, store=store)
+    # state persists across store instances
+    assert incremental.StateStore(str(tmp_path)).get("o/r#2")["head_sha"] == "h1"
+    out = incremental.review_incremental("o/r#2", "h2", A + B1, interdiff=None, store=store)
+    assert out["_incremental"]["mode"] == "full"
+    out = incremental.review_incremental("o/r#2", "h3", A + B2, interdiff=INTERDIFF, store=store)
+    assert out["_incremental"]["mode"] == "amend" and out["_incremental"]["files_kept"] == ["a.py"]
+
+
+def test_findings_are_computed_once_per_file(monkeypatch):
+    from autopr import lint, workers
+
+    monkeypatch.setattr(llm, "_provider", StubProvider())
+    analyzed, linted = [], []
+    analyze_unit, run_basic_lint = workers.analyze_unit, lint.run_basic_lint
+    monkeypatch.setattr(workers, "analyze_unit", lambda chunk, language="python", path="": analyzed.append(path) or analyze_unit(chunk, language, path))
+    monkeypatch.setattr(workers, "analyze_diff", lambda diff, **kw: analyzed.append(diff) or [])
+    monkeypatch.setattr(lint, "run_basic_lint", lambda diff: linted.append(diff) or run_basic_lint(diff))
+    store = incremental.StateStore()
+    incremental.review_incremental("o/r#3", "h1", A + B1, store=store)
+    incremental.review_incremental("o/r#3", "h2", A + B2, interdiff=INTERDIFF, store=store)
+    # each file once for the first review, then only the touched file; never the whole diff or the interdiff
+    assert analyzed == ["a.py", "b.py", "b.py"]
+    assert linted == [A, B1, B2]
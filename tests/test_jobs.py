@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+from autopr import jobs
+from autopr.main import app
+
+
+def test_identical_requests_attach_to_inflight_job():
+    release = threading.Event()
+    calls = []
+
+    def runner(**kwargs):
+        calls.append(kwargs)
+        release.wait(5)
+        return {"summary": "ok", "findings": [], "confidence": 1.0}
+
+    mgr = jobs.JobManager(jobs.JobStore(), workers=2, runner=runner)
+    first = mgr.submit({"diff": "+x"})
+    second = mgr.submit({"diff": "+x"})
+    other = mgr.submit({"diff": "+y"})
+    assert second["id"] == first["id"] and second["deduplicated"]
+    assert other["id"] != first["id"]
+
+    release.set()
+    done = mgr.get(first["id"], wait=5)
+    assert done["status"] == "done"
+    assert done["result"]["summary"] == "ok"
+    assert len(calls) == 2
+    # finished jobs no longer absorb new submissions
+    assert mgr.submit({"diff": "+x"})["id"] != first["id"]
+
+
+def test_sqlite_store_shares_jobs_between_stores(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    a, b = jobs.SQLiteJobStore(path), jobs.SQLiteJobStore(path)
+    job_id, created = a.create_or_attach("k")
+    assert created
+    assert b.create_or_attach("k") == (job_id, False)
+    a.update(job_id, status="done", result={"n": 1})
+    assert b.wait(job_id, 1)["result"] == {"n": 1}
+    assert b.create_or_attach("k")[1]
+
+
+def test_sqlite_jobs_of_a_dead_worker_expire_instead_of_attaching(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    a, b = jobs.SQLiteJobStore(path, lease=0.3), jobs.SQLiteJobStore(path, lease=0.3)
+    alive, _ = a.create_or_attach("alive")
+    dead, _ = a.create_or_attach("dead")
+    a.update(dead, status="running")
+    a._owned.discard(dead)  # its worker process is gone: nobody renews the lease
+    time.sleep(0.6)
+    assert b.create_or_attach("alive") == (alive, False)
+    job = b.get(dead)
+    assert job["status"] == "failed" and "worker lost" in job["error"]
+    new_id, created = b.create_or_attach("dead")
+    assert created and new_id != dead
+
+
+def test_callback_is_posted_and_must_be_local():
+    received = []
+    got = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+            got.set()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.handle_request, daemon=True).start()
+
+    mgr = jobs.JobManager(jobs.JobStore(), runner=lambda **kw: {"summary": "cb"})
+    mgr.submit({"diff": "+z"}, callback_url=f"http://127.0.0.1:{server.server_address[1]}/hook")
+    assert got.wait(5)
+    server.server_close()
+    assert received and received[0]["result"]["summary"] == "cb"
+
+    with pytest.raises(ValueError):
+        mgr.submit({"diff": "+z"}, callback_url="http://example.com/hook")
+
+
+def test_callbacks_share_one_watcher_and_are_retried(monkeypatch):
+    monkeypatch.setattr(jobs, "CALLBACK_RETRY_DELAY", 0.05)
+    attempts, delivered = [], []
+    lock = threading.Lock()
+    got = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                # the receiver fails the first attempt of each callback
+                retry = body["id"] in attempts
+                attempts.append(body["id"])
+                if retry:
+                    delivered.append(body["result"]["summary"])
+                    if len(delivered) == 5:
+                        got.set()
+            self.send_response(204 if retry else 503)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    release = threading.Event()
+    mgr = jobs.JobManager(jobs.JobStore(), workers=5, runner=lambda **kw: release.wait(5) and {"summary": kw["diff"]})
+    before = threading.active_count()
+    for i in range(5):
+        mgr.submit({"diff": f"+{i}"}, callback_url=f"http://127.0.0.1:{server.server_address[1]}/hook")
+    # five job workers and one watcher, not a thread per callback
+    assert threading.active_count() - before <= 6
+    release.set()
+    assert got.wait(5)
+    server.shutdown()
+    server.server_close()
+    assert sorted(delivered) == [f"+{i}" for i in range(5)] and len(attempts) == 10
+
+
+def test_jobs_api_roundtrip():
+    client = TestClient(app)
+    r = client.post("/jobs/review", json={"diff": "+print('x')"})
+    assert r.status_code == 202
+    job_id = r.json()["id"]
+    body = client.get(f"/jobs/{job_id}", params={"wait": 5}).json()
+    assert body["status"] == "done"
+    assert isinstance(body["result"]["findings"], list)
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.post("/jobs/review", json={"diff": "+x", "callback_url": "http://10.0.0.1/x"}).status_code == 400
@@ -0,0 +1,46 @@
+import json
+import os
+
+from fastapi.testclient import TestClient
+
+from autopr import metrics
+from autopr.main import app
+
+
+def test_histogram_render_is_cumulative():
+    h = metrics.Histogram("autopr_test_latency_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    h.observe(0.05, stage="a")
+    h.observe(0.5, stage="a")
+    text = metrics.render()
+    assert 'autopr_test_latency_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'autopr_test_latency_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 'autopr_test_latency_seconds_bucket{stage="a",le="+Inf"} 2' in text
+    assert 'autopr_test_latency_seconds_count{stage="a"} 2' in text
+
+
+def test_metrics_endpoint_reports_requests_and_stages():
+    client = TestClient(app)
+    client.post("/review", json={"diff": "+print(1)"})
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'autopr_http_requests_total{method="POST",endpoint="/review",status="200"}' in r.text
+    assert 'autopr_stage_duration_seconds_count{stage="static",outcome="ok"}' in r.text
+    assert 'autopr_provider_call_duration_seconds_count{provider="StubProvider",method="review_code"}' in r.text
+    assert "# TYPE autopr_http_requests_in_flight gauge" in r.text
+
+
+def test_multiprocess_mode_sums_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setenv("AUTOPR_METRICS_DIR", str(tmp_path))
+    c = metrics.Counter("autopr_test_mp_total", "test", ("kind",))
+    g = metrics.Gauge("autopr_test_mp_inflight", "test")
+    c.inc(2, kind="x")
+    g.inc(3)
+    # a sibling worker that is still alive (our parent) and one that has exited
+    alive, dead = os.getppid(), 2 ** 22 + 12345
+    for pid in (alive, dead):
+        with open(tmp_path / f"metrics-{pid}.json", "w") as fh:
+            json.dump({"autopr_test_mp_total": {json.dumps(["x"]): 5}, "autopr_test_mp_inflight": {json.dumps([]): 1}}, fh)
+    text = metrics.render()
+    assert 'autopr_test_mp_total{kind="x"} 12' in text
+    assert "autopr_test_mp_inflight 4" in text
@@ -0,0 +1,81 @@
+import json
+import random
+import urllib.error
+import urllib.request
+
+import pytest
+
+from autopr import loadtest, mockserver
+
+
+@pytest.fixture
+def server():
+    srv = mockserver.start(mockserver.MockConfig(seed=1))
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _post(url, body):
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}, method="POST")
+    return urllib.request.urlopen(req, timeout=5)
+
+
+REVIEW_MSG = [{"role": "user", "content": "You are an automated code reviewer. Diff: +x"}]
+
+
+def test_openai_chat_completion_and_stream(server):
+    with _post(server.url + "/v1/chat/completions", {"model": "m", "messages": REVIEW_MSG}) as resp:
+        body = json.loads(resp.read())
+    review = json.loads(body["choices"][0]["message"]["content"])
+    assert set(review) == {"summary", "findings", "confidence"}
+
+    with _post(server.url + "/v1/chat/completions", {"model": "m", "messages": REVIEW_MSG, "stream": True}) as resp:
+        assert resp.headers["Content-Type"] == "text/event-stream"
+        events = [line[6:] for line in resp.read().decode().splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    text = "".join(json.loads(e)["choices"][0]["delta"].get("content", "") for e in events[:-1])
+    assert json.loads(text) == review
+
+
+def test_anthropic_messages_stream(server):
+    body = {"model": "c", "max_tokens": 10, "messages": [{"role": "user", "content": "write a PR description as JSON"}], "stream": True}
+    with _post(server.url + "/v1/messages", body) as resp:
+        lines = resp.read().decode().splitlines()
+    events = [line[7:] for line in lines if line.startswith("event: ")]
+    assert events[0] == "message_start" and events[-1] == "message_stop"
+    text = "".join(json.loads(line[6:])["delta"]["text"] for line in lines if line.startswith("data: ") and "text_delta" in line)
+    assert json.loads(text)["title"]
+
+
+def test_fault_injection():
+    cfg = mockserver.MockConfig(rate_limit_rate=1.0, retry_after=3)
+    srv = mockserver.start(cfg)
+    try:
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            _post(srv.url + "/v1/chat/completions", {"messages": REVIEW_MSG})
+        assert exc.value.code == 429 and exc.value.headers["Retry-After"] == "3"
+        cfg.rate_limit_rate, cfg.malformed_rate = 0.0, 1.0
+        with _post(srv.url + "/v1/chat/completions", {"messages": REVIEW_MSG}) as resp:
+            with pytest.raises(ValueError):
+                json.loads(resp.read())
+        assert cfg.stats == {"requests": 2, "ok": 0, "errors": 0, "rate_limited": 1, "malformed": 1}
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_latency_specs():
+    rng = random.Random(0)
+    assert mockserver.parse_latency("fixed:250")(rng) == 0.25
+    assert 0.1 <= mockserver.parse_latency("uniform:100,200")(rng) <= 0.2
+    assert mockserver.parse_latency("lognormal:300,0.5")(rng) > 0
+    with pytest.raises(ValueError):
+        mockserver.parse_latency("gamma:1")
+
+
+def test_loadtest_reports_percentiles():
+    report = loadtest.run_loadtest(requests=12, concurrency=4, endpoint="/review")
+    assert report["requests"] == 12 and report["ok"] == 12
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"] <= report["latency_ms"]["max"]
+    assert loadtest.percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
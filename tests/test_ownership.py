@@ -0,0 +1,131 @@
+import threading
+import time
+
+from autopr import ownership, reviewer
+from autopr.llm import llm
+from autopr.providers import StubProvider
+
+RULES = """
+# fallback first: later rules win
+*                   platform
+/services/billing/  billing
+services/search     search
+docs/               docs
+*.proto             schemas
+/libs/*/README.md   docs
+/services/billing/vendor/
+/tools/**           tooling
+"""
+
+
+def test_last_matching_rule_wins():
+    m = ownership.OwnershipMap.parse(RULES)
+    assert m.owner("setup.py") == "platform"
+    assert m.owner("services/billing/api/handlers.py") == "billing"
+    assert m.owner("services/search/index.py") == "search"
+    assert m.owner("x/services/search/index.py") == "platform"  # inner slash anchors the pattern
+    assert m.owner("services/billing/docs/guide.md") == "docs"
+    assert m.owner("services/search/api.proto") == "schemas"
+    assert m.owner("services/billing/vendor/lib.py") is None
+    assert m.owner("libs/core/README.md") == "docs"
+    assert m.owner("libs/core/sub/README.md") == "platform"  # '*' matches one segment
+    assert m.owner("tools/a/b/c.sh") == "tooling"
+    assert m.owner("services/billing") == "platform"  # trailing slash: directory contents only
+
+
+def test_partition_groups_unowned():
+    m = ownership.OwnershipMap([("/a/", "alpha")])
+    assert m.partition(["a/x", "b/y", "a/z"]) == {"alpha": ["a/x", "a/z"], ownership.UNOWNED: ["b/y"]}
+
+
+def test_large_table_lookup():
+    rules = [(f"/services/svc{i}/", f"svc{i}") for i in range(20000)] + [("*.md", "docs")]
+    m = ownership.OwnershipMap(rules)
+    assert m.owner("services/svc12345/main.py") == "svc12345"
+    assert m.owner("services/svc12345/README.md") == "docs"
+    assert m.owner("services/svc99999/main.py") is None
+
+
+def test_large_wildcard_table_compiles_and_looks_up_fast():
+    rules = [(f"/services/svc{i}-*/", f"svc{i}") for i in range(20000)] + [("*.md", "docs"), ("/services/*/tmp/", None)]
+    start = time.perf_counter()
+    m = ownership.OwnershipMap(rules)
+    assert time.perf_counter() - start < 2.0
+    start = time.perf_counter()
+    for _ in range(200):
+        assert m.owner("services/svc12345-api/main.py") == "svc12345"
+    assert time.perf_counter() - start < 0.2
+    assert m.owner("services/svc1-a/README.md") == "docs"
+    assert m.owner("services/svc1-a/tmp/x") is None
+    assert m.owner("services/svc1/main.py") is None  # 'svc1-*' needs the dash
+
+
+def test_get_map_reloads_on_change(tmp_path, monkeypatch):
+    path = tmp_path / "OWNERS"
+    path.write_text("/a/ alpha\n")
+    monkeypatch.setenv("AUTOPR_OWNERSHIP_FILE", str(path))
+    first = ownership.get_map()
+    assert first is ownership.get_map() and first.owner("a/x") == "alpha"
+    path.write_text("/a/ beta\n")
+    import os
+    os.utime(path, (1, 1))
+    assert ownership.get_map().owner("a/x") == "beta"
+    monkeypatch.delenv("AUTOPR_OWNERSHIP_FILE")
+    assert ownership.get_map() is None
+
+
+def _section(path, body):
+    return f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n@@ -0,0 +1 @@\n{body}"
+
+
+class Recording(StubProvider):
+    def __init__(self):
+        self.diffs = []
+        self.lock = threading.Lock()
+
+    def review_code(self, diff):
+        with self.lock:
+            self.diffs.append(diff)
+        return {"summary": f"{diff.count('diff --git')} files", "findings": [{"type": "ai", "message": "check", "severity": "low"}], "confidence": 0.5}
+
+
+def test_review_pr_shards_by_component(monkeypatch):
+    monkeypatch.delenv("AUTOPR_LARGE_MODEL", raising=False)
+    monkeypatch.delenv("AUTOPR_SMALL_MODEL", raising=False)
+    provider = Recording()
+    monkeypatch.setattr(llm, "_provider", provider)
+    diff = _section("services/billing/pay.py", "+print('x')\n") + _section("services/search/q.py", "+x = 1\n") + _section("services/billing/refund.py", "+y = 2\n")
+    out = reviewer.review_pr(diff, ownership=ownership.OwnershipMap.parse(RULES))
+
+    assert len(provider.diffs) == 2
+    billing = next(d for d in provider.diffs if "pay.py" in d)
+    assert "refund.py" in billing and "q.py" not in billing
+    sections = {s["component"]: s for s in out["_components"]}
+    assert sections["billing"]["files"] == ["services/billing/pay.py", "services/billing/refund.py"]
+    assert sections["search"]["summary"] == "1 files"
+    assert "[billing] 2 files" in out["summary"] and "[search] 1 files" in out["summary"]
+    assert {f.get("component") for f in out["findings"] if f["type"] == "ai"} == {"billing", "search"}
+    assert out["confidence"] == 0.5
+
+    # one component: plain review, no sections
+    single = reviewer.review_pr(_section("services/search/q.py", "+x = 1\n"), ownership=ownership.OwnershipMap.parse(RULES))
+    assert "_components" not in single
+
+
+def test_shard_budget_and_failures(monkeypatch):
+    monkeypatch.setenv("AUTOPR_SHARD_TOKEN_BUDGET", "40")
+
+    class Flaky(Recording):
+        def review_code(self, diff):
+            if "search" in diff:
+                raise RuntimeError("boom")
+            return super().review_code(diff)
+
+    provider = Flaky()
+    monkeypatch.setattr(llm, "_provider", provider)
+    diff = _section("services/billing/a.py", "+a = 1\n") + _section("services/billing/b.py", "+b = 2\n") + _section("services/search/q.py", "+x = 1\n")
+    out = reviewer.review_pr(diff, ownership=ownership.OwnershipMap.parse(RULES))
+    sections = {s["component"]: s for s in out["_components"]}
+    assert sections["billing"]["truncated_files"] == ["services/billing/b.py"]
+    assert len(provider.diffs[0]) <= 40 * reviewer.CHARS_PER_TOKEN
+    assert "boom" in sections["search"]["error"] and "search: RuntimeError: boom" in out["_errors"]["llm_review"]
@@ -15,3 +15,18 @@ def test_parse_diff_basic():
     assert "src/foo.py" in out["files_changed"]
     assert out["added_lines"] >= 2
     assert "added" in ",".join(out["added_functions"]) or "added" # quick contains check
+
+
+def test_split_diff_per_file():
+    diff = (
+        "diff --git a/x.py b/x.py\nindex 1..2 100644\n--- a/x.py\n+++ b/x.py\n@@ -1 +1 @@\n-a\n+b\n"
+        "diff --git a/img.png b/img.png\nBinary files a/img.png and b/img.png differ\n"
+        "diff --git a/old.py b/old.py\ndeleted file mode 100644\n--- a/old.py\n+++ /dev/null\n@@ -1 +0,0 @@\n-gone\n"
+        "--- y.py\n+++ y.py\n@@ -0,0 +1 @@\n+new\n"
+    )
+    chunks = parser.split_diff(diff)
+    assert list(chunks) == ["x.py", "img.png", "old.py", "y.py"]
+    assert chunks["x.py"].startswith("diff --git a/x.py") and chunks["x.py"].endswith("+b\n")
+    assert chunks["y.py"] == "--- y.py\n+++ y.py\n@@ -0,0 +1 @@\n+new\n"
+    assert "".join(chunks.values()) == diff
+    assert parser.split_diff("+snippet") == {"": "+snippet\n"}
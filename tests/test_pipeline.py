@@ -0,0 +1,62 @@
+import time
+
+import pytest
+
+from autopr import reviewer
+from autopr.pipeline import Pipeline, Stage
+from autopr.providers import StubProvider
+
+
+def test_independent_stages_run_concurrently():
+    def slow(x):
+        time.sleep(0.2)
+        return x
+
+    stages = [Stage(f"s{i}", slow, requires=("x",)) for i in range(4)]
+    stages.append(Stage("total", lambda s0, s1, s2, s3: s0 + s1 + s2 + s3, requires=("s0", "s1", "s2", "s3")))
+    run = Pipeline(stages).run({"x": 1})
+    assert run.results["total"] == 4
+    assert run.elapsed < 0.6
+
+
+def test_failures_and_timeouts_are_isolated():
+    def boom(x):
+        raise ValueError("bad")
+
+    stages = [
+        Stage("ok", lambda x: x * 2, requires=("x",)),
+        Stage("boom", boom, requires=("x",)),
+        Stage("after_boom", lambda boom: boom, requires=("boom",)),
+        Stage("slow", lambda x: time.sleep(1), requires=("x",), timeout=0.05),
+    ]
+    start = time.perf_counter()
+    run = Pipeline(stages).run({"x": 2})
+    assert time.perf_counter() - start < 0.5
+    assert run.results == {"ok": 4}
+    assert "ValueError" in run.errors["boom"]
+    assert run.errors["after_boom"].startswith("skipped")
+    assert run.errors["slow"].startswith("timeout")
+
+
+def test_unknown_inputs_and_cycles_are_rejected():
+    with pytest.raises(ValueError):
+        Pipeline([Stage("a", lambda missing: missing, requires=("missing",))]).run({})
+    with pytest.raises(ValueError):
+        Pipeline([Stage("a", lambda b: b, requires=("b",)), Stage("b", lambda a: a, requires=("a",))]).run({})
+
+
+def test_review_degrades_when_llm_stage_fails(monkeypatch):
+    class Failing(StubProvider):
+        def review_code(self, diff):
+            raise RuntimeError("provider down")
+
+    monkeypatch.setattr(reviewer.llm, "_provider", Failing())
+    out = reviewer.review_pr("+def foo():\n+    print('x')")
+    assert "provider down" in out["_errors"]["llm_review"]
+    assert "debug_print" in {f["type"] for f in out["findings"]}
+
+
+def test_review_and_generate_shares_parsed_context():
+    res = reviewer.review_and_generate("+++ b/a.py\n+def add(a, b):\n+    return a + b\n", commits=["feat: add"])
+    assert res["pr"]["_context"]["files_changed"] == ["a.py"]
+    assert isinstance(res["review"]["findings"], list)
@@ -0,0 +1,42 @@
+import os
+import pstats
+
+from autopr import reviewer
+from autopr.pipeline import Pipeline, Stage
+from autopr.profiling import Profiler
+
+
+def test_profiler_records_stage_measurements(tmp_path):
+    stages = [
+        Stage("alloc", lambda n: len([0] * n), requires=("n",)),
+        Stage("double", lambda alloc: alloc * 2, requires=("alloc",)),
+    ]
+    with Profiler(dump_dir=str(tmp_path)) as prof:
+        run = Pipeline(stages).run({"n": 200000}, profiler=prof)
+    report = prof.report()
+    assert run.results["double"] == 400000
+    assert set(report["stages"]) == {"alloc", "double"}
+    assert report["stages"]["alloc"]["peak_kb"] > 1000
+    assert report["stages"]["alloc"]["wall_ms"] >= 0
+    assert os.path.exists(report["pstats"])
+    pstats.Stats(report["pstats"])
+
+
+def test_review_perf_block_is_opt_in(monkeypatch):
+    monkeypatch.delenv("AUTOPR_PROFILE", raising=False)
+    assert "_perf" not in reviewer.review_pr("+print(1)")
+
+    monkeypatch.setenv("AUTOPR_PROFILE", "1")
+    perf = reviewer.review_pr("+print(1)")["_perf"]
+    assert {"parsed", "static", "lint", "llm_review"} <= set(perf["stages"])
+    assert "pstats" not in perf
+
+
+def test_static_stage_reports_worker_usage(monkeypatch):
+    monkeypatch.setenv("AUTOPR_ANALYSIS_WORKERS", "2")
+    diff = "".join(f"diff --git a/m{i}.py b/m{i}.py\n--- a/m{i}.py\n+++ b/m{i}.py\n@@ -0,0 +1,400 @@\n" + "".join(f"+def f{n}(x):\n+    return [x * k for k in range({n})]\n" for n in range(200)) for i in range(2))
+    run = reviewer.run_review_pipeline(diff, include_llm=False, profile=True)
+    static = run.perf["stages"]["static"]
+    assert static["worker_cpu_ms"] > 0 and static["worker_peak_rss_kb"] > 1000
+    # stages that run in-process have no worker figures
+    assert "worker_cpu_ms" not in run.perf["stages"]["lint"]
@@ -0,0 +1,181 @@
+import time
+
+import pytest
+
+from autopr import generator, providers, resilience, reviewer
+from autopr.providers import BaseProvider
+from autopr.resilience import CircuitBreaker, ProviderUnavailable, ResilientProvider, TokenBucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.retry_after = retry_after
+
+
+class FakeProvider(BaseProvider):
+    """Fails with the queued exceptions, then answers."""
+
+    def __init__(self, failures=(), delay=0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = 0
+
+    def review_code(self, diff):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.failures:
+            raise self.failures.pop(0)
+        return {"summary": "ok", "findings": [], "confidence": 0.9}
+
+
+def test_retries_with_retry_after_then_succeeds():
+    sleeps = []
+    fake = FakeProvider([RateLimited(retry_after=2), RateLimited()])
+    p = ResilientProvider(fake, max_retries=3, base_delay=0.1, sleep=sleeps.append)
+    assert p.review_code("+x")["summary"] == "ok"
+    assert fake.calls == 3
+    assert sleeps[0] == 2.0
+    assert 0 <= sleeps[1] <= 0.2
+
+
+def test_non_retryable_error_fails_immediately():
+    fake = FakeProvider([ValueError("bad request")])
+    p = ResilientProvider(fake, sleep=lambda s: None)
+    with pytest.raises(ProviderUnavailable) as exc:
+        p.review_code("+x")
+    assert fake.calls == 1
+    assert isinstance(exc.value.__cause__, ValueError)
+
+
+def test_deadline_bounds_a_stalled_call():
+    p = ResilientProvider(FakeProvider(delay=1.0), deadline=0.05)
+    start = time.monotonic()
+    with pytest.raises(ProviderUnavailable, match="deadline"):
+        p.review_code("+x")
+    assert time.monotonic() - start < 0.5
+
+
+def test_circuit_opens_and_recovers_after_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    fake = FakeProvider([ConnectionError("down")] * 2)
+    p = ResilientProvider(fake, max_retries=0, breaker=breaker, sleep=lambda s: None)
+    for _ in range(2):
+        with pytest.raises(ProviderUnavailable):
+            p.review_code("+x")
+    assert breaker.state == "open"
+    with pytest.raises(ProviderUnavailable, match="circuit open"):
+        p.review_code("+x")
+    assert fake.calls == 2
+    now[0] = 11.0
+    assert p.review_code("+x")["summary"] == "ok"
+    assert breaker.state == "closed"
+
+
+def test_rejected_requests_do_not_open_the_circuit():
+    class BadRequest(Exception):
+        status_code = 400
+
+    breaker = CircuitBreaker(failure_threshold=2)
+    p = ResilientProvider(FakeProvider([BadRequest("too long")] * 3), breaker=breaker, sleep=lambda s: None)
+    for _ in range(3):
+        with pytest.raises(ProviderUnavailable):
+            p.review_code("+x")
+    assert breaker.state == "closed"
+
+
+def test_remaining_deadline_is_passed_to_the_sdk_request():
+    seen = []
+
+    class Recording(BaseProvider):
+        def review_code(self, diff):
+            seen.append(providers._timeout_kwargs())
+            return {"summary": "ok", "findings": []}
+
+    ResilientProvider(Recording(), deadline=5.0).review_code("+x")
+    assert 4.0 < seen[0]["timeout"] <= 5.0
+    # outside the resilience layer no timeout is forced on the SDK
+    assert providers._timeout_kwargs() == {}
+
+
+class Streaming(BaseProvider):
+    def __init__(self, stall_after=None):
+        self.stall_after = stall_after
+
+    def stream_review_code(self, diff):
+        for i in range(3):
+            if i == self.stall_after:
+                time.sleep(1.0)
+            yield f"chunk{i}"
+
+
+def test_stalled_stream_hits_first_chunk_and_idle_deadlines():
+    p = ResilientProvider(Streaming(stall_after=0), first_chunk_timeout=0.05)
+    start = time.monotonic()
+    with pytest.raises(ProviderUnavailable, match="no first chunk"):
+        list(p.stream_review_code("+x"))
+    assert time.monotonic() - start < 0.5
+    p = ResilientProvider(Streaming(stall_after=2), idle_timeout=0.05)
+    chunks = []
+    with pytest.raises(ProviderUnavailable, match="no chunk within"):
+        for chunk in p.stream_review_code("+x"):
+            chunks.append(chunk)
+    assert chunks == ["chunk0", "chunk1"]
+    assert list(ResilientProvider(Streaming()).stream_review_code("+x")) == ["chunk0", "chunk1", "chunk2"]
+
+
+def test_closing_a_stream_mid_probe_releases_the_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 11.0
+    stream = ResilientProvider(Streaming(), breaker=breaker).stream_review_code("+x")
+    assert next(stream) == "chunk0"
+    assert not breaker.allow()
+    stream.close()
+    assert breaker.allow()
+
+
+def test_token_bucket_waits_and_respects_deadline():
+    bucket = TokenBucket(rate=100.0, capacity=1.0)
+    assert bucket.acquire()
+    start = time.monotonic()
+    assert bucket.acquire()
+    assert time.monotonic() - start >= 0.005
+    slow = TokenBucket(rate=0.1, capacity=1.0)
+    slow.acquire()
+    assert not slow.acquire(deadline=time.monotonic() + 0.01)
+
+
+def test_review_degrades_when_provider_unavailable(monkeypatch):
+    broken = ResilientProvider(FakeProvider([ValueError("boom")]), sleep=lambda s: None)
+    monkeypatch.setattr(reviewer.llm, "_provider", broken)
+    out = reviewer.review_pr("+print(1)\n")
+    assert out["summary"].startswith("LLM review unavailable")
+    assert "llm_review" in out["_errors"]
+    assert [f["type"] for f in out["findings"]] == ["debug_print"]
+
+
+def test_generator_falls_back_to_context_description(monkeypatch):
+    class Down(BaseProvider):
+        def generate_pr_description(self, diff, commits, issue):
+            raise ProviderUnavailable("circuit open")
+
+    monkeypatch.setattr(generator.llm, "_provider", Down())
+    out = generator.generate_pr_from("+++ b/app.py\n+x = 1\n", ["fix: handle empty input"])
+    assert out["title"] == "fix: handle empty input"
+    assert out["files_impacted"] == ["app.py"]
+    assert out["_errors"]["provider"] == "circuit open"
+
+
+def test_from_env_can_disable_wrapping(monkeypatch):
+    fake = FakeProvider()
+    monkeypatch.setenv("AUTOPR_LLM_RESILIENCE", "0")
+    assert resilience.from_env(fake) is fake
+    monkeypatch.setenv("AUTOPR_LLM_RESILIENCE", "1")
+    wrapped = resilience.from_env(fake)
+    assert isinstance(wrapped, ResilientProvider) and wrapped.label == "FakeProvider"
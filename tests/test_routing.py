@@ -0,0 +1,88 @@
+import json
+
+from autopr import generator, llm as llm_mod, reviewer, routing
+from autopr.parser import parse_diff
+from autopr.pipeline import Pipeline, Stage
+
+SMALL = "+++ b/README.md\n-teh docs\n+the docs\n"
+LARGE = "+++ b/app.py\n" + "".join(f"+def f{i}(x):\n+    return x\n" for i in range(30))
+
+
+def test_small_and_large_diffs_get_different_routes():
+    small = routing.choose_route(parse_diff(SMALL))
+    assert small["route"] == "small" and small["rule"] == 0
+    large = routing.choose_route(parse_diff(LARGE))
+    assert large["route"] == "large" and large["rule"] is None
+    assert large["features"]["functions"] == 30
+
+
+def test_static_findings_push_to_large_route():
+    parsed = {"files_changed": ["a.py"], "added_lines": 3, "removed_lines": 0}
+    assert routing.choose_route(parsed, [{}] * 10)["route"] == "large"
+
+
+def test_rules_from_env_json_and_file(monkeypatch, tmp_path):
+    rules = [{"route": "tiny", "max": {"changed_lines": 2}}, {"route": "medium", "min": {"files": 1}}]
+    monkeypatch.setenv("AUTOPR_ROUTING_RULES", json.dumps(rules))
+    assert routing.choose_route({"added_lines": 1, "removed_lines": 1})["route"] == "tiny"
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules))
+    monkeypatch.setenv("AUTOPR_ROUTING_RULES", str(path))
+    assert routing.choose_route({"added_lines": 10, "files_changed": ["a"]})["route"] == "medium"
+
+
+def test_provider_for_uses_route_model(monkeypatch):
+    default = object()
+    monkeypatch.delenv("AUTOPR_SMALL_MODEL", raising=False)
+    assert llm_mod.provider_for("small", default) is default
+    monkeypatch.setenv("AUTOPR_SMALL_MODEL", "stub:fast")
+    monkeypatch.setattr(llm_mod, "_routes", {})
+    routed = llm_mod.provider_for("small", default)
+    assert routed is not default and routed is llm_mod.provider_for("small")
+    assert routing.choose_route({"added_lines": 1})["model"] == "stub:fast"
+
+
+def test_bare_route_model_applies_to_the_primary_backend_only(monkeypatch):
+    built = []
+    monkeypatch.setattr(llm_mod, "build_provider", lambda name, model=None: built.append((name, model)))
+    monkeypatch.setenv("AUTOPR_PROVIDERS", "openai,anthropic:claude-3-5-sonnet")
+    llm_mod._choose_provider("gpt-4o-mini")
+    assert built == [("openai", "gpt-4o-mini"), ("anthropic", "claude-3-5-sonnet")]
+
+
+def test_route_recorded_in_review_and_description():
+    review = reviewer.review_pr(SMALL)
+    assert review["_route"]["route"] == "small"
+    desc = generator.generate_pr_from(LARGE, ["feat: add helpers"])
+    assert desc["_route"]["route"] == "large"
+
+
+def test_optional_inputs_survive_failed_stages():
+    def boom():
+        raise RuntimeError("x")
+
+    run = Pipeline([Stage("a", boom), Stage("b", lambda a: a is None, optional=("a",))]).run({})
+    assert run.results["b"] is True and "a" in run.errors
+
+
+def test_llm_review_does_not_wait_for_static_analysis(monkeypatch):
+    import threading
+
+    from autopr import workers
+
+    reviewed = threading.Event()
+    seen = []
+
+    def slow_static(diff, language="python"):
+        seen.append(reviewed.wait(5))
+        return []
+
+    class Recording(llm_mod.StubProvider):
+        def review_code(self, diff):
+            reviewed.set()
+            return super().review_code(diff)
+
+    monkeypatch.setattr(workers, "analyze_diff", slow_static)
+    monkeypatch.setattr(reviewer.llm, "_provider", Recording())
+    reviewer.review_pr(LARGE)
+    assert seen == [True]
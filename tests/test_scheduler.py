@@ -0,0 +1,181 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from autopr import main, scheduler
+from autopr.main import app
+
+
+def test_estimate_cost_grows_with_diff_size():
+    small = "+++ b/a.py\n+x = 1\n"
+    large = "+++ b/a.py\n" + "+x = 1\n" * 500
+    assert scheduler.estimate_cost(small) < scheduler.estimate_cost(large)
+
+
+def test_queued_work_runs_shortest_first():
+    async def scenario():
+        ctl = scheduler.AdmissionController(max_concurrency=1, queue_target=5.0, ageing=60.0)
+        order = []
+        await ctl.acquire(1)
+
+        async def job(cost):
+            async with ctl.slot(cost):
+                order.append(cost)
+
+        tasks = [asyncio.create_task(job(c)) for c in (500, 10, 100)]
+        await asyncio.sleep(0.01)
+        assert ctl.stats()["queued"] == 3
+        ctl.release()
+        await asyncio.gather(*tasks)
+        return order, ctl.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == [10, 100, 500]
+    assert stats["in_flight"] == 0
+
+
+def test_sheds_when_queue_latency_exceeds_target():
+    async def scenario():
+        ctl = scheduler.AdmissionController(max_concurrency=1, queue_target=0.05)
+        await ctl.acquire(1)
+        waiter = asyncio.create_task(ctl.acquire(1))
+        await asyncio.sleep(0.08)
+        with pytest.raises(scheduler.Overloaded) as exc:
+            await ctl.acquire(1)
+        assert exc.value.reason == "queue_latency"
+        assert exc.value.retry_after >= 1
+        ctl.release()
+        await waiter
+        ctl.release()
+        return ctl.stats()
+
+    assert asyncio.run(scenario())["in_flight"] == 0
+
+
+def test_sheds_when_queue_full():
+    async def scenario():
+        ctl = scheduler.AdmissionController(max_concurrency=1, max_queue=1)
+        await ctl.acquire(1)
+        waiter = asyncio.create_task(ctl.acquire(1))
+        await asyncio.sleep(0)
+        with pytest.raises(scheduler.Overloaded):
+            await ctl.acquire(1)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return ctl.stats()
+
+    assert asyncio.run(scenario()) == {"in_flight": 1, "queued": 0, "max_concurrency": 1}
+
+
+def test_provider_slot_caps_concurrency(monkeypatch):
+    monkeypatch.setenv("AUTOPR_PROVIDER_CONCURRENCY", "2")
+    monkeypatch.setattr(scheduler, "_provider_limits", {})
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def call():
+        with scheduler.provider_slot("TestProvider"):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+
+
+def test_streamed_call_holds_its_backend_slot_until_closed(monkeypatch):
+    from autopr import llm, metrics
+    from autopr.providers import StubProvider
+
+    monkeypatch.setenv("AUTOPR_PROVIDER_CONCURRENCY", "1")
+    monkeypatch.setattr(scheduler, "_provider_limits", {})
+    provider = llm.InstrumentedProvider(StubProvider())
+    stream = provider.stream_review_code("+x = 1\n")
+    next(stream)
+    # the stream is still open: its slot is taken
+    assert not scheduler._provider_limits["StubProvider"].acquire(blocking=False)
+    stream.close()
+    assert scheduler._provider_limits["StubProvider"].acquire(blocking=False)
+    scheduler._provider_limits["StubProvider"].release()
+    assert 'autopr_provider_call_duration_seconds_count{provider="StubProvider",method="stream_review_code"}' in metrics.render()
+
+
+def test_api_returns_429_with_retry_after(monkeypatch):
+    async def overloaded(cost):
+        raise scheduler.Overloaded("queue_latency", 7)
+
+    monkeypatch.setattr(main.admission, "acquire", overloaded)
+    r = TestClient(app).post("/review", json={"diff": "+print(1)"})
+    assert r.status_code == 429
+    assert r.headers["retry-after"] == "7"
+
+
+def test_api_rejects_oversized_body(monkeypatch):
+    monkeypatch.setattr(main, "MAX_BODY_BYTES", 100)
+    client = TestClient(app)
+    r = client.post("/review", json={"diff": "+x\n" * 100})
+    assert r.status_code == 413
+    assert client.post("/review", json={"diff": "+x"}).status_code == 200
+
+
+def test_api_rejects_oversized_chunked_body(monkeypatch):
+    monkeypatch.setattr(main, "MAX_BODY_BYTES", 100)
+    client = TestClient(app)
+
+    def chunks(text):
+        # a generator body is sent with chunked transfer encoding and no Content-Length
+        for i in range(0, len(text), 16):
+            yield text[i:i + 16].encode()
+
+    r = client.post("/review", content=chunks(json.dumps({"diff": "+x\n" * 100})), headers={"content-type": "application/json"})
+    assert r.status_code == 413 and "exceeds 100 bytes" in r.json()["detail"]
+    r = client.post("/review", content=chunks(json.dumps({"diff": "+x"})), headers={"content-type": "application/json"})
+    assert r.status_code == 200
+
+
+def test_estimate_cost_counts_lines_without_parsing():
+    assert scheduler.estimate_cost("--- a/a.py\n+++ b/a.py\n-x\n+y\n+z\n") == 3 + 50 + 1
+    huge = "--- a/a.py\n+++ b/a.py\n" + "+x = 1\n" * 1_000_000
+    start = time.monotonic()
+    assert scheduler.estimate_cost(huge) == 1_000_000 + 51
+    assert time.monotonic() - start < 0.1
+
+
+def test_stream_slot_is_released_when_the_client_leaves_before_it_starts(monkeypatch):
+    async def scenario():
+        ctl = scheduler.AdmissionController(max_concurrency=1)
+        monkeypatch.setattr(main, "admission", ctl)
+        response = await main._admitted_stream(iter(["event: x\n\n"]), 1, media_type="text/event-stream")
+        assert ctl.stats()["in_flight"] == 1
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            raise OSError("client went away")
+
+        with pytest.raises(Exception):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        return ctl.stats()
+
+    assert asyncio.run(scenario())["in_flight"] == 0
+
+
+def test_batch_items_go_through_admission(monkeypatch):
+    async def overloaded(cost):
+        raise scheduler.Overloaded("queue_latency", 7)
+
+    monkeypatch.setattr(main.admission, "acquire", overloaded)
+    r = TestClient(app).post("/review/batch", json={"items": [{"id": "a", "diff": "+print(1)"}]})
+    assert r.json() == {"id": "a", "error": "server overloaded (queue_latency), retry later"}
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+# Generous enough for slow CI runners; the point is to catch eager imports of the
+# review stack or an LLM SDK, which cost far more than this.
+STARTUP_BUDGET_US = int(os.getenv("AUTOPR_STARTUP_BUDGET_US", "300000"))
+HEAVY_MODULES = {"openai", "anthropic", "fastapi", "autopr.providers", "autopr.reviewer", "autopr.llm"}
+
+
+def _importtime(*args):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "from autopr.cli import cli; cli()", *args],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "AUTOPR_PROVIDER": "openai"},
+    )
+    assert proc.returncode == 0, proc.stderr
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_ci_parse_help_does_not_import_llm_stack():
+    modules = _importtime("ci-parse", "--help")
+    assert "autopr.cli" in modules
+    assert not HEAVY_MODULES & set(modules), sorted(HEAVY_MODULES & set(modules))
+    assert modules["autopr.cli"] < STARTUP_BUDGET_US
+
+
+def test_coverage_compare_help_does_not_import_llm_stack():
+    modules = _importtime("coverage-compare", "--help")
+    assert not HEAVY_MODULES & set(modules)
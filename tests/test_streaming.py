@@ -0,0 +1,98 @@
+import json
+import threading
+
+from fastapi.testclient import TestClient
+
+from autopr import lint, streaming, symbol_index, workers
+from autopr.main import app
+
+
+def _events(text):
+    out = []
+    for block in text.strip().split("\n\n"):
+        lines = block.splitlines()
+        event = lines[0][len("event: "):]
+        data = json.loads(lines[1][len("data: "):])
+        out.append((event, data))
+    return out
+
+
+def test_member_stream_reports_findings_as_they_complete():
+    doc = json.dumps({"summary": "ok", "findings": [{"type": "a", "message": "x"}, {"type": "b", "message": "y, }"}], "confidence": 0.5})
+    stream = streaming.JSONMemberStream(array_keys=("findings",))
+    seen = []
+    for i in range(0, len(doc), 7):
+        seen.extend(stream.feed(doc[i:i + 7]))
+    assert seen == [
+        ("summary", "ok"),
+        ("findings", {"type": "a", "message": "x"}),
+        ("findings", {"type": "b", "message": "y, }"}),
+        ("confidence", 0.5),
+    ]
+    assert stream.done
+
+
+def test_member_stream_ignores_markdown_fence():
+    stream = streaming.JSONMemberStream(array_keys=())
+    events = stream.feed('```json\n{"title": "Fix \\"x\\"", "files_impacted": ["a.py"]}\n```')
+    assert events == [("title", 'Fix "x"'), ("files_impacted", ["a.py"])]
+
+
+def test_review_stream_emits_deterministic_first():
+    client = TestClient(app)
+    payload = {"diff": "+def foo():\n+    print('debug') \n+    # TODO: remove later"}
+    r = client.post("/review/stream", json=payload)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r.text)
+    assert events[0][0] == "deterministic"
+    assert {f["type"] for f in events[0][1]["findings"]} == {"trailing_whitespace"}
+    # static analysis runs on the worker pool and arrives in a later event
+    later = [data for name, data in events[1:] if name == "deterministic"]
+    assert len(later) == 1 and "debug_print" in {f["type"] for f in later[0]["findings"]}
+    assert events[-1][0] == "result"
+    assert {"trailing_whitespace", "debug_print"} <= {f["type"] for f in events[-1][1]["findings"]}
+    assert events[-1][1]["_validation"]["valid"]
+    assert any(name == "finding" for name, _ in events)
+
+
+def test_generate_stream_result_matches_generate():
+    client = TestClient(app)
+    payload = {"diff": "+ added line", "commits": ["feat: add foo"], "issue": "#123"}
+    events = _events(client.post("/generate/stream", json=payload).text)
+    assert events[0][0] == "context"
+    result = events[-1][1]
+    plain = client.post("/generate", json=payload).json()
+    assert {k: result[k] for k in plain} == plain
+
+
+def test_review_stream_does_not_wait_for_impact(monkeypatch):
+    release, finished = threading.Event(), threading.Event()
+
+    def slow_impact(diff, root=None):
+        release.wait(2)
+        finished.set()
+        return None
+
+    monkeypatch.setattr(symbol_index, "review_impact", slow_impact)
+    stream = streaming.stream_review("+x = 1 \n")
+    try:
+        first = next(stream)
+        assert first.startswith("event: deterministic") and '"trailing_whitespace"' in first
+        assert not finished.is_set()
+    finally:
+        release.set()
+    assert list(stream)[-1].startswith("event: result")
+
+
+def test_streamed_review_applies_the_baseline(tmp_path):
+    from autopr import baseline
+
+    diff = "+x = 1 \n+print('debug')\n"
+    path = str(tmp_path / "baseline.bin")
+    stages = {"static": workers.analyze_diff(diff, language="python"), "lint": lint.run_basic_lint(diff), "secrets": []}
+    baseline.write_set(path, [fp for fps in baseline.finding_fingerprints(diff, stages).values() for fp in fps])
+    events = [_events(e)[0] for e in streaming.stream_review(diff, baseline=path)]
+    result = events[-1][1]
+    assert not {"trailing_whitespace", "debug_print"} & {f["type"] for f in result["findings"]}
+    assert result["_baseline"]["suppressed"] == 2
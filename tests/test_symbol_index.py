@@ -0,0 +1,108 @@
+import json
+import os
+
+from click.testing import CliRunner
+
+from autopr import reviewer, symbol_index
+from autopr.cli import cli
+
+LIB = "def charge(amount, currency):\n    return amount\n\n\nclass Ledger:\n    def post(self, entry):\n        return charge(entry, 'EUR')\n"
+APP = "from pkg.billing import charge, Ledger\nfrom .billing import refund\n\n\ndef run():\n    charge(1, 'USD')\n    Ledger().post(2)\n    return refund(3)\n"
+
+
+def _repo(tmp_path):
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "src" / "pkg" / "billing.py").write_text(LIB)
+    (tmp_path / "src" / "pkg" / "app.py").write_text(APP)
+    return tmp_path
+
+
+def test_extract_rows():
+    rows = symbol_index.extract("src/pkg/app.py", APP)
+    assert ("pkg.billing", "charge", None, 1) in rows["imports"]
+    assert ("pkg.billing", "refund", None, 2) in rows["imports"]  # relative import resolved
+    assert ("run", "run", "function", 5, "") in rows["defs"]
+    assert ("post", "Ledger()", 7) in rows["refs"] and ("Ledger", None, 7) in rows["refs"]
+    assert ("join", "os.path", 1) in symbol_index.extract("m.py", "os.path.join(a, b)\n")["refs"]
+    lib = symbol_index.extract("src/pkg/billing.py", LIB)
+    assert ("post", "Ledger.post", "method", 6, "self, entry") in lib["defs"]
+
+
+def test_update_is_incremental(tmp_path):
+    repo = _repo(tmp_path)
+    idx = symbol_index.SymbolIndex(str(repo))
+    assert idx.update() == {"indexed": 3, "removed": 0, "unchanged": 0, "files": 3}
+    assert idx.update()["unchanged"] == 3
+    assert [(d["path"], d["line"]) for d in idx.definitions("charge")] == [("src/pkg/billing.py", 1)]
+
+    # touched but identical content is not re-parsed; a real change is
+    os.utime(repo / "src" / "pkg" / "app.py", (1, 1))
+    (repo / "src" / "pkg" / "billing.py").write_text(LIB.replace("amount, currency", "amount, currency, rate"))
+    assert idx.update() == {"indexed": 1, "removed": 0, "unchanged": 2, "files": 3}
+    assert idx.definitions("charge")[0]["params"] == "amount, currency, rate"
+    (repo / "src" / "pkg" / "app.py").unlink()
+    assert idx.update()["removed"] == 1
+    assert idx.importers("charge") == []
+    # state is on disk: a fresh instance sees it
+    assert symbol_index.SymbolIndex(str(repo)).update()["unchanged"] == 2
+
+
+def test_parallel_build_matches_serial(tmp_path, monkeypatch):
+    monkeypatch.setattr(symbol_index, "PARALLEL_MIN_FILES", 2)
+    repo = _repo(tmp_path)
+    idx = symbol_index.SymbolIndex(str(repo))
+    assert idx.update(jobs=2)["indexed"] == 3
+    assert [s["path"] for s in idx.call_sites("charge")] == ["src/pkg/app.py", "src/pkg/billing.py"]
+
+
+def test_review_reports_impact(tmp_path):
+    repo = _repo(tmp_path)
+    # the PR head: charge() gained a parameter and Ledger was removed
+    (repo / "src" / "pkg" / "billing.py").write_text("def charge(amount, currency, rate):\n    return amount\n")
+    diff = (
+        "diff --git a/src/pkg/billing.py b/src/pkg/billing.py\n--- a/src/pkg/billing.py\n+++ b/src/pkg/billing.py\n"
+        "@@ -1,7 +1,2 @@\n-def charge(amount, currency):\n+def charge(amount, currency, rate):\n     return amount\n"
+        "-\n-\n-class Ledger:\n-    def post(self, entry):\n-        return charge(entry, 'EUR')\n"
+    )
+    out = reviewer.review_pr(diff, repo=str(repo))
+    changed = {c["name"]: c for c in out["_impact"]["changed"]}
+    assert changed["charge"]["change"] == "signature"
+    assert {"path": "src/pkg/app.py", "line": 6} in changed["charge"]["call_sites"]
+    assert changed["Ledger"]["change"] == "removed" and changed["Ledger"]["importers"] == [{"path": "src/pkg/app.py", "line": 1}]
+    impact = [f for f in out["findings"] if f["type"] == "impact"]
+    assert any(f["severity"] == "high" and "`Ledger` was removed" in f["message"] for f in impact)
+    assert any("Signature of `charge`" in f["message"] and "src/pkg/app.py:6" in f["message"] for f in impact)
+
+
+def test_call_sites_of_a_common_name_are_resolved(tmp_path):
+    repo = _repo(tmp_path)
+    pkg = repo / "src" / "pkg"
+    (pkg / "store.py").write_text("def get(key):\n    return key\n\n\nclass Cache:\n    def update(self, key):\n        return get(key)\n\n    def refresh(self):\n        self.update(1)\n")
+    (pkg / "views.py").write_text(
+        "from pkg.store import get as fetch, Cache\nimport pkg.store\nfrom pkg import store as st\n\n\n"
+        "def show(d):\n    d.get('a')\n    d.update({})\n    fetch('b')\n    pkg.store.get('c')\n    st.get('d')\n    Cache().update(2)\n"
+    )
+    (pkg / "other.py").write_text("def get(x):\n    return x\n\n\ndef use(cfg):\n    get(1)\n    cfg.get('e')\n")
+    idx = symbol_index.SymbolIndex(str(repo))
+    idx.update()
+    # dict.get / dict.update calls and another module's get are not call sites of pkg.store.get / Cache.update
+    assert [(s["path"], s["line"]) for s in idx.call_sites("get", "src/pkg/store.py")] == [
+        ("src/pkg/store.py", 7), ("src/pkg/views.py", 9), ("src/pkg/views.py", 10), ("src/pkg/views.py", 11),
+    ]
+    assert [(s["path"], s["line"]) for s in idx.call_sites("update", "src/pkg/store.py", "Cache")] == [("src/pkg/store.py", 10), ("src/pkg/views.py", 12)]
+    # without a defining file, every call of the name is listed
+    assert len(idx.call_sites("get")) == 6
+
+
+def test_no_repo_no_impact(monkeypatch):
+    monkeypatch.delenv("AUTOPR_INDEX_ROOT", raising=False)
+    assert "_impact" not in reviewer.review_pr("+def f():\n+    pass\n")
+
+
+def test_cli_index_query(tmp_path):
+    repo = _repo(tmp_path)
+    result = CliRunner().invoke(cli, ["index", "--repo", str(repo), "--query", "charge"])
+    assert result.exit_code == 0, result.output
+    out = json.loads(result.output)
+    assert out["update"]["indexed"] == 3 and out["importers"][0]["path"] == "src/pkg/app.py"
@@ -0,0 +1,166 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+from autopr import cancellation, comment, github, incremental, webhooks
+from autopr.main import app
+
+DIFF = "diff --git a/app.py b/app.py\n--- a/app.py\n+++ b/app.py\n@@ -0,0 +1,2 @@\n+def add(a, b):\n+    return a + b\n"
+
+
+def _event(sha, number=7):
+    return {"action": "synchronize", "repo": "octo/demo", "number": number, "head_sha": sha, "draft": False}
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def test_verify_signature():
+    body = b'{"a": 1}'
+    sig = "sha256=" + hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert webhooks.verify_signature("s3cret", body, sig)
+    assert not webhooks.verify_signature("s3cret", body + b" ", sig)
+    assert not webhooks.verify_signature("s3cret", body, None)
+    assert not webhooks.verify_signature("", body, sig)
+
+
+def test_rapid_pushes_are_coalesced_into_one_review():
+    reviewed = []
+    queue = webhooks.PullRequestQueue(handler=lambda e: reviewed.append(e["head_sha"]), debounce=0.2)
+    try:
+        for sha in ("a1", "b2", "c3", "d4", "e5"):
+            queue.submit(_event(sha))
+        queue.submit(_event("z9", number=8))
+        _wait(lambda: queue.stats["completed"] == 2)
+        assert sorted(reviewed) == ["e5", "z9"]
+        assert queue.stats["coalesced"] == 4
+    finally:
+        queue.shutdown()
+
+
+def test_new_push_cancels_in_flight_review():
+    started = threading.Event()
+    finished = []
+
+    def handler(event):
+        if event["head_sha"] == "old":
+            started.set()
+            # stands in for a long provider call; wakes up when the token fires
+            cancellation.sleep(5)
+        finished.append(event["head_sha"])
+
+    queue = webhooks.PullRequestQueue(handler=handler, debounce=0.01)
+    try:
+        queue.submit(_event("old"))
+        assert started.wait(2)
+        assert queue.submit(_event("old"))["status"] == "duplicate"
+        queue.submit(_event("new"))
+        _wait(lambda: queue.stats["completed"] == 1 and queue.stats["cancelled"] == 1)
+        assert finished == ["new"]
+    finally:
+        queue.shutdown()
+
+
+class FakeGitHub(BaseHTTPRequestHandler):
+    comments = []
+    auth = []
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.auth.append(self.headers.get("Authorization"))
+        if self.path == "/repos/octo/demo/pulls/7":
+            assert self.headers["Accept"] == "application/vnd.github.v3.diff"
+            self._send(200, DIFF, "text/x-diff")
+        elif self.path.startswith("/repos/octo/demo/pulls/7/commits"):
+            self._send(200, [{"commit": {"message": "feat: add helper\n\nlong body"}}])
+        else:
+            self._send(404, {"message": "Not Found"})
+
+    def do_POST(self):
+        if self.path == "/repos/octo/demo/issues/7/comments":
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            self.comments.append(body["body"])
+            self._send(201, {"id": len(self.comments), "body": body["body"]})
+        else:
+            self._send(404, {"message": "Not Found"})
+
+
+@pytest.fixture
+def fake_github(monkeypatch):
+    FakeGitHub.comments, FakeGitHub.auth = [], []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHub)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setenv("GITHUB_API_URL", f"http://127.0.0.1:{srv.server_address[1]}")
+    monkeypatch.setenv("GITHUB_TOKEN", "ghs_test")
+    monkeypatch.setenv("GITHUB_WEBHOOK_SECRET", "s3cret")
+    monkeypatch.setenv("AUTOPR_PROVIDER", "stub")
+    queue = webhooks.PullRequestQueue(debounce=0.05)
+    monkeypatch.setattr(webhooks, "_queue", queue)
+    monkeypatch.setattr(incremental, "_store", incremental.StateStore())
+    yield FakeGitHub
+    queue.shutdown()
+    srv.shutdown()
+    srv.server_close()
+
+
+def _deliver(client, payload, event="pull_request", secret="s3cret"):
+    body = json.dumps(payload).encode()
+    sig = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return client.post("/webhooks/github", content=body, headers={"X-GitHub-Event": event, "X-Hub-Signature-256": sig, "Content-Type": "application/json"})
+
+
+def test_webhook_reviews_and_comments(fake_github):
+    client = TestClient(app)
+    payload = {"action": "synchronize", "number": 7, "repository": {"full_name": "octo/demo"}, "pull_request": {"number": 7, "head": {"sha": "abc123"}}}
+
+    assert _deliver(client, payload, secret="wrong").status_code == 401
+    assert _deliver(client, {"zen": "hi"}, event="ping").json() == {"status": "pong"}
+    assert _deliver(client, payload, event="issues").json()["status"] == "ignored"
+
+    resp = _deliver(client, payload)
+    assert resp.status_code == 202
+    assert resp.json()["status"] == "queued"
+    _wait(lambda: fake_github.comments)
+    body = fake_github.comments[0]
+    assert body.startswith(comment.MARKER)
+    assert "### ✅ Review summary" in body and "app.py" in body
+    assert set(fake_github.auth) == {"Bearer ghs_test"}
+
+
+def test_closed_pr_cancels_pending_review(fake_github, monkeypatch):
+    monkeypatch.setattr(webhooks, "_queue", webhooks.PullRequestQueue(debounce=5))
+    client = TestClient(app)
+    pr = {"number": 7, "head": {"sha": "abc123"}}
+    assert _deliver(client, {"action": "opened", "repository": {"full_name": "octo/demo"}, "pull_request": pr}).json()["status"] == "queued"
+    resp = _deliver(client, {"action": "closed", "repository": {"full_name": "octo/demo"}, "pull_request": pr})
+    assert resp.json()["status"] == "cancelled"
+    assert webhooks._queue.status()["pending"] == []
+    webhooks._queue.shutdown()
+
+
+def test_client_raises_on_api_errors(fake_github, monkeypatch):
+    client = github.from_env()
+    with pytest.raises(github.GitHubError) as exc:
+        client.pull_diff("octo/missing", 1)
+    assert exc.value.status == 404
@@ -0,0 +1,114 @@
+import os
+import time
+
+import pytest
+
+from autopr import analysis, reviewer, workers
+
+DIFF = (
+    "diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n@@ -0,0 +1,2 @@\n+import os\n+print(1)\n"
+    "diff --git a/b.py b/b.py\n--- a/b.py\n+++ b/b.py\n@@ -0,0 +1 @@\n+x = 1 == None\n"
+)
+
+
+# module-level so the worker processes can unpickle them
+def _spin():
+    while True:
+        pass
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return "done"
+
+
+def _allocate(mb):
+    return len(bytearray(mb * 1024 * 1024))
+
+
+def _load_slowly():
+    time.sleep(0.5)
+    return "loaded"
+
+
+class _SlowToLoad:
+    # unpickling it in the worker takes as long as importing a heavy module
+    def __reduce__(self):
+        return (_load_slowly, ())
+
+
+def _identity(value):
+    return value
+
+
+def test_analyze_diff_runs_one_unit_per_file():
+    types = [f["type"] for f in workers.analyze_diff(DIFF)]
+    assert types == ["unused_import", "debug_print", "none_equality_comparison"]
+    run = reviewer.run_review_pipeline(DIFF, include_llm=False)
+    assert run.get("static") == workers.analyze_diff(DIFF)
+
+
+def test_cpu_and_memory_limits_skip_the_unit_and_replace_the_worker():
+    pool = workers.WorkerPool(size=1, cpu_seconds=1, memory_mb=256, deadline=30)
+    try:
+        with pytest.raises(workers.ResourceLimit, match="cpu time"):
+            pool.run(_spin)
+        with pytest.raises(workers.ResourceLimit, match="memory"):
+            pool.run(_allocate, 512)
+        assert pool.run(_allocate, 16) == 16 * 1024 * 1024
+    finally:
+        pool.close()
+
+
+def test_deadline_kills_the_worker():
+    pool = workers.WorkerPool(size=1, deadline=0.3)
+    try:
+        start = time.monotonic()
+        with pytest.raises(workers.ResourceLimit, match="wall time"):
+            pool.run(_sleep, 30)
+        assert time.monotonic() - start < 5
+        assert pool.run(_sleep, 0) == "done"
+    finally:
+        pool.close()
+
+
+def test_deadline_starts_once_the_worker_has_the_unit():
+    pool = workers.WorkerPool(size=1, deadline=0.3)
+    try:
+        assert pool.run(_identity, _SlowToLoad()) == "loaded"
+    finally:
+        pool.close()
+
+
+def test_workers_are_recycled_after_max_tasks():
+    pool = workers.WorkerPool(size=1, max_tasks=2)
+    try:
+        pids = [pool.run(os.getpid) for _ in range(4)]
+        assert pids[0] == pids[1] != pids[2] == pids[3]
+        assert os.getpid() not in pids
+    finally:
+        pool.close()
+
+
+def test_limit_becomes_a_skipped_finding_in_process(monkeypatch):
+    monkeypatch.setenv("AUTOPR_ANALYSIS_WORKERS", "0")
+
+    def deep(*args, **kwargs):
+        raise RecursionError("maximum recursion depth exceeded")
+
+    monkeypatch.setattr(analysis, "analyze_diff", deep)
+    findings = workers.analyze_diff(DIFF)
+    assert [f["file"] for f in findings] == ["a.py", "b.py"]
+    assert findings[0]["type"] == "resource_limit"
+    assert findings[0]["message"].startswith("skipped: resource limit (recursion depth)")
+
+
+def test_pr_generation_runs_no_analysis_in_process(monkeypatch):
+    from autopr import generator, streaming
+
+    def boom(*args, **kwargs):
+        raise AssertionError("analysis must not run in the server process")
+
+    monkeypatch.setattr(analysis, "analyze_diff", boom)
+    assert generator.generate_pr_from(DIFF, ["feat: x"])["_route"]["route"] == "small"
+    assert list(streaming.stream_generate(DIFF, ["feat: x"]))[-1].startswith("event: result")